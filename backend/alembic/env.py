@@ -15,7 +15,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 # ✅ ПРАВИЛЬНЫЕ ИМПОРТЫ для твоей структуры
 from app.database import Base
-from app.models import Player, RankedStats, MatchHistory
+from app.models import Player, RankedStats, MatchHistory, MatchTimelineSummary, Match, MatchParticipant, MatchPayload, RankedSnapshot, RankedMatchCounter, PuuidDirectoryEntry
 
 # this is the Alembic Config object
 config = context.config
@@ -0,0 +1,41 @@
+"""Add puuid_directory table
+
+Revision ID: 0a7e4c9d5b13
+Revises: f5d3b2c8a716
+Create Date: 2026-10-19 23:04:11.527390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7e4c9d5b13'
+down_revision: Union[str, None] = 'f5d3b2c8a716'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('puuid_directory',
+    sa.Column('puuid', sa.String(), nullable=False),
+    sa.Column('platform', sa.String(), nullable=True),
+    sa.Column('game_name', sa.String(), nullable=True),
+    sa.Column('tag_line', sa.String(), nullable=True),
+    sa.Column('account_fetched_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('summoner_name', sa.String(), nullable=True),
+    sa.Column('profile_icon_id', sa.Integer(), nullable=True),
+    sa.Column('summoner_level', sa.Integer(), nullable=True),
+    sa.Column('summoner_fetched_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('puuid')
+    )
+    op.create_index(op.f('ix_puuid_directory_account_fetched_at'), 'puuid_directory', ['account_fetched_at'], unique=False)
+    op.create_index(op.f('ix_puuid_directory_summoner_fetched_at'), 'puuid_directory', ['summoner_fetched_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_puuid_directory_summoner_fetched_at'), table_name='puuid_directory')
+    op.drop_index(op.f('ix_puuid_directory_account_fetched_at'), table_name='puuid_directory')
+    op.drop_table('puuid_directory')
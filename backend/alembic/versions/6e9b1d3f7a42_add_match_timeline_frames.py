@@ -0,0 +1,33 @@
+"""Add match_timeline_frames
+
+Revision ID: 6e9b1d3f7a42
+Revises: 0a7e4c9d5b13
+Create Date: 2026-10-19 21:12:40.518326
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e9b1d3f7a42'
+down_revision: Union[str, None] = '0a7e4c9d5b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('match_timeline_frames',
+    sa.Column('match_id', sa.String(), nullable=False),
+    sa.Column('codec', sa.String(), nullable=False),
+    sa.Column('frame_count', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('match_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('match_timeline_frames')
@@ -0,0 +1,38 @@
+"""Add match_timeline_summary table
+
+Revision ID: 7c2d4e1a9b30
+Revises: 3151284e5967
+Create Date: 2026-10-19 10:05:12.431207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d4e1a9b30'
+down_revision: Union[str, None] = '3151284e5967'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('match_timeline_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('match_id', sa.String(), nullable=False),
+    sa.Column('puuid', sa.String(), nullable=False),
+    sa.Column('summary', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('match_id', 'puuid', name='uq_match_timeline_summary_match_puuid')
+    )
+    op.create_index(op.f('ix_match_timeline_summary_id'), 'match_timeline_summary', ['id'], unique=False)
+    op.create_index(op.f('ix_match_timeline_summary_match_id'), 'match_timeline_summary', ['match_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_match_timeline_summary_match_id'), table_name='match_timeline_summary')
+    op.drop_index(op.f('ix_match_timeline_summary_id'), table_name='match_timeline_summary')
+    op.drop_table('match_timeline_summary')
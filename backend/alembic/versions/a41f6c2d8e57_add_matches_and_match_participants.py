@@ -0,0 +1,76 @@
+"""Add matches and match_participants tables
+
+Revision ID: a41f6c2d8e57
+Revises: 7c2d4e1a9b30
+Create Date: 2026-10-19 13:22:47.905114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41f6c2d8e57'
+down_revision: Union[str, None] = '7c2d4e1a9b30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('matches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('match_id', sa.String(), nullable=False),
+    sa.Column('platform', sa.String(), nullable=True),
+    sa.Column('queue_id', sa.Integer(), nullable=True),
+    sa.Column('game_mode', sa.String(), nullable=True),
+    sa.Column('game_version', sa.String(), nullable=True),
+    sa.Column('patch', sa.String(), nullable=True),
+    sa.Column('game_duration', sa.Integer(), nullable=True),
+    sa.Column('game_creation', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_matches_id'), 'matches', ['id'], unique=False)
+    op.create_index(op.f('ix_matches_match_id'), 'matches', ['match_id'], unique=True)
+    op.create_table('match_participants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('match_id', sa.String(), nullable=False),
+    sa.Column('participant_id', sa.Integer(), nullable=False),
+    sa.Column('puuid', sa.String(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=True),
+    sa.Column('champion', sa.String(), nullable=True),
+    sa.Column('champion_id', sa.Integer(), nullable=True),
+    sa.Column('team_position', sa.String(), nullable=True),
+    sa.Column('kills', sa.Integer(), nullable=True),
+    sa.Column('deaths', sa.Integer(), nullable=True),
+    sa.Column('assists', sa.Integer(), nullable=True),
+    sa.Column('cs', sa.Integer(), nullable=True),
+    sa.Column('gold_earned', sa.Integer(), nullable=True),
+    sa.Column('total_damage', sa.Integer(), nullable=True),
+    sa.Column('vision_score', sa.Integer(), nullable=True),
+    sa.Column('time_played', sa.Integer(), nullable=True),
+    sa.Column('win', sa.Boolean(), nullable=True),
+    sa.Column('patch', sa.String(), nullable=True),
+    sa.Column('queue_id', sa.Integer(), nullable=True),
+    sa.Column('game_creation', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['match_id'], ['matches.match_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('match_id', 'participant_id', name='uq_match_participants_match_participant')
+    )
+    op.create_index(op.f('ix_match_participants_id'), 'match_participants', ['id'], unique=False)
+    op.create_index(op.f('ix_match_participants_match_id'), 'match_participants', ['match_id'], unique=False)
+    op.create_index('ix_match_participants_puuid_game_creation', 'match_participants', ['puuid', 'game_creation'], unique=False)
+    op.create_index('ix_match_participants_champion_team_position', 'match_participants', ['champion', 'team_position'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_match_participants_champion_team_position', table_name='match_participants')
+    op.drop_index('ix_match_participants_puuid_game_creation', table_name='match_participants')
+    op.drop_index(op.f('ix_match_participants_match_id'), table_name='match_participants')
+    op.drop_index(op.f('ix_match_participants_id'), table_name='match_participants')
+    op.drop_table('match_participants')
+    op.drop_index(op.f('ix_matches_match_id'), table_name='matches')
+    op.drop_index(op.f('ix_matches_id'), table_name='matches')
+    op.drop_table('matches')
@@ -0,0 +1,102 @@
+"""Move match_history.raw_data to compressed match_payloads
+
+Revision ID: b93e0d4c7f21
+Revises: a41f6c2d8e57
+Create Date: 2026-10-19 15:48:03.117640
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import zstandard
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b93e0d4c7f21'
+down_revision: Union[str, None] = 'a41f6c2d8e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+ZSTD_LEVEL = 6
+
+match_history = sa.table(
+    'match_history',
+    sa.column('id', sa.Integer()),
+    sa.column('match_id', sa.String()),
+    sa.column('raw_data', sa.JSON()),
+)
+match_payloads = sa.table(
+    'match_payloads',
+    sa.column('match_id', sa.String()),
+    sa.column('codec', sa.String()),
+    sa.column('data', sa.LargeBinary()),
+)
+
+
+def upgrade() -> None:
+    op.create_table('match_payloads',
+    sa.Column('match_id', sa.String(), nullable=False),
+    sa.Column('codec', sa.String(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('match_id')
+    )
+
+    # Copy existing payloads in keyset-paginated batches, compressing in Python.
+    bind = op.get_bind()
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(match_history.c.id, match_history.c.match_id, match_history.c.raw_data)
+            .where(match_history.c.id > last_id)
+            .order_by(match_history.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        payloads = [
+            {
+                'match_id': row.match_id,
+                'codec': 'zstd',
+                'data': compressor.compress(
+                    json.dumps(row.raw_data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+                ),
+            }
+            for row in rows
+            if row.match_id and row.raw_data
+        ]
+        if payloads:
+            bind.execute(match_payloads.insert(), payloads)
+
+    op.drop_column('match_history', 'raw_data')
+
+
+def downgrade() -> None:
+    op.add_column('match_history', sa.Column('raw_data', sa.JSON(), nullable=True))
+
+    bind = op.get_bind()
+    decompressor = zstandard.ZstdDecompressor()
+    last_match_id = ''
+    while True:
+        rows = bind.execute(
+            sa.select(match_payloads.c.match_id, match_payloads.c.data)
+            .where(match_payloads.c.match_id > last_match_id)
+            .order_by(match_payloads.c.match_id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_match_id = rows[-1].match_id
+        for row in rows:
+            bind.execute(
+                match_history.update()
+                .where(match_history.c.match_id == row.match_id)
+                .values(raw_data=json.loads(decompressor.decompress(row.data)))
+            )
+
+    op.drop_table('match_payloads')
@@ -0,0 +1,27 @@
+"""Add players pagination and ranked_stats join indexes
+
+Revision ID: c6a8f3b1d245
+Revises: b93e0d4c7f21
+Create Date: 2026-10-19 17:31:26.508812
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a8f3b1d245'
+down_revision: Union[str, None] = 'b93e0d4c7f21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_players_platform_id', 'players', ['platform', 'id'], unique=False)
+    op.create_index('ix_ranked_stats_player_id_queue_type', 'ranked_stats', ['player_id', 'queue_type'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ranked_stats_player_id_queue_type', table_name='ranked_stats')
+    op.drop_index('ix_players_platform_id', table_name='players')
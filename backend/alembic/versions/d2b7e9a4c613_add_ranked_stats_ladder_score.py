@@ -0,0 +1,53 @@
+"""Add ranked_stats.ladder_score with ladder index
+
+Revision ID: d2b7e9a4c613
+Revises: c6a8f3b1d245
+Create Date: 2026-10-19 19:02:54.771903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b7e9a4c613'
+down_revision: Union[str, None] = 'c6a8f3b1d245'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Mirrors app.services.ladder at the time of this revision.
+TIERS = (
+    'IRON', 'BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'EMERALD', 'DIAMOND',
+    'MASTER', 'GRANDMASTER', 'CHALLENGER',
+)
+DIVISIONS = ('IV', 'III', 'II', 'I')
+
+
+def upgrade() -> None:
+    op.add_column('ranked_stats', sa.Column('ladder_score', sa.Integer(), nullable=True))
+
+    tier_case = ' '.join(f"WHEN '{tier}' THEN {index}" for index, tier in enumerate(TIERS))
+    division_case = ' '.join(f"WHEN '{division}' THEN {index}" for index, division in enumerate(DIVISIONS))
+    op.execute(
+        f"""
+        UPDATE ranked_stats
+        SET ladder_score = (CASE UPPER(tier) {tier_case} END) * 10000
+            + (CASE UPPER(COALESCE(rank, 'I')) {division_case} ELSE 3 END) * 1000
+            + GREATEST(COALESCE(lp, 0), 0)
+        WHERE UPPER(tier) IN ({', '.join(f"'{tier}'" for tier in TIERS)})
+        """
+    )
+
+    op.create_index(
+        'ix_ranked_stats_queue_type_ladder_score',
+        'ranked_stats',
+        ['queue_type', sa.text('ladder_score DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ranked_stats_queue_type_ladder_score', table_name='ranked_stats')
+    op.drop_column('ranked_stats', 'ladder_score')
@@ -0,0 +1,40 @@
+"""Add ranked_snapshots table
+
+Revision ID: e8c1a5f07b92
+Revises: d2b7e9a4c613
+Create Date: 2026-10-19 20:44:10.362185
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c1a5f07b92'
+down_revision: Union[str, None] = 'd2b7e9a4c613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ranked_snapshots',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('queue_type', sa.String(), nullable=False),
+    sa.Column('ladder_score', sa.Integer(), nullable=True),
+    sa.Column('lp', sa.Integer(), nullable=True),
+    sa.Column('wins', sa.Integer(), nullable=True),
+    sa.Column('losses', sa.Integer(), nullable=True),
+    sa.Column('state_hash', sa.BigInteger(), nullable=False),
+    sa.Column('captured_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ranked_snapshots_player_queue_captured', 'ranked_snapshots', ['player_id', 'queue_type', 'captured_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ranked_snapshots_player_queue_captured', table_name='ranked_snapshots')
+    op.drop_table('ranked_snapshots')
@@ -0,0 +1,40 @@
+"""Add ranked_match_counters table
+
+Revision ID: f5d3b2c8a716
+Revises: e8c1a5f07b92
+Create Date: 2026-10-19 22:15:37.840221
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5d3b2c8a716'
+down_revision: Union[str, None] = 'e8c1a5f07b92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ranked_match_counters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('solo_wins', sa.Integer(), nullable=False),
+    sa.Column('solo_losses', sa.Integer(), nullable=False),
+    sa.Column('flex_wins', sa.Integer(), nullable=False),
+    sa.Column('flex_losses', sa.Integer(), nullable=False),
+    sa.Column('last_match_id', sa.String(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('player_id')
+    )
+    op.create_index(op.f('ix_ranked_match_counters_id'), 'ranked_match_counters', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ranked_match_counters_id'), table_name='ranked_match_counters')
+    op.drop_table('ranked_match_counters')
@@ -2,27 +2,45 @@
 Analysis API endpoints - расширенная аналитика игрока
 """
 import asyncio
+import json
 import httpx
-from datetime import datetime, timezone
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.exc import OperationalError
-from typing import Dict, Any, List, Optional
+import numpy as np
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, AsyncIterator, List, Optional
 
 from app.models_old.summoner import SummonerRequest
 from app.schemas.analysis import AnalysisResponse
-from app.services.riot_api import RiotAPIService, RiotAPIError
+from app.services.riot_api import RiotAPIError, riot_api
 from app.services.analytics import summarize_matches, build_player_dna, build_learning_path, build_coaching_recap
 from app.services.ddragon import ddragon
-from app.services.timeline import summarize_timeline
-from app.database import get_db
-from sqlalchemy.orm import Session
+from app.services.timeline import (
+    summarize_timeline, find_lane_opponent, build_frame_arrays, frames_row, decode_frames, with_lane, LANE_MARKS_MIN,
+)
+from app.services.pipeline import TaskGraph
+from app.services.deadline import request_deadline, remaining_seconds
+from app.services.response_cache import cached_json_response, response_cache
+from app.services.match_store import load_matches, get_stored_matches, fetch_matches, backfill_matches, match_id_of
+from app.config import settings
+from app.database import get_async_db, AsyncSessionLocal, DB_UNAVAILABLE_ERRORS
 from app import crud
 
 
-riot_api = RiotAPIService()
 router = APIRouter()
 
 
+STREAM_BATCH_SIZE = 5
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+LANE_DIFF_KEYS = [
+    f"{metric}_at_{minute}"
+    for minute in LANE_MARKS_MIN
+    for metric in ("gold", "gold_diff", "xp_diff", "cs_diff")
+]
+
+
 def _select_queue(entries: List[Dict[str, Any]], queue_type: str) -> Dict[str, Any]:
     for entry in entries:
         if entry.get("queueType") == queue_type:
@@ -33,226 +51,485 @@ def _select_queue(entries: List[Dict[str, Any]], queue_type: str) -> Dict[str, A
 @router.post("/by-name", response_model=AnalysisResponse)
 async def analyze_by_name(
     request: SummonerRequest,
+    http_request: Request,
     match_count: int = 20,
     persist: bool = False,
     include_timeline: bool = False,
     timeline_matches: int = 3,
-    db: Session = Depends(get_db),
+    deadline_ms: Optional[int] = Query(None, ge=100, le=60000, description="Latency budget; defaults to ANALYSIS_DEADLINE_MS"),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Полный анализ игрока по Riot ID
     """
-    try:
-        account = await riot_api.get_account_by_riot_id(
-            game_name=request.game_name,
-            tag_line=request.tag_line,
-            region=request.region,
-        )
-        puuid = account["puuid"]
+    return await _run_analysis(
+        http_request=http_request,
+        db=db,
+        region=request.region,
+        platform=request.platform,
+        game_name=request.game_name,
+        tag_line=request.tag_line,
+        match_count=match_count,
+        persist=persist,
+        include_timeline=include_timeline,
+        timeline_matches=timeline_matches,
+        deadline_ms=deadline_ms,
+    )
 
-        summoner = await riot_api.get_summoner_by_puuid(
-            puuid=puuid,
-            platform=request.platform,
-        )
-
-        league_entries = []
-        if summoner.get("id"):
-            league_entries = await riot_api.get_league_entries(
-                summoner_id=summoner.get("id", ""),
-                platform=request.platform,
-            )
 
-        match_ids = await riot_api.get_match_history(
-            puuid=puuid,
-            region=request.region,
-            count=min(match_count, 100),
-        )
+@router.get("/by-puuid", response_model=AnalysisResponse)
+async def analyze_by_puuid(
+    http_request: Request,
+    puuid: str,
+    region: str = "europe",
+    platform: str = "euw1",
+    match_count: int = 20,
+    persist: bool = False,
+    include_timeline: bool = False,
+    timeline_matches: int = 3,
+    deadline_ms: Optional[int] = Query(None, ge=100, le=60000, description="Latency budget; defaults to ANALYSIS_DEADLINE_MS"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Полный анализ игрока по PUUID
+    """
+    return await _run_analysis(
+        http_request=http_request,
+        db=db,
+        region=region,
+        platform=platform,
+        puuid=puuid,
+        match_count=match_count,
+        persist=persist,
+        include_timeline=include_timeline,
+        timeline_matches=timeline_matches,
+        deadline_ms=deadline_ms,
+    )
+
+
+async def _run_analysis(
+    http_request: Request,
+    db: AsyncSession,
+    region: str,
+    platform: str,
+    match_count: int,
+    persist: bool,
+    include_timeline: bool,
+    timeline_matches: int,
+    game_name: Optional[str] = None,
+    tag_line: Optional[str] = None,
+    puuid: Optional[str] = None,
+    deadline_ms: Optional[int] = None,
+) -> Response:
+    """
+    Shared analysis pipeline for by-name and by-puuid.
 
-        if not match_ids:
-            raise HTTPException(status_code=404, detail="No matches found")
+    Stages run as a task graph: summoner, league and match ids only need the
+    PUUID, and timelines only need the match list, so they overlap. Every Riot
+    call is bounded by the request deadline; matches or timelines that do not
+    arrive in time are dropped and reported via partial/missing_* fields.
 
-        async with httpx.AsyncClient() as client:
-            tasks = [
-                riot_api.get_match_details(
-                    match_id=match_id,
-                    region=request.region,
-                    platform=request.platform,
-                    client=client,
+    Complete responses are cached per player, parameters and latest match id
+    and served with an ETag, so an unchanged profile costs one match-ids call.
+    """
+    by_puuid = puuid is not None
+    try:
+        with request_deadline(deadline_ms or settings.analysis_deadline_ms):
+            seeded: Dict[str, Any] = {}
+            if not by_puuid:
+                seeded["account"] = await riot_api.get_account_by_riot_id(
+                    game_name=game_name,
+                    tag_line=tag_line,
+                    region=region,
                 )
-                for match_id in match_ids[:match_count]
-            ]
-            match_results = await asyncio.gather(*tasks, return_exceptions=True)
+                puuid = seeded["account"]["puuid"]
+            seeded["puuid"] = puuid
+            seeded["match_ids"] = await _fetch_match_ids(puuid, region, match_count)
 
-        match_details = [m for m in match_results if isinstance(m, dict)]
-        analysis = summarize_matches(match_details, puuid)
-        analysis["recent_matches"] = await ddragon.enrich_recent_matches(analysis["recent_matches"])
-        if include_timeline:
-            analysis["recent_matches"] = await _attach_timeline(
-                analysis["recent_matches"],
-                match_ids[:timeline_matches],
+            cache_key = response_cache.make_key(
+                "analysis",
+                "puuid" if by_puuid else "name",
                 puuid,
-                request.region,
-                request.platform,
+                region.lower(),
+                platform.lower(),
+                match_count,
+                persist,
+                include_timeline,
+                timeline_matches,
+                seeded["match_ids"][0],
             )
-            early_game = _summarize_early_game(analysis["recent_matches"])
-            if early_game:
-                analysis["early_game"] = early_game
-
-        analysis["dna"] = build_player_dna(analysis)
-        analysis["learning_path"] = build_learning_path(analysis)
-        analysis["coaching_recap"] = build_coaching_recap(analysis)
-
-        player_id = None
-        if persist:
-            try:
-                player = crud.get_or_create_player(
+
+            async def build():
+                graph = _build_analysis_graph(
                     db=db,
-                    puuid=puuid,
-                    game_name=account.get("gameName", request.game_name),
-                    tag_line=account.get("tagLine", request.tag_line),
-                    region=request.region,
-                    platform=request.platform,
-                    summoner_level=summoner.get("summonerLevel"),
-                    profile_icon_id=summoner.get("profileIconId"),
+                    region=region,
+                    platform=platform,
+                    game_name=game_name,
+                    tag_line=tag_line,
+                    by_puuid=by_puuid,
+                    match_count=match_count,
+                    persist=persist,
+                    include_timeline=include_timeline,
+                    timeline_matches=timeline_matches,
                 )
-                player_id = player.id
-                _persist_match_history(db, player_id, match_details, puuid)
-            except OperationalError:
-                player_id = None
-
-        ranked_solo = _select_queue(league_entries, "RANKED_SOLO_5x5")
-        ranked_flex = _select_queue(league_entries, "RANKED_FLEX_SR")
-        if not ranked_solo and league_entries:
-            ranked_solo = league_entries[0]
-
-        return {
-            "player": {
-                "game_name": account.get("gameName", request.game_name),
-                "tag_line": account.get("tagLine", request.tag_line),
-                "puuid": puuid,
-                "level": summoner.get("summonerLevel", 0),
-                "profile_icon_id": summoner.get("profileIconId"),
-            },
-            "ranked": {
-                "solo": ranked_solo or None,
-                "flex": ranked_flex or None,
-            },
-            **analysis,
-        }
+                results = await graph.run(seeded)
+                payload = _assemble_analysis(results, include_timeline, timeline_matches, game_name, tag_line)
+                payload["timings"] = graph.timings
+                return payload, not payload["partial"]
 
+            return await cached_json_response(http_request, cache_key, build, AnalysisResponse)
+
+    except HTTPException:
+        raise
     except RiotAPIError as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
 
 
-@router.get("/by-puuid", response_model=AnalysisResponse)
-async def analyze_by_puuid(
+def _assemble_analysis(
+    results: Dict[str, Any],
+    include_timeline: bool,
+    timeline_matches: int,
+    game_name: Optional[str],
+    tag_line: Optional[str],
+) -> Dict[str, Any]:
+    missing_matches = len(results["match_ids"]) - len(results["matches"])
+    missing_timelines = 0
+
+    analysis = results["analysis"]
+    analysis["recent_matches"] = results["enriched"]
+    if include_timeline:
+        missing_timelines = min(timeline_matches, len(results["match_ids"])) - len(results["timelines"])
+        analysis["recent_matches"] = _apply_timeline(analysis["recent_matches"], results["timelines"])
+        early_game = _summarize_early_game(analysis["recent_matches"])
+        if early_game:
+            analysis["early_game"] = early_game
+
+    analysis["dna"] = build_player_dna(analysis)
+    analysis["learning_path"] = build_learning_path(analysis)
+    analysis["coaching_recap"] = build_coaching_recap(analysis)
+
+    return {
+        "player": _player_payload(
+            results["account"],
+            results["summoner"],
+            results["puuid"],
+            game_name or "Unknown",
+            tag_line or "Unknown",
+        ),
+        "ranked": _ranked_payload(results["league"]),
+        **analysis,
+        "partial": bool(missing_matches or missing_timelines),
+        "missing_matches": missing_matches,
+        "missing_timelines": missing_timelines,
+    }
+
+
+async def _backfill_player_matches(
+    db: AsyncSession,
+    account: Dict[str, Any],
+    summoner: Dict[str, Any],
     puuid: str,
-    region: str = "europe",
-    platform: str = "euw1",
+    region: str,
+    platform: str,
+    matches: List[Dict[str, Any]],
+    game_name: Optional[str] = None,
+    tag_line: Optional[str] = None,
+) -> Optional[int]:
+    if not matches:
+        return None
+    try:
+        player = await crud.get_or_create_player_async(
+            db=db,
+            puuid=puuid,
+            game_name=account.get("gameName", game_name or "Unknown"),
+            tag_line=account.get("tagLine", tag_line or "Unknown"),
+            region=region,
+            platform=platform,
+            summoner_level=summoner.get("summonerLevel"),
+            profile_icon_id=summoner.get("profileIconId"),
+        )
+    except DB_UNAVAILABLE_ERRORS:
+        await db.rollback()
+        return None
+    await backfill_matches(db, player.id, matches, puuid)
+    return player.id
+
+
+async def _fetch_match_ids(puuid: str, region: str, match_count: int) -> List[str]:
+    match_ids = await riot_api.get_match_history(puuid=puuid, region=region, count=min(match_count, 100))
+    if not match_ids:
+        raise HTTPException(status_code=404, detail="No matches found")
+    return match_ids[:match_count]
+
+
+def _build_analysis_graph(
+    db: AsyncSession,
+    region: str,
+    platform: str,
+    game_name: Optional[str],
+    tag_line: Optional[str],
+    by_puuid: bool,
+    match_count: int,
+    persist: bool,
+    include_timeline: bool,
+    timeline_matches: int,
+) -> TaskGraph:
+    graph = TaskGraph()
+
+    if by_puuid:
+        async def account(puuid):
+            return await riot_api.get_account_by_puuid(puuid=puuid, region=region, platform=platform)
+
+        graph.add("account", account, deps=["puuid"])
+    else:
+        async def account():
+            return await riot_api.get_account_by_riot_id(game_name=game_name, tag_line=tag_line, region=region)
+
+        async def puuid_from_account(account):
+            return account["puuid"]
+
+        graph.add("account", account)
+        graph.add("puuid", puuid_from_account, deps=["account"])
+
+    async def summoner(puuid):
+        return await riot_api.get_summoner_by_puuid(puuid=puuid, platform=platform)
+
+    async def league(puuid):
+        return await riot_api.get_league_entries_by_puuid(puuid=puuid, platform=platform)
+
+    async def match_ids(puuid):
+        return await _fetch_match_ids(puuid, region, match_count)
+
+    async def match_batch(match_ids):
+        return await load_matches(db, match_ids, region, platform)
+
+    async def matches(match_batch):
+        details = match_batch["matches"]
+        if not details:
+            expired = (remaining_seconds() or 0) <= 0
+            raise HTTPException(status_code=504 if expired else 502, detail="No match details could be loaded")
+        return details
+
+    async def analysis(matches, puuid):
+        return summarize_matches(matches, puuid)
+
+    async def enriched(analysis):
+        return await ddragon.enrich_recent_matches(list(analysis["recent_matches"]))
+
+    graph.add("summoner", summoner, deps=["puuid"])
+    graph.add("league", league, deps=["puuid"])
+    graph.add("match_ids", match_ids, deps=["puuid"])
+    graph.add("match_batch", match_batch, deps=["match_ids"])
+    graph.add("matches", matches, deps=["match_batch"])
+    graph.add("analysis", analysis, deps=["matches", "puuid"])
+    graph.add("enriched", enriched, deps=["analysis"])
+
+    if include_timeline:
+        async def timelines(match_ids, matches, puuid):
+            return await _load_timeline_summaries(
+                db, match_ids[:timeline_matches], puuid, region, platform, matches
+            )
+
+        graph.add("timelines", timelines, deps=["match_ids", "matches", "puuid"])
+
+    async def backfill(account, summoner, match_batch, puuid):
+        # New matches are always backfilled; persist=True also refreshes stored rows.
+        # Own session: an AsyncSession must not be shared with the concurrent timelines stage.
+        to_write = match_batch["matches"] if persist else match_batch["fetched"]
+        async with AsyncSessionLocal() as write_db:
+            return await _backfill_player_matches(
+                write_db, account, summoner, puuid, region, platform, to_write, game_name, tag_line
+            )
+
+    graph.add("persist", backfill, deps=["account", "summoner", "match_batch", "puuid"])
+
+    return graph
+
+
+@router.post("/by-name/stream")
+async def analyze_by_name_stream(
+    request: SummonerRequest,
     match_count: int = 20,
-    persist: bool = False,
     include_timeline: bool = False,
     timeline_matches: int = 3,
-    db: Session = Depends(get_db),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$", description="ndjson or sse"),
+    deadline_ms: Optional[int] = Query(None, ge=100, le=60000, description="Latency budget; defaults to ANALYSIS_DEADLINE_MS"),
 ):
     """
-    Полный анализ игрока по PUUID
+    Потоковый анализ игрока: player/ranked сразу, summary по мере загрузки матчей,
+    затем recent_matches и early_game. Каждый чанк: {"event": ..., "data": ...}
     """
+    events = _analysis_events(
+        request,
+        match_count,
+        include_timeline,
+        timeline_matches,
+        deadline_ms or settings.analysis_deadline_ms,
+    )
+    return StreamingResponse(
+        _encode_events(events, format),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _analysis_events(
+    request: SummonerRequest,
+    match_count: int,
+    include_timeline: bool,
+    timeline_matches: int,
+    deadline_ms: int,
+) -> AsyncIterator[tuple]:
+    with request_deadline(deadline_ms):
+        async for event in _analysis_event_stream(request, match_count, include_timeline, timeline_matches):
+            yield event
+
+
+async def _analysis_event_stream(
+    request: SummonerRequest,
+    match_count: int,
+    include_timeline: bool,
+    timeline_matches: int,
+) -> AsyncIterator[tuple]:
+    db = AsyncSessionLocal()
+    tasks_in_flight: List[asyncio.Future] = []
     try:
-        account = await riot_api.get_account_by_puuid(puuid=puuid, region=region, platform=platform)
-        summoner = await riot_api.get_summoner_by_puuid(puuid=puuid, platform=platform)
-
-        league_entries = []
-        if summoner.get("id"):
-            league_entries = await riot_api.get_league_entries(
-                summoner_id=summoner.get("id", ""),
-                platform=platform,
-            )
+        account = await riot_api.get_account_by_riot_id(
+            game_name=request.game_name,
+            tag_line=request.tag_line,
+            region=request.region,
+        )
+        puuid = account["puuid"]
 
-        match_ids = await riot_api.get_match_history(
-            puuid=puuid,
-            region=region,
-            count=min(match_count, 100),
+        league_task = asyncio.ensure_future(
+            riot_api.get_league_entries_by_puuid(puuid=puuid, platform=request.platform)
         )
+        match_ids_task = asyncio.ensure_future(
+            riot_api.get_match_history(puuid=puuid, region=request.region, count=min(match_count, 100))
+        )
+        tasks_in_flight = [league_task, match_ids_task]
 
-        if not match_ids:
-            raise HTTPException(status_code=404, detail="No matches found")
+        summoner = await riot_api.get_summoner_by_puuid(puuid=puuid, platform=request.platform)
+        yield "player", _player_payload(account, summoner, puuid, request.game_name, request.tag_line)
 
+        yield "ranked", _ranked_payload(await league_task)
+
+        match_ids = await match_ids_task
+        if not match_ids:
+            yield "error", {"status_code": 404, "detail": "No matches found"}
+            return
+
+        pending = match_ids[:match_count]
+        stored = await get_stored_matches(db, pending)
+        match_details: List[Dict[str, Any]] = list(stored.values())
+        fetched: List[Dict[str, Any]] = []
+        missing = [match_id for match_id in pending if match_id not in stored]
         async with httpx.AsyncClient() as client:
-            tasks = [
-                riot_api.get_match_details(
-                    match_id=match_id,
-                    region=region,
-                    platform=platform,
-                    client=client,
-                )
-                for match_id in match_ids[:match_count]
-            ]
-            match_results = await asyncio.gather(*tasks, return_exceptions=True)
+            tasks = [fetch_matches([match_id], request.region, request.platform, client) for match_id in missing]
+            for done, future in enumerate(asyncio.as_completed(tasks), start=len(stored) + 1):
+                fetched.extend(await future)
+                match_details = list(stored.values()) + fetched
+                if done % STREAM_BATCH_SIZE == 0 and done < len(pending):
+                    partial = summarize_matches(match_details, puuid)
+                    yield "summary", {
+                        "loaded": done,
+                        "total": len(pending),
+                        "final": False,
+                        **{key: partial[key] for key in ("summary", "performance", "roles", "champions")},
+                    }
+
+        # Restore Riot ordering (newest first) after out-of-order arrival.
+        order = {match_id: idx for idx, match_id in enumerate(pending)}
+        match_details.sort(key=lambda m: order.get(match_id_of(m), len(order)))
+        await _backfill_player_matches(
+            db, account, summoner, puuid, request.region, request.platform,
+            fetched, request.game_name, request.tag_line,
+        )
 
-        match_details = [m for m in match_results if isinstance(m, dict)]
         analysis = summarize_matches(match_details, puuid)
+        yield "summary", {
+            "loaded": len(match_details),
+            "total": len(pending),
+            "final": True,
+            "partial": len(match_details) < len(pending),
+            "missing_matches": len(pending) - len(match_details),
+            **{key: analysis[key] for key in ("summary", "performance", "roles", "champions")},
+        }
+
         analysis["recent_matches"] = await ddragon.enrich_recent_matches(analysis["recent_matches"])
+        yield "insights", {
+            "dna": build_player_dna(analysis),
+            "learning_path": build_learning_path(analysis),
+            "coaching_recap": build_coaching_recap(analysis),
+        }
+        yield "recent_matches", analysis["recent_matches"]
+
         if include_timeline:
-            analysis["recent_matches"] = await _attach_timeline(
-                analysis["recent_matches"],
+            summaries = await _load_timeline_summaries(
+                db,
                 match_ids[:timeline_matches],
                 puuid,
-                region,
-                platform,
+                request.region,
+                request.platform,
+                match_details,
             )
-            early_game = _summarize_early_game(analysis["recent_matches"])
-            if early_game:
-                analysis["early_game"] = early_game
-
-        analysis["dna"] = build_player_dna(analysis)
-        analysis["learning_path"] = build_learning_path(analysis)
-        analysis["coaching_recap"] = build_coaching_recap(analysis)
-
-        player_id = None
-        if persist:
-            try:
-                player = crud.get_or_create_player(
-                    db=db,
-                    puuid=puuid,
-                    game_name=account.get("gameName", "Unknown"),
-                    tag_line=account.get("tagLine", "Unknown"),
-                    region=region,
-                    platform=platform,
-                    summoner_level=summoner.get("summonerLevel"),
-                    profile_icon_id=summoner.get("profileIconId"),
-                )
-                player_id = player.id
-                _persist_match_history(db, player_id, match_details, puuid)
-            except OperationalError:
-                player_id = None
-
-        ranked_solo = _select_queue(league_entries, "RANKED_SOLO_5x5")
-        ranked_flex = _select_queue(league_entries, "RANKED_FLEX_SR")
-        if not ranked_solo and league_entries:
-            ranked_solo = league_entries[0]
-
-        return {
-            "player": {
-                "game_name": account.get("gameName", "Unknown"),
-                "tag_line": account.get("tagLine", "Unknown"),
-                "puuid": puuid,
-                "level": summoner.get("summonerLevel", 0),
-                "profile_icon_id": summoner.get("profileIconId"),
-            },
-            "ranked": {
-                "solo": ranked_solo or None,
-                "flex": ranked_flex or None,
-            },
-            **analysis,
-        }
+            analysis["recent_matches"] = _apply_timeline(analysis["recent_matches"], summaries)
+            yield "timeline", {
+                "recent_matches": [
+                    {"match_id": m["match_id"], "timeline": m["timeline"]}
+                    for m in analysis["recent_matches"]
+                    if m.get("timeline")
+                ],
+                "early_game": _summarize_early_game(analysis["recent_matches"]),
+            }
+
+        yield "done", {}
 
     except RiotAPIError as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
+        yield "error", {"status_code": e.status_code, "detail": e.message}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
+        yield "error", {"status_code": 500, "detail": f"Analysis error: {str(e)}"}
+    finally:
+        for task in tasks_in_flight:
+            task.cancel()
+        await db.close()
+
+
+async def _encode_events(events: AsyncIterator[tuple], format: str) -> AsyncIterator[str]:
+    async for event, data in events:
+        if format == "sse":
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        else:
+            yield json.dumps({"event": event, "data": data}, default=str) + "\n"
+
+
+def _player_payload(
+    account: Dict[str, Any],
+    summoner: Dict[str, Any],
+    puuid: str,
+    game_name: str = "Unknown",
+    tag_line: str = "Unknown",
+) -> Dict[str, Any]:
+    return {
+        "game_name": account.get("gameName", game_name),
+        "tag_line": account.get("tagLine", tag_line),
+        "puuid": puuid,
+        "level": summoner.get("summonerLevel", 0),
+        "profile_icon_id": summoner.get("profileIconId"),
+    }
+
+
+def _ranked_payload(league_entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ranked_solo = _select_queue(league_entries, "RANKED_SOLO_5x5")
+    ranked_flex = _select_queue(league_entries, "RANKED_FLEX_SR")
+    if not ranked_solo and league_entries:
+        ranked_solo = league_entries[0]
+    return {
+        "solo": ranked_solo or None,
+        "flex": ranked_flex or None,
+    }
 
 
 @router.get("/health")
@@ -260,39 +537,92 @@ async def analysis_health():
     return {"status": "ok", "endpoint": "/api/analysis"}
 
 
-async def _attach_timeline(
-    recent_matches: List[Dict[str, Any]],
+async def _load_timeline_summaries(
+    db: AsyncSession,
     match_ids: List[str],
     puuid: str,
     region: str,
     platform: str,
+    match_details: List[Dict[str, Any]],
+) -> Dict[str, Dict[str, Any]]:
+    # Stored summaries first; Riot timelines only for matches not seen before.
+    try:
+        summaries = await crud.get_timeline_summaries_async(db, match_ids, puuid)
+    except DB_UNAVAILABLE_ERRORS:
+        await db.rollback()
+        summaries = {}
+
+    # Кадры матчей, из которых считается лейн: свежие — в памяти, остальные — из match_timeline_frames
+    arrays_by_match: Dict[str, Any] = {}
+    missing_ids = [match_id for match_id in match_ids if match_id not in summaries]
+    if missing_ids:
+        async with httpx.AsyncClient() as client:
+            tasks = [
+                riot_api.get_match_timeline(
+                    match_id=match_id,
+                    region=region,
+                    platform=platform,
+                    client=client,
+                )
+                for match_id in missing_ids
+            ]
+            timeline_results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        details_by_id = {m.get("metadata", {}).get("matchId"): m for m in match_details}
+        rows = []
+        frame_rows = []
+        for match_id, timeline in zip(missing_ids, timeline_results):
+            # Без деталей матча нет соперника по лейну, а сводка пишется навсегда (DO NOTHING)
+            if not isinstance(timeline, dict) or match_id not in details_by_id:
+                continue
+            match = details_by_id[match_id]
+            timestamps, frames = build_frame_arrays(timeline)
+            arrays_by_match[match_id] = (timestamps, frames)
+            frame_rows.append(frames_row(match_id, timestamps, frames))
+            # Summarize for every participant so other players' visits are free too.
+            for participant_puuid in timeline.get("metadata", {}).get("participants", []):
+                summary = summarize_timeline(
+                    timeline,
+                    participant_puuid,
+                    find_lane_opponent(match, participant_puuid),
+                )
+                if not summary:
+                    continue
+                rows.append({"match_id": match_id, "puuid": participant_puuid, "summary": summary})
+                if participant_puuid == puuid:
+                    summaries[match_id] = summary
+
+        try:
+            await crud.bulk_create_timeline_frames_async(db, frame_rows)
+            await crud.bulk_create_timeline_summaries_async(db, rows)
+        except (*DB_UNAVAILABLE_ERRORS, IntegrityError):
+            await db.rollback()
+
+    # Старые сводки уже содержат "lane" и lane_opponent_id не имеют — им кадры не нужны
+    stored_ids = [
+        match_id for match_id, summary in summaries.items()
+        if summary.get("lane_opponent_id") and match_id not in arrays_by_match
+    ]
+    if stored_ids:
+        try:
+            stored_frames = await crud.get_timeline_frames_async(db, stored_ids)
+        except DB_UNAVAILABLE_ERRORS:
+            await db.rollback()
+            stored_frames = {}
+        for match_id, row in stored_frames.items():
+            arrays_by_match[match_id] = decode_frames(row.frame_count, row.data)
+
+    return {match_id: with_lane(summary, arrays_by_match.get(match_id)) for match_id, summary in summaries.items()}
+
+
+def _apply_timeline(
+    recent_matches: List[Dict[str, Any]],
+    summaries: Dict[str, Dict[str, Any]],
 ) -> List[Dict[str, Any]]:
-    if not recent_matches:
-        return recent_matches
-
-    match_ids_set = set(match_ids)
-    match_map = {m.get("match_id"): m for m in recent_matches if m.get("match_id")}
-
-    async with httpx.AsyncClient() as client:
-        tasks = [
-            riot_api.get_match_timeline(
-                match_id=match_id,
-                region=region,
-                platform=platform,
-                client=client,
-            )
-            for match_id in match_ids
-        ]
-        timeline_results = await asyncio.gather(*tasks, return_exceptions=True)
-
-    for match_id, timeline in zip(match_ids, timeline_results):
-        if match_id not in match_ids_set:
-            continue
-        if not isinstance(timeline, dict):
-            continue
-        if match_id in match_map:
-            match_map[match_id]["timeline"] = summarize_timeline(timeline, puuid)
-
+    for match in recent_matches:
+        summary = summaries.get(match.get("match_id"))
+        if summary:
+            match["timeline"] = summary
     return recent_matches
 
 
@@ -302,6 +632,7 @@ def _summarize_early_game(recent_matches: List[Dict[str, Any]]) -> Optional[Dict
     early_assists = []
     first_obj = 0
     tracked = 0
+    lane_rows = []
 
     for match in recent_matches:
         timeline = match.get("timeline")
@@ -313,11 +644,13 @@ def _summarize_early_game(recent_matches: List[Dict[str, Any]]) -> Optional[Dict
         early_assists.append(timeline.get("early_assists", 0))
         if timeline.get("first_objective_participation"):
             first_obj += 1
+        if timeline.get("lane"):
+            lane_rows.append([timeline["lane"].get(key, np.nan) for key in LANE_DIFF_KEYS])
 
     if tracked == 0:
         return None
 
-    return {
+    summary = {
         "tracked_matches": tracked,
         "avg_early_kills": round(sum(early_kills) / tracked, 2),
         "avg_early_deaths": round(sum(early_deaths) / tracked, 2),
@@ -325,40 +658,13 @@ def _summarize_early_game(recent_matches: List[Dict[str, Any]]) -> Optional[Dict
         "first_objective_participation_rate": round(first_obj / tracked, 3),
     }
 
+    if lane_rows:
+        lane = np.array(lane_rows, dtype=float)
+        counts = np.sum(~np.isnan(lane), axis=0)
+        sums = np.nansum(lane, axis=0)
+        summary["lane_tracked_matches"] = len(lane_rows)
+        for key, total, count in zip(LANE_DIFF_KEYS, sums, counts):
+            if count:
+                summary[f"avg_{key}"] = round(float(total / count), 1)
 
-def _persist_match_history(
-    db: Session,
-    player_id: int,
-    match_details: List[Dict[str, Any]],
-    puuid: str,
-) -> None:
-    for match in match_details:
-        info = match.get("info", {})
-        participants = info.get("participants", [])
-        participant = next((p for p in participants if p.get("puuid") == puuid), None)
-        if not participant:
-            continue
-
-        game_creation_ms = info.get("gameCreation")
-        game_creation = None
-        if isinstance(game_creation_ms, (int, float)) and game_creation_ms > 0:
-            game_creation = datetime.fromtimestamp(game_creation_ms / 1000, tz=timezone.utc)
-
-        crud.create_or_update_match_history(
-            db=db,
-            player_id=player_id,
-            match_id=match.get("metadata", {}).get("matchId", "UNKNOWN"),
-            game_mode=info.get("gameMode", "UNKNOWN"),
-            game_duration=info.get("gameDuration", 0),
-            game_creation=game_creation,
-            champion_name=participant.get("championName", "Unknown"),
-            kills=participant.get("kills", 0),
-            deaths=participant.get("deaths", 0),
-            assists=participant.get("assists", 0),
-            win=bool(participant.get("win", False)),
-            total_damage=participant.get("totalDamageDealtToChampions", 0),
-            gold_earned=participant.get("goldEarned", 0),
-            cs=participant.get("totalMinionsKilled", 0),
-            vision_score=participant.get("visionScore", 0),
-            raw_data=match,
-        )
+    return summary
@@ -1,48 +1,20 @@
 """
 LCU API endpoints - локальное подключение к League Client
 """
-import httpx
-import psutil
-import re
-import base64
 from fastapi import APIRouter, HTTPException
 from typing import Dict, Any, Optional
 
+from app.services.lcu_client import lcu_connection
+
 router = APIRouter()
 
 
 def get_lcu_connection_info() -> Optional[Dict[str, Any]]:
     """
     Получить port и token из запущенного League Client
+    (кэшируется; пересканирование только при смене lockfile / смерти процесса)
     """
-    for process in psutil.process_iter(['name', 'cmdline']):
-        try:
-            if process.info['name'] in ['LeagueClientUx.exe', 'LeagueClientUx']:
-                cmdline = ' '.join(process.info['cmdline'])
-                
-                # Извлекаем port
-                port_match = re.search(r'--app-port=(\d+)', cmdline)
-                # Извлекаем token
-                token_match = re.search(r'--remoting-auth-token=([\w-]+)', cmdline)
-                
-                if port_match and token_match:
-                    port = port_match.group(1)
-                    token = token_match.group(1)
-                    
-                    # Создаём basic auth
-                    auth = base64.b64encode(f"riot:{token}".encode()).decode()
-                    
-                    return {
-                        "port": port,
-                        "token": token,
-                        "base_url": f"https://127.0.0.1:{port}",
-                        "auth_header": f"Basic {auth}"
-                    }
-        
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            continue
-    
-    return None
+    return lcu_connection.info()
 
 
 @router.get("/connection-info")
@@ -78,24 +50,21 @@ async def get_current_summoner():
             detail="League Client not running"
         )
     
-    url = f"{lcu_info['base_url']}/lol-summoner/v1/current-summoner"
-    
     try:
-        async with httpx.AsyncClient(verify=False) as client:
-            response = await client.get(
-                url,
-                headers={"Authorization": lcu_info["auth_header"]},
-                timeout=5.0
+        response = await lcu_connection.get("/lol-summoner/v1/current-summoner")
+        if response is None:
+            raise HTTPException(status_code=404, detail="League Client not running")
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="Failed to get summoner data from LCU"
             )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="Failed to get summoner data from LCU"
-                )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
@@ -113,60 +82,57 @@ async def get_ranked_stats():
             detail="League Client not running"
         )
     
-    url = f"{lcu_info['base_url']}/lol-ranked/v1/current-ranked-stats"
-    
     try:
-        async with httpx.AsyncClient(verify=False) as client:
-            response = await client.get(
-                url,
-                headers={"Authorization": lcu_info["auth_header"]},
-                timeout=5.0
-            )
+        response = await lcu_connection.get("/lol-ranked/v1/current-ranked-stats")
+        if response is None:
+            raise HTTPException(status_code=404, detail="League Client not running")
+        
+        if response.status_code == 200:
+            data = response.json()
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Извлекаем ranked solo/duo данные
-                queues = data.get("queues", [])
-                
-                result = {
-                    "ranked_solo": None,
-                    "ranked_flex": None
-                }
+            # Извлекаем ranked solo/duo данные
+            queues = data.get("queues", [])
+            
+            result = {
+                "ranked_solo": None,
+                "ranked_flex": None
+            }
+            
+            for queue in queues:
+                queue_type = queue.get("queueType")
                 
-                for queue in queues:
-                    queue_type = queue.get("queueType")
-                    
-                    if queue_type == "RANKED_SOLO_5x5":
-                        result["ranked_solo"] = {
-                            "tier": queue.get("tier"),
-                            "rank": queue.get("division"),
-                            "lp": queue.get("leaguePoints", 0),
-                            "wins": queue.get("wins", 0),
-                            "losses": queue.get("losses", 0),
-                            "total_games": queue.get("wins", 0) + queue.get("losses", 0),
-                            "winrate": round((queue.get("wins", 0) / (queue.get("wins", 0) + queue.get("losses", 0))) * 100, 1) if (queue.get("wins", 0) + queue.get("losses", 0)) > 0 else 0
-                        }
-                    
-                    elif queue_type == "RANKED_FLEX_SR":
-                        result["ranked_flex"] = {
-                            "tier": queue.get("tier"),
-                            "rank": queue.get("division"),
-                            "lp": queue.get("leaguePoints", 0),
-                            "wins": queue.get("wins", 0),
-                            "losses": queue.get("losses", 0),
-                            "total_games": queue.get("wins", 0) + queue.get("losses", 0),
-                            "winrate": round((queue.get("wins", 0) / (queue.get("wins", 0) + queue.get("losses", 0))) * 100, 1) if (queue.get("wins", 0) + queue.get("losses", 0)) > 0 else 0
-                        }
+                if queue_type == "RANKED_SOLO_5x5":
+                    result["ranked_solo"] = {
+                        "tier": queue.get("tier"),
+                        "rank": queue.get("division"),
+                        "lp": queue.get("leaguePoints", 0),
+                        "wins": queue.get("wins", 0),
+                        "losses": queue.get("losses", 0),
+                        "total_games": queue.get("wins", 0) + queue.get("losses", 0),
+                        "winrate": round((queue.get("wins", 0) / (queue.get("wins", 0) + queue.get("losses", 0))) * 100, 1) if (queue.get("wins", 0) + queue.get("losses", 0)) > 0 else 0
+                    }
                 
-                return result
+                elif queue_type == "RANKED_FLEX_SR":
+                    result["ranked_flex"] = {
+                        "tier": queue.get("tier"),
+                        "rank": queue.get("division"),
+                        "lp": queue.get("leaguePoints", 0),
+                        "wins": queue.get("wins", 0),
+                        "losses": queue.get("losses", 0),
+                        "total_games": queue.get("wins", 0) + queue.get("losses", 0),
+                        "winrate": round((queue.get("wins", 0) / (queue.get("wins", 0) + queue.get("losses", 0))) * 100, 1) if (queue.get("wins", 0) + queue.get("losses", 0)) > 0 else 0
+                    }
             
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="Failed to get ranked stats from LCU"
-                )
+            return result
+        
+        else:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="Failed to get ranked stats from LCU"
+            )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
@@ -1,29 +1,27 @@
-from typing import Any, Dict, List
-import asyncio
-import httpx
+from typing import Any, Dict, Optional
 import logging
 
 from fastapi import APIRouter, Query, HTTPException
 
-from app.services.riot_api import RiotAPIService, RiotAPIError
+from app.services.apex_index import RANKED_QUEUES, apex_index, is_ranked_target
+from app.services.global_ladder import global_ladder
+from app.services.ladder import decode_puuid_cursor
+from app.services.leaderboard_cache import leaderboards
+from app.services.riot_api import RiotAPIError
 
 router = APIRouter()
-riot_api = RiotAPIService()
 logger = logging.getLogger(__name__)
 
-REGION_MAP = {
-    "euw1": "europe",
-    "eun1": "europe",
-    "ru": "europe",
-    "tr1": "europe",
-    "na1": "americas",
-    "br1": "americas",
-    "la1": "americas",
-    "la2": "americas",
-    "oc1": "sea",
-    "kr": "asia",
-    "jp1": "asia",
-}
+
+def _check_target(platform: str, queue: str) -> None:
+    # Неизвестные пары не должны попадать в фоновый refresh (квота Riot)
+    if not is_ranked_target(platform, queue):
+        raise HTTPException(status_code=400, detail=f"Unknown platform or queue: {platform}/{queue}")
+
+
+def _check_queue(queue: str) -> None:
+    if queue not in RANKED_QUEUES:
+        raise HTTPException(status_code=400, detail=f"Unknown ranked queue: {queue}")
 
 
 @router.get("/leaderboard")
@@ -35,201 +33,118 @@ async def get_leaderboard(
 ) -> Dict[str, Any]:
     """
     Get challenger/grandmaster/master leaderboard for a platform.
-    Returns detailed player information including Riot IDs and profile icons.
+    Served from the materialized board (refreshed in the background);
+    generated_at tells how old the snapshot is.
     """
+    _check_target(platform, queue)
     try:
-        league = await riot_api.get_challenger_league(platform=platform, queue=queue)
+        board = await leaderboards.ensure(platform=platform, queue=queue)
     except RiotAPIError as e:
-        logger.error(f"Failed to fetch challenger league: {e}")
+        logger.error(f"Failed to build leaderboard: {e}")
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
-        logger.error(f"Unexpected error fetching challenger league: {e}")
+        logger.error(f"Unexpected error building leaderboard: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-    entries = league.get("entries", [])
-    entries_sorted = sorted(entries, key=lambda e: e.get("leaguePoints", 0), reverse=True)
-    combined_entries = [(entry, "CHALLENGER") for entry in entries_sorted]
-
-    # Добавляем Grandmaster если не хватает
-    if len(combined_entries) < limit:
-        try:
-            gm_league = await riot_api.get_grandmaster_league(platform=platform, queue=queue)
-            gm_entries = sorted(
-                gm_league.get("entries", []), key=lambda e: e.get("leaguePoints", 0), reverse=True
-            )
-            combined_entries.extend([(entry, "GRANDMASTER") for entry in gm_entries])
-        except RiotAPIError as e:
-            logger.warning(f"Failed to fetch grandmaster league: {e}")
-
-    # Добавляем Master если не хватает
-    if len(combined_entries) < limit:
-        try:
-            master_league = await riot_api.get_master_league(platform=platform, queue=queue)
-            master_entries = sorted(
-                master_league.get("entries", []), key=lambda e: e.get("leaguePoints", 0), reverse=True
-            )
-            combined_entries.extend([(entry, "MASTER") for entry in master_entries])
-        except RiotAPIError as e:
-            logger.warning(f"Failed to fetch master league: {e}")
-
-    combined_entries = combined_entries[:limit]
-
-    region = REGION_MAP.get(platform, "europe")
-
-    summoner_errors = 0
-    account_errors = 0
-    raw_entries = [entry for entry, _ in combined_entries[:min(limit, 3)]] if debug else []
-
-    async with httpx.AsyncClient() as client:
-        # Ограничение одновременных запросов
-        sem = asyncio.Semaphore(5)
-
-        async def _fetch_summoner_by_puuid(puuid: str, retry_count: int = 2):
-            if not puuid:
-                return None
-            async with sem:
-                for attempt in range(retry_count):
-                    try:
-                        return await riot_api.get_summoner_by_puuid(
-                            puuid=puuid, platform=platform
-                        )
-                    except RiotAPIError as exc:
-                        if exc.status_code == 404:
-                            return None
-                        if attempt < retry_count - 1:
-                            await asyncio.sleep(0.2 * (attempt + 1))
-                        else:
-                            if debug:
-                                return {"_error": str(exc)}
-                            return None
-                    except Exception as exc:
-                        logger.error(f"Unexpected error fetching summoner {puuid}: {exc}")
-                        if debug:
-                            return {"_error": str(exc)}
-                        return None
-                return None
-
-        async def _fetch_account(puuid: str, retry_count: int = 2):
-            if not puuid:
-                return None
-            async with sem:
-                for attempt in range(retry_count):
-                    try:
-                        return await riot_api.get_account_by_puuid(
-                            puuid=puuid,
-                            region=region,
-                            platform=platform,
-                            client=client,
-                        )
-                    except RiotAPIError as exc:
-                        if exc.status_code == 404:
-                            return None
-                        if attempt < retry_count - 1:
-                            await asyncio.sleep(0.2 * (attempt + 1))
-                        else:
-                            if debug:
-                                return {"_error": str(exc)}
-                            return None
-                    except Exception as exc:
-                        logger.error(f"Unexpected error fetching account {puuid}: {exc}")
-                        if debug:
-                            return {"_error": str(exc)}
-                        return None
-                return None
-
-        # Получаем summoner данные
-        summoner_tasks = [
-            _fetch_summoner_by_puuid(entry.get("puuid", "")) for entry, _ in combined_entries
-        ]
-        summoner_results = await asyncio.gather(*summoner_tasks, return_exceptions=False)
-        
-        # Получаем account данные
-        account_tasks = []
-        account_indexes = []
-        accounts: List[Dict[str, Any]] = [{} for _ in summoner_results]
-        
-        for idx, (entry, _) in enumerate(combined_entries):
-            entry_puuid = entry.get("puuid")
-            if entry_puuid:
-                account_tasks.append(_fetch_account(entry_puuid))
-                account_indexes.append(idx)
-
-        account_error_samples = []
-        if account_tasks:
-            account_results = await asyncio.gather(*account_tasks, return_exceptions=False)
-            for idx, account in zip(account_indexes, account_results):
-                if isinstance(account, dict):
-                    if account.get("_error"):
-                        account_errors += 1
-                        if debug and len(account_error_samples) < 3:
-                            account_error_samples.append(account.get("_error"))
-                    else:
-                        accounts[idx] = account
-                elif account is None:
-                    account_errors += 1
-                    
-        summoner_error_samples = []
-        for summoner in summoner_results:
-            if summoner is None:
-                summoner_errors += 1
-            elif isinstance(summoner, dict) and summoner.get("_error"):
-                summoner_errors += 1
-                if debug and len(summoner_error_samples) < 3:
-                    summoner_error_samples.append(summoner.get("_error"))
-
-    # Формируем результат
-    players: List[Dict[str, Any]] = []
-    for (entry, tier), summoner, account in zip(combined_entries, summoner_results, accounts):
-        wins = entry.get("wins", 0)
-        losses = entry.get("losses", 0)
-        total = max(wins + losses, 1)
-        profile_icon_id = None
-        puuid = entry.get("puuid")
-        summoner_name = entry.get("summonerName", "Unknown")
-        riot_id = None
-        
-        if isinstance(summoner, dict) and not summoner.get("_error"):
-            profile_icon_id = summoner.get("profileIconId")
-            summoner_name = summoner.get("name", summoner_name)
-            
-        if isinstance(account, dict) and not account.get("_error"):
-            game_name = account.get("gameName")
-            tag_line = account.get("tagLine")
-            if game_name and tag_line:
-                riot_id = f"{game_name}#{tag_line}"
-
-        players.append(
-            {
-                "summoner_name": summoner_name,
-                "riot_id": riot_id,
-                "league_points": entry.get("leaguePoints", 0),
-                "wins": wins,
-                "losses": losses,
-                "winrate": round((wins / total) * 100, 1),
-                "hot_streak": entry.get("hotStreak", False),
-                "veteran": entry.get("veteran", False),
-                "rank": entry.get("rank"),
-                "tier": tier,
-                "profile_icon_id": profile_icon_id,
-                "puuid": puuid,
-            }
-        )
-
     response = {
+        "platform": board["platform"],
+        "queue": board["queue"],
+        "tier": board["tier"],
+        "name": board["name"],
+        "players": board["players"][:limit],
+        "generated_at": board["generated_at"],
+    }
+
+    if debug:
+        response["debug"] = board["build"]
+
+    return response
+
+
+@router.get("/leaderboard/ladder")
+async def get_apex_ladder(
+    platform: str = Query("euw1", description="Riot platform shard, e.g. euw1 or ru"),
+    queue: str = Query("RANKED_SOLO_5x5", description="Ranked queue type"),
+    offset: int = Query(0, ge=0, description="Start position (ignored when cursor is set)"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of entries to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+) -> Dict[str, Any]:
+    """
+    Full Master+ ladder of one platform, pre-sorted on refresh.
+    Entries carry their ladder position; paginate with offset or next_cursor.
+    """
+    _check_target(platform, queue)
+    try:
+        after = decode_puuid_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not await apex_index.ensure(platform, queue):
+        raise HTTPException(status_code=503, detail="Apex ladder is not available yet")
+    players, next_cursor, total = apex_index.ladder_page(platform, queue, offset, limit, after)
+    return {
         "platform": platform,
         "queue": queue,
-        "tier": league.get("tier", "CHALLENGER"),
-        "name": league.get("name", "Challenger"),
+        "total": total,
         "players": players,
+        "next_cursor": next_cursor,
     }
-    
-    if debug:
-        response["debug"] = {
-            "summoner_errors": summoner_errors,
-            "account_errors": account_errors,
-            "summoner_error_samples": summoner_error_samples,
-            "account_error_samples": account_error_samples,
-            "raw_entries": raw_entries,
-        }
-        
-    return response
+
+
+@router.get("/leaderboard/ladder/rank/{puuid}")
+async def get_apex_rank(
+    puuid: str,
+    platform: str = Query("euw1", description="Riot platform shard, e.g. euw1 or ru"),
+    queue: str = Query("RANKED_SOLO_5x5", description="Ranked queue type"),
+) -> Dict[str, Any]:
+    """Ladder position of one player on a platform (404 below Master)."""
+    _check_target(platform, queue)
+    if not await apex_index.ensure(platform, queue):
+        raise HTTPException(status_code=503, detail="Apex ladder is not available yet")
+    entry = apex_index.rank_of(puuid, platform, queue)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Player is not on the apex ladder")
+    return entry
+
+
+@router.get("/leaderboard/global")
+async def get_global_leaderboard(
+    queue: str = Query("RANKED_SOLO_5x5", description="Ranked queue type"),
+    limit: int = Query(100, ge=1, le=500, description="Number of entries to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+) -> Dict[str, Any]:
+    """
+    Cross-platform apex ladder (all configured platforms merged by ladder score).
+    Paginate with next_cursor; ranks are global and shared on equal score.
+    """
+    _check_queue(queue)
+    try:
+        after = decode_puuid_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    ladder = await global_ladder.ensure(queue=queue)
+    players, next_cursor = global_ladder.page(queue, limit, after)
+    return {
+        "queue": queue,
+        "platforms": ladder["platforms"],
+        "failed_platforms": ladder["failed_platforms"],
+        "total": len(ladder["entries"]),
+        "players": players,
+        "next_cursor": next_cursor,
+        "generated_at": ladder["generated_at"],
+    }
+
+
+@router.get("/leaderboard/global/rank/{puuid}")
+async def get_global_rank(
+    puuid: str,
+    queue: str = Query("RANKED_SOLO_5x5", description="Ranked queue type"),
+) -> Dict[str, Any]:
+    """Global rank of one player (404 when outside the global ladder)."""
+    _check_queue(queue)
+    ladder = await global_ladder.ensure(queue=queue)
+    entry = global_ladder.rank_of(puuid, queue)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Player is not on the global ladder")
+    return {**entry, "total": len(ladder["entries"]), "generated_at": ladder["generated_at"]}
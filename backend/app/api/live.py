@@ -1,12 +1,16 @@
 """
 Live Game API - информация о текущем матче
 """
-import httpx
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List, Optional
-from app.services.riot_api import RiotAPIService, RiotAPIError
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncIterator, Optional
+from app.config import settings
+from app.services.live_watch import live_game_state, live_watch
+from app.services.lobby import enrich_lobby
+from app.services.riot_api import RiotAPIError, riot_api
 
-riot_api = RiotAPIService()
 router = APIRouter()
 
 
@@ -15,7 +19,9 @@ async def get_live_game(
     game_name: str,
     tag_line: str,
     region: str = "europe",
-    platform: str = "ru"
+    platform: str = "ru",
+    enrich: bool = False,
+    budget_ms: Optional[int] = Query(None, ge=50, le=10000, description="Enrichment budget; defaults to LIVE_ENRICH_BUDGET_MS"),
 ):
     """
     Получить информацию о текущем матче игрока
@@ -25,6 +31,8 @@ async def get_live_game(
         tag_line: Тег игрока
         region: Регион для Account API
         platform: Платформа для Spectator API
+        enrich: Добавить ranked / champion / spells / recent_form каждому участнику
+                (всё параллельно, в пределах budget_ms)
     
     Returns:
         {
@@ -56,88 +64,19 @@ async def get_live_game(
         )
         puuid = account_data["puuid"]
         
-        # 2. Получаем summoner данные
-        summoner_data = await riot_api.get_summoner_by_puuid(
-            puuid=puuid,
-            platform=platform
-        )
-        
-        # Для spectator API нужен encrypted summoner ID (может отсутствовать на RU)
-        summoner_id = summoner_data.get("id")
-        
-        if not summoner_id:
-            # Попробуем через PUUID (Spectator-v5)
-            platform_base = f"https://{platform}.api.riotgames.com"
-            endpoint = f"/lol/spectator/v5/active-games/by-summoner/{puuid}"
-            url = f"{platform_base}{endpoint}"
-        else:
-            # Старый метод через summoner ID (Spectator-v4)
-            platform_base = f"https://{platform}.api.riotgames.com"
-            endpoint = f"/lol/spectator/v4/active-games/by-summoner/{summoner_id}"
-            url = f"{platform_base}{endpoint}"
-        
-        # 3. Запрос к Spectator API
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url,
-                headers={"X-Riot-Token": riot_api.api_key},
-                timeout=10.0
-            )
-            
-            if response.status_code == 404:
-                return {
-                    "game_found": False,
-                    "message": f"{game_name}#{tag_line} is not in game right now"
-                }
-            
-            if response.status_code != 200:
-                raise RiotAPIError(response.status_code, response.text)
-            
-            game_data = response.json()
-            
-            # 4. Парсим данные игры
-            participants_raw = game_data.get("participants", [])
-            
-            participants_info = []
-            blue_team = []
-            red_team = []
-            
-            for p in participants_raw:
-                player_info = {
-                    "summoner_name": p.get("riotId", p.get("summonerName", "Unknown")),
-                    "puuid": p.get("puuid"),
-                    "champion_id": p.get("championId"),
-                    "team_id": p.get("teamId"),
-                    "spell1": p.get("spell1Id"),
-                    "spell2": p.get("spell2Id"),
-                    "perks": {
-                        "primary_style": p.get("perks", {}).get("perkStyle"),
-                        "sub_style": p.get("perks", {}).get("perkSubStyle")
-                    }
-                }
-                
-                participants_info.append(player_info)
-                
-                if p.get("teamId") == 100:
-                    blue_team.append(player_info)
-                else:
-                    red_team.append(player_info)
-            
+        # 2. Spectator-v5 by PUUID (summonerId не нужен)
+        game_data = await riot_api.get_active_game(puuid=puuid, platform=platform)
+        if game_data is None:
             return {
-                "game_found": True,
-                "game_mode": game_data.get("gameMode"),
-                "game_type": game_data.get("gameType"),
-                "game_queue_id": game_data.get("gameQueueConfigId"),
-                "map_id": game_data.get("mapId"),
-                "game_start_time": game_data.get("gameStartTime"),
-                "game_length": game_data.get("gameLength"),
-                "participants": participants_info,
-                "teams": {
-                    "blue": blue_team,
-                    "red": red_team
-                },
-                "banned_champions": game_data.get("bannedChampions", [])
+                "game_found": False,
+                "message": f"{game_name}#{tag_line} is not in game right now"
             }
+        
+        # 3. Парсим данные игры
+        state = live_game_state(game_data)
+        if enrich:
+            await enrich_lobby(state, platform, budget_ms or settings.live_enrich_budget_ms)
+        return state
     
     except RiotAPIError as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
@@ -145,6 +84,87 @@ async def get_live_game(
         raise HTTPException(status_code=500, detail=f"Live game error: {str(e)}")
 
 
+async def _resolve_watch_puuid(
+    puuid: Optional[str],
+    game_name: Optional[str],
+    tag_line: Optional[str],
+    region: str,
+) -> str:
+    if puuid:
+        return puuid
+    if not (game_name and tag_line):
+        raise RiotAPIError(400, "Pass puuid or game_name + tag_line")
+    account_data = await riot_api.get_account_by_riot_id(game_name=game_name, tag_line=tag_line, region=region)
+    return account_data["puuid"]
+
+
+@router.websocket("/watch")
+async def watch_live_game_ws(
+    websocket: WebSocket,
+    puuid: Optional[str] = None,
+    game_name: Optional[str] = None,
+    tag_line: Optional[str] = None,
+    region: str = "europe",
+    platform: str = "ru",
+):
+    """
+    Подписка на текущий матч игрока. Сначала {"event": "snapshot", ...},
+    затем {"event": "diff", "data": {изменившиеся поля}} только при изменениях.
+    Все зрители одного игрока делят один poller.
+    """
+    await websocket.accept()
+    try:
+        watched = await _resolve_watch_puuid(puuid, game_name, tag_line, region)
+    except RiotAPIError as e:
+        await websocket.send_json({"event": "error", "data": {"status_code": e.status_code, "detail": e.message}})
+        await websocket.close()
+        return
+
+    async def _forward(queue: asyncio.Queue) -> None:
+        while True:
+            event, data = await queue.get()
+            await websocket.send_json({"event": event, "data": data})
+
+    async with live_watch.subscribe(watched, platform) as queue:
+        forward = asyncio.create_task(_forward(queue))
+        try:
+            # Клиент ничего не шлёт; receive нужен, чтобы заметить disconnect.
+            # receive_text() падает KeyError на бинарном кадре — читаем сырые сообщения и пропускаем их
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+        except WebSocketDisconnect:
+            pass
+        finally:
+            forward.cancel()
+
+
+@router.get("/watch/stream")
+async def watch_live_game_sse(
+    puuid: Optional[str] = None,
+    game_name: Optional[str] = None,
+    tag_line: Optional[str] = None,
+    region: str = "europe",
+    platform: str = "ru",
+):
+    """То же, что /watch, но через SSE (event: snapshot|diff|error)"""
+    try:
+        watched = await _resolve_watch_puuid(puuid, game_name, tag_line, region)
+    except RiotAPIError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+    async def _sse() -> AsyncIterator[str]:
+        async for event, data in live_watch.events(watched, platform):
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    return StreamingResponse(
+        _sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/health")
 async def live_health():
-    return {"status": "ok", "endpoint": "/api/live/game"}
+    return {"status": "ok", "endpoint": "/api/live/game", "watch": live_watch.stats()}
@@ -3,9 +3,8 @@ Match API endpoints
 """
 from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
-from app.services.riot_api import RiotAPIService, RiotAPIError
+from app.services.riot_api import RiotAPIError, riot_api
 
-riot_api = RiotAPIService()
 router = APIRouter()
 
 
@@ -6,10 +6,9 @@ from typing import Any, Dict, Optional, List
 import httpx
 from fastapi import APIRouter, Query, HTTPException
 
-from app.services.riot_api import RiotAPIService, RiotAPIError
+from app.services.riot_api import RiotAPIService, RiotAPIError, riot_api
 
 router = APIRouter()
-riot_api = RiotAPIService()
 
 PLATFORM_TO_REGION = RiotAPIService.PLATFORM_TO_REGION
 
@@ -1,67 +1,153 @@
 """
 Players API endpoints - работа с данными игроков из БД
 """
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
-from sqlalchemy import desc, func
+import json
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import AsyncIterator, List, Dict, Any, Optional
+from sqlalchemy import and_, desc, func, select, tuple_
 
-from app.database import get_db
+from app.database import get_async_db, AsyncSessionLocal
 from app import crud
 from app.models import Player, RankedStats
+from app.services.ladder import decode_cursor, encode_cursor, ladder_position
 
 
 router = APIRouter(prefix="/players", tags=["players"])
 
+EXPORT_BATCH_SIZE = 1000
 
-@router.get("/", response_model=List[Dict[str, Any]])
-async def get_all_players(db: Session = Depends(get_db)):
-    """Получить список всех игроков из БД"""
-    players = db.query(Player).all()
-    
-    result = []
-    for player in players:
-        ranked_stats = db.query(RankedStats).filter(RankedStats.player_id == player.id).first()
-        
-        player_data = {
-            "id": player.id,
-            "puuid": player.puuid,
-            "game_name": player.game_name,
-            "tag_line": player.tag_line,
-            "summoner_level": player.summoner_level,
-            "region": player.region,
-            "platform": player.platform,
-            "updated_at": player.updated_at.isoformat() if player.updated_at else None
 
+def _players_page_query(
+    after_id: Optional[int],
+    limit: int,
+    platform: Optional[str],
+    tier: Optional[str],
+    queue_type: str,
+):
+    """Одна страница игроков с рангом одним JOIN; keyset по Player.id (PK-индекс)"""
+    query = select(Player, RankedStats).outerjoin(
+        RankedStats,
+        and_(RankedStats.player_id == Player.id, RankedStats.queue_type == queue_type),
+    )
+    if after_id is not None:
+        query = query.where(Player.id > after_id)
+    if platform:
+        query = query.where(Player.platform == platform)
+    if tier:
+        query = query.where(RankedStats.tier == tier.upper())
+    return query.order_by(Player.id).limit(limit)
+
+
+def _player_summary(player: Player, ranked_stats: Optional[RankedStats]) -> Dict[str, Any]:
+    player_data = {
+        "id": player.id,
+        "puuid": player.puuid,
+        "game_name": player.game_name,
+        "tag_line": player.tag_line,
+        "summoner_level": player.summoner_level,
+        "region": player.region,
+        "platform": player.platform,
+        "updated_at": player.updated_at.isoformat() if player.updated_at else None
+    }
 
+    if ranked_stats:
+        player_data["current_rank"] = {
+            "tier": ranked_stats.tier,
+            "rank": ranked_stats.rank,
+            "lp": ranked_stats.lp,
+            "winrate": ranked_stats.winrate
         }
-        
-        if ranked_stats:
-            player_data["current_rank"] = {
-                "tier": ranked_stats.tier,
-                "rank": ranked_stats.rank,
-                "lp": ranked_stats.lp,
-                "winrate": ranked_stats.winrate
-            }
-        else:
-            player_data["current_rank"] = None
-        
-        result.append(player_data)
-    
-    return result
+    else:
+        player_data["current_rank"] = None
+    return player_data
+
+
+def _ranked_entry(stat: RankedStats) -> Dict[str, Any]:
+    return {
+        "queue_type": stat.queue_type,
+        "tier": stat.tier,
+        "rank": stat.rank,
+        "lp": stat.lp,
+        "wins": stat.wins,
+        "losses": stat.losses,
+        "total_games": stat.wins + stat.losses,
+        "winrate": stat.winrate,
+        "data_source": stat.data_source,
+        "updated_at": stat.updated_at.isoformat() if stat.updated_at else None
+    }
+
+
+@router.get("/", response_model=List[Dict[str, Any]])
+async def get_all_players(
+    response: Response,
+    after_id: Optional[int] = Query(None, description="Keyset cursor: last id from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    platform: Optional[str] = Query(None, description="Filter by platform, e.g. euw1"),
+    tier: Optional[str] = Query(None, description="Filter by tier in queue_type, e.g. DIAMOND"),
+    queue_type: str = Query("RANKED_SOLO_5x5"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Список игроков из БД, постранично.
+    Следующая страница: after_id из заголовка X-Next-After-Id.
+    """
+    rows = (await db.execute(_players_page_query(after_id, limit, platform, tier, queue_type))).all()
+    if len(rows) == limit:
+        response.headers["X-Next-After-Id"] = str(rows[-1][0].id)
+    return [_player_summary(player, ranked_stats) for player, ranked_stats in rows]
+
+
+@router.get("/export")
+async def export_players(
+    platform: Optional[str] = Query(None),
+    tier: Optional[str] = Query(None),
+    queue_type: str = Query("RANKED_SOLO_5x5"),
+):
+    """Экспорт всех игроков потоковым JSON-массивом (keyset-пачки, постоянная память)"""
+    return StreamingResponse(
+        _export_players_json(platform, tier, queue_type),
+        media_type="application/json",
+    )
+
+
+async def _export_players_json(
+    platform: Optional[str],
+    tier: Optional[str],
+    queue_type: str,
+) -> AsyncIterator[str]:
+    # Own session: the request-scoped one is closed before the body is streamed.
+    async with AsyncSessionLocal() as db:
+        yield "["
+        after_id = None
+        first = True
+        while True:
+            query = _players_page_query(after_id, EXPORT_BATCH_SIZE, platform, tier, queue_type)
+            rows = (await db.execute(query)).all()
+            for player, ranked_stats in rows:
+                yield ("" if first else ",") + json.dumps(_player_summary(player, ranked_stats))
+                first = False
+            if len(rows) < EXPORT_BATCH_SIZE:
+                break
+            after_id = rows[-1][0].id
+            db.expunge_all()
+        yield "]"
 
 
 @router.get("/{puuid}", response_model=Dict[str, Any])
-async def get_player(puuid: str, db: Session = Depends(get_db)):
-    """Получить информацию об игроке по PUUID"""
-    player = db.query(Player).filter(Player.puuid == puuid).first()
+async def get_player(puuid: str, db: AsyncSession = Depends(get_async_db)):
+    """Получить информацию об игроке по PUUID (игрок + ranked одним запросом)"""
+    result = await db.execute(
+        select(Player).options(joinedload(Player.ranked_stats)).where(Player.puuid == puuid)
+    )
+    player = result.unique().scalars().first()
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
     
-    # Все ranked статистики игрока
-    ranked_stats = db.query(RankedStats).filter(RankedStats.player_id == player.id).all()
-    
-    result = {
+    return {
         "id": player.id,
         "puuid": player.puuid,
         "game_name": player.game_name,
@@ -70,40 +156,27 @@ async def get_player(puuid: str, db: Session = Depends(get_db)):
         "profile_icon_id": player.profile_icon_id,
         "region": player.region,
         "platform": player.platform,
-        "created_at": player.created_at.isoformat(),
-        "updated_at": player.updated_at.isoformat(),
-        "ranked_stats": []
+        "created_at": player.created_at.isoformat() if player.created_at else None,
+        "updated_at": player.updated_at.isoformat() if player.updated_at else None,
+        "ranked_stats": [_ranked_entry(stat) for stat in player.ranked_stats]
     }
-    
-    for stat in ranked_stats:
-        result["ranked_stats"].append({
-            "queue_type": stat.queue_type,
-            "tier": stat.tier,
-            "rank": stat.rank,
-            "lp": stat.lp,
-            "wins": stat.wins,
-            "losses": stat.losses,
-            "total_games": stat.wins + stat.losses,
-            "winrate": stat.winrate,
-            "data_source": stat.data_source,
-            "updated_at": stat.updated_at.isoformat() if stat.updated_at else None
-
-        })
-    
-    return result
 
 
 @router.get("/{puuid}/ranked", response_model=List[Dict[str, Any]])
-async def get_player_ranked(puuid: str, db: Session = Depends(get_db)):
-    """Получить ranked статистику игрока"""
-    player = db.query(Player).filter(Player.puuid == puuid).first()
-    if not player:
+async def get_player_ranked(puuid: str, db: AsyncSession = Depends(get_async_db)):
+    """Получить ranked статистику игрока (одним запросом)"""
+    rows = (await db.execute(
+        select(Player.updated_at, RankedStats)
+        .outerjoin(RankedStats, RankedStats.player_id == Player.id)
+        .where(Player.puuid == puuid)
+    )).all()
+    if not rows:
         raise HTTPException(status_code=404, detail="Player not found")
     
-    ranked_stats = db.query(RankedStats).filter(RankedStats.player_id == player.id).all()
-    
     result = []
-    for stat in ranked_stats:
+    for updated_at, stat in rows:
+        if stat is None:
+            continue
         result.append({
             "queue_type": stat.queue_type,
             "tier": stat.tier,
@@ -113,7 +186,7 @@ async def get_player_ranked(puuid: str, db: Session = Depends(get_db)):
             "losses": stat.losses,
             "winrate": stat.winrate,
             "data_source": stat.data_source,
-            "updated_at": player.updated_at.isoformat() if player.updated_at else None
+            "updated_at": updated_at.isoformat() if updated_at else None
 
 
         })
@@ -121,37 +194,98 @@ async def get_player_ranked(puuid: str, db: Session = Depends(get_db)):
     return result
 
 
+@router.get("/{puuid}/lp-history", response_model=Dict[str, Any])
+async def get_player_lp_history(
+    puuid: str,
+    queue_type: str = Query("RANKED_SOLO_5x5"),
+    start: Optional[datetime] = Query(None, description="ISO datetime, inclusive"),
+    end: Optional[datetime] = Query(None, description="ISO datetime, inclusive"),
+    points: int = Query(200, ge=2, le=2000, description="Max points after downsampling"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """История LP для графика: снапшоты за период, прореженные до points точек"""
+    snapshots = await crud.get_ranked_snapshots_async(db, puuid, queue_type, start, end)
+    if snapshots is None:
+        raise HTTPException(status_code=404, detail="Player not found")
+
+    series = []
+    for snapshot in _downsample(snapshots, points):
+        tier, rank, lp = ladder_position(snapshot.ladder_score)
+        series.append({
+            "captured_at": snapshot.captured_at.isoformat() if snapshot.captured_at else None,
+            "tier": tier,
+            "rank": rank,
+            "lp": snapshot.lp if lp is None else lp,
+            "ladder_score": snapshot.ladder_score,
+            "wins": snapshot.wins,
+            "losses": snapshot.losses,
+        })
+    return {"puuid": puuid, "queue_type": queue_type, "total_snapshots": len(snapshots), "series": series}
+
+
+def _downsample(snapshots: List[Any], points: int) -> List[Any]:
+    """Последний снапшот в каждом из points равных временных интервалов (+ первая точка)"""
+    if len(snapshots) <= points:
+        return snapshots
+    first = snapshots[0].captured_at.timestamp()
+    span = max(snapshots[-1].captured_at.timestamp() - first, 1e-9)
+    buckets: Dict[int, Any] = {}
+    for snapshot in snapshots:
+        bucket = min(int((snapshot.captured_at.timestamp() - first) / span * (points - 1)), points - 2)
+        buckets[bucket] = snapshot
+    tail = [buckets[key] for key in sorted(buckets)]
+    return tail if tail[0] is snapshots[0] else [snapshots[0]] + tail
+
+
 @router.get("/leaderboard/", response_model=List[Dict[str, Any]])
-async def get_leaderboard(limit: int = 10, db: Session = Depends(get_db)):
-    """Топ игроков по LP в SoloQ"""
-    # Получаем игроков с их лучшим ranked (SoloQ)
-    leaderboard = db.query(
-        Player,
-        RankedStats.lp.label('lp'),
-        RankedStats.tier.label('tier'),
-        RankedStats.rank.label('rank'),
-        RankedStats.winrate.label('winrate')
-    ).outerjoin(
-        RankedStats, 
-        (Player.id == RankedStats.player_id) & (RankedStats.queue_type == "RANKED_SOLO_5x5")
-    ).order_by(
-        desc(RankedStats.lp),  # Сначала по LP
-        RankedStats.tier,      # Потом по тиру
-        RankedStats.rank       # Потом по дивизиону
-    ).limit(limit).all()
+async def get_leaderboard(
+    response: Response,
+    limit: int = Query(10, ge=1, le=200),
+    queue_type: str = Query("RANKED_SOLO_5x5"),
+    platform: Optional[str] = Query(None, description="Filter by platform, e.g. euw1"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Топ игроков по ladder_score (tier × division × LP).
+    Индекс (queue_type, ladder_score DESC, id DESC) отдаёт страницу без сортировки;
+    следующая страница: cursor из заголовка X-Next-Cursor.
+    """
+    query = select(Player, RankedStats).join(
+        Player, Player.id == RankedStats.player_id
+    ).where(
+        RankedStats.queue_type == queue_type,
+        RankedStats.ladder_score.isnot(None),
+    )
+    if platform:
+        query = query.where(Player.platform == platform)
+    if cursor:
+        try:
+            score, row_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(RankedStats.ladder_score, RankedStats.id) < tuple_(score, row_id))
+    query = query.order_by(desc(RankedStats.ladder_score), desc(RankedStats.id)).limit(limit)
+    leaderboard = (await db.execute(query)).all()
+
+    if len(leaderboard) == limit:
+        last = leaderboard[-1][1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.ladder_score, last.id)
     
     result = []
-    for player, lp, tier, rank, winrate in leaderboard:
+    for player, stats in leaderboard:
         result.append({
             "puuid": player.puuid,
             "game_name": player.game_name,
             "tag_line": player.tag_line,
             "summoner_level": player.summoner_level,
+            "platform": player.platform,
+            "ladder_score": stats.ladder_score,
             "rank": {
-                "tier": tier,
-                "rank": rank,
-                "lp": lp or 0,
-                "winrate": winrate or 0
+                "tier": stats.tier,
+                "rank": stats.rank,
+                "lp": stats.lp or 0,
+                "winrate": stats.winrate or 0
             }
         })
     
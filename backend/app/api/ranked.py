@@ -7,17 +7,17 @@ from __future__ import annotations
 import os
 import httpx
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.exc import OperationalError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, Optional, List
 
-from app.services.riot_api import RiotAPIService, RiotAPIError
-from app.api.lcu import get_lcu_connection_info
-from app.database import get_db
+from app.services.riot_api import RiotAPIError, riot_api
+from app.services.apex_index import apex_entry, apex_index
+from app.services.match_store import backfill_matches, fetch_matches, load_matches, match_id_of
+from app.services.lcu_client import lcu_connection
+from app.database import get_async_db, DB_UNAVAILABLE_ERRORS
 from app import crud
 
 router = APIRouter()
-riot_api = RiotAPIService()
 ENABLE_LCU = os.getenv("ENABLE_LCU", "false").lower() in ("1", "true", "yes")
 
 PLATFORM_TO_REGION = {
@@ -35,17 +35,16 @@ PLATFORM_TO_REGION = {
 
 APEX_TIERS = ["CHALLENGER", "GRANDMASTER", "MASTER"]
 
+RANKED_QUEUE_PREFIX = {420: "solo", 440: "flex"}
+RANKED_COUNTER_FIELDS = ("solo_wins", "solo_losses", "flex_wins", "flex_losses")
+MATCH_HISTORY_FALLBACK_LIMIT = 50
+MATCH_FETCH_CONCURRENCY = 8
 
-async def get_ranked_from_lcu() -> Optional[Dict[str, Any]]:
-    lcu_info = get_lcu_connection_info()
-    if not lcu_info:
-        return None
 
-    url = f"{lcu_info['base_url']}/lol-ranked/v1/current-ranked-stats"
+async def get_ranked_from_lcu() -> Optional[Dict[str, Any]]:
     try:
-        async with httpx.AsyncClient(verify=False) as client:
-            r = await client.get(url, headers={"Authorization": lcu_info["auth_header"]}, timeout=5.0)
-        if r.status_code != 200:
+        r = await lcu_connection.get("/lol-ranked/v1/current-ranked-stats")
+        if r is None or r.status_code != 200:
             return None
 
         data = r.json()
@@ -87,32 +86,28 @@ async def get_ranked_from_lcu() -> Optional[Dict[str, Any]]:
 
 
 async def find_apex_solo_by_puuid(puuid: str, platform: str) -> Optional[Dict[str, Any]]:
-    """SOLO Apex rank by PUUID via league lists."""
+    """
+    SOLO Apex rank by PUUID: dict lookup in the background-refreshed apex index.
+    A platform that is not indexed yet is built on first use; if that build
+    fails, the league lists are scanned directly.
+    """
     if not puuid:
         return None
-
     queue = "RANKED_SOLO_5x5"
+    if await apex_index.ensure(platform, queue):
+        return apex_index.lookup(puuid, platform, queue)
+
     sources = [
         ("CHALLENGER", riot_api.get_challenger_league),
         ("GRANDMASTER", riot_api.get_grandmaster_league),
         ("MASTER", riot_api.get_master_league),
     ]
-
     for tier, getter in sources:
         try:
             league = await getter(platform=platform, queue=queue)
             for e in league.get("entries", []):
                 if e.get("puuid") == puuid:
-                    return {
-                        "tier": tier,
-                        "rank": "I",
-                        "lp": e.get("leaguePoints", 0),
-                        "wins": e.get("wins", 0),
-                        "losses": e.get("losses", 0),
-                        "veteran": e.get("veteran", False),
-                        "hot_streak": e.get("hotStreak", False),
-                        "series": e.get("miniSeries"),
-                    }
+                    return apex_entry(tier, e)
         except Exception:
             continue
 
@@ -133,6 +128,20 @@ async def find_league_entries_by_summoner_id(summoner_id: str, platform: str) ->
         return None
 
 
+def _tally_ranked(matches: List[Dict[str, Any]], puuid: str) -> Dict[str, int]:
+    """W/L по SOLO (420) и FLEX (440) для игрока"""
+    counts = {"solo_wins": 0, "solo_losses": 0, "flex_wins": 0, "flex_losses": 0}
+    for m in matches:
+        prefix = RANKED_QUEUE_PREFIX.get(m.get("info", {}).get("queueId"))
+        if not prefix:
+            continue
+        p = next((p for p in m.get("info", {}).get("participants", []) if p.get("puuid") == puuid), None)
+        if p is None:
+            continue
+        counts[f"{prefix}_wins" if p.get("win") else f"{prefix}_losses"] += 1
+    return counts
+
+
 async def calculate_from_match_history(
     puuid: str,
     summoner_level: int,
@@ -140,21 +149,24 @@ async def calculate_from_match_history(
     tag_line: str,
     region: str,
     platform: str,
+    db: Optional[AsyncSession] = None,
+    player_id: Optional[int] = None,
 ) -> Dict[str, Any]:
-    """Fallback: ranked W/L from match history; tier/division/LP unavailable."""
+    """
+    Fallback: ranked W/L over the last MATCH_HISTORY_FALLBACK_LIMIT ranked
+    matches; tier/division/LP unavailable. With a stored player the window
+    counts are kept in ranked_match_counters: repeat calls load only the new
+    matches and subtract the ones that slid out of the window (already stored).
+    """
     regional_routing = PLATFORM_TO_REGION.get(platform, region)
-    regional_base = f"https://{regional_routing}.api.riotgames.com"
-    url = f"{regional_base}/lol/match/v5/matches/by-puuid/{puuid}/ids"
-
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            url,
-            headers=riot_api.headers,
-            params={"type": "ranked", "count": 100},
-            timeout=15.0,
+    try:
+        match_ids = await riot_api.get_match_history(
+            puuid=puuid, region=regional_routing, count=100, match_type="ranked"
         )
+    except RiotAPIError:
+        match_ids = None
 
-    if r.status_code != 200:
+    if match_ids is None:
         return {
             "player": {"game_name": game_name, "tag_line": tag_line, "puuid": puuid, "level": summoner_level},
             "ranked_solo": None,
@@ -162,7 +174,6 @@ async def calculate_from_match_history(
             "note": "Unable to fetch match history",
         }
 
-    match_ids = r.json()
     if not match_ids:
         return {
             "player": {"game_name": game_name, "tag_line": tag_line, "puuid": puuid, "level": summoner_level},
@@ -171,34 +182,54 @@ async def calculate_from_match_history(
             "note": "No ranked games found",
         }
 
-    solo_w, solo_l = 0, 0
-    flex_w, flex_l = 0, 0
-
-    async with httpx.AsyncClient() as client:
-        for mid in match_ids[:50]:
-            try:
-                mr = await client.get(
-                    f"{regional_base}/lol/match/v5/matches/{mid}",
-                    headers=riot_api.headers,
-                    timeout=10.0,
-                )
-                if mr.status_code != 200:
-                    continue
-                m = mr.json()
-                qid = m.get("info", {}).get("queueId")
-                for p in m.get("info", {}).get("participants", []):
-                    if p.get("puuid") != puuid:
-                        continue
-                    win = bool(p.get("win"))
-                    if qid == 420:
-                        solo_w += 1 if win else 0
-                        solo_l += 0 if win else 1
-                    elif qid == 440:
-                        flex_w += 1 if win else 0
-                        flex_l += 0 if win else 1
-                    break
-            except Exception:
-                continue
+    counter = None
+    if db is not None and player_id is not None:
+        try:
+            counter = await crud.get_ranked_match_counter_async(db, player_id)
+        except DB_UNAVAILABLE_ERRORS:
+            await db.rollback()
+            db = None
+
+    # match ids идут от новых к старым; счётчик — это всегда окно последних
+    # MATCH_HISTORY_FALLBACK_LIMIT матчей. Если last_match_id выпал из окна — пересчёт с нуля
+    window = match_ids[:MATCH_HISTORY_FALLBACK_LIMIT]
+    if counter and counter.last_match_id in window:
+        new_ids = window[:window.index(counter.last_match_id)]
+        # Столько же старых матчей вышло из окна: они были учтены, их надо вычесть
+        dropped_ids = match_ids[MATCH_HISTORY_FALLBACK_LIMIT:MATCH_HISTORY_FALLBACK_LIMIT + len(new_ids)]
+        counts = {key: getattr(counter, key) for key in RANKED_COUNTER_FIELDS}
+    else:
+        new_ids = window
+        dropped_ids = []
+        counts = dict.fromkeys(RANKED_COUNTER_FIELDS, 0)
+
+    if new_ids:
+        wanted = new_ids + dropped_ids
+        if db is not None:
+            loaded = await load_matches(db, wanted, regional_routing, platform, concurrency=MATCH_FETCH_CONCURRENCY)
+        else:
+            matches = await fetch_matches(wanted, regional_routing, platform, concurrency=MATCH_FETCH_CONCURRENCY)
+            loaded = {"matches": matches, "fetched": matches}
+
+        dropped = set(dropped_ids)
+        added = [m for m in loaded["matches"] if match_id_of(m) not in dropped]
+        removed = [m for m in loaded["matches"] if match_id_of(m) in dropped]
+        for key, value in _tally_ranked(added, puuid).items():
+            counts[key] += value
+        for key, value in _tally_ranked(removed, puuid).items():
+            counts[key] = max(counts[key] - value, 0)
+
+        if db is not None:
+            # счётчики двигаем только если учтены все матчи окна, иначе пропуски посчитаются заново
+            if len(loaded["matches"]) == len(wanted):
+                try:
+                    await crud.save_ranked_match_counter_async(db, player_id, new_ids[0], **counts)
+                except DB_UNAVAILABLE_ERRORS:
+                    await db.rollback()
+            await backfill_matches(db, player_id, loaded["fetched"], puuid)
+
+    solo_w, solo_l = counts["solo_wins"], counts["solo_losses"]
+    flex_w, flex_l = counts["flex_wins"], counts["flex_losses"]
 
     out = {
         "player": {"game_name": game_name, "tag_line": tag_line, "puuid": puuid, "level": summoner_level},
@@ -247,7 +278,7 @@ async def get_ranked_by_name(
     region: str = "europe",
     platform: str = "ru",
     use_lcu: bool = False,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
         # 1) RiotID -> PUUID
@@ -294,7 +325,7 @@ async def get_ranked_by_name(
 
         # DB write (optional; ignore if DB down)
         try:
-            player = crud.get_or_create_player(
+            player = await crud.get_or_create_player_async(
                 db=db,
                 puuid=puuid,
                 game_name=game_name,
@@ -304,7 +335,8 @@ async def get_ranked_by_name(
                 summoner_level=summoner_level,
                 profile_icon_id=summoner.get("profileIconId"),
             )
-        except OperationalError:
+        except DB_UNAVAILABLE_ERRORS:
+            await db.rollback()
             player = None
 
         # 5) League entries if summonerId exists
@@ -340,7 +372,7 @@ async def get_ranked_by_name(
                     # write to DB best-effort
                     if player:
                         try:
-                            crud.create_or_update_ranked_stats(
+                            await crud.create_or_update_ranked_stats_async(
                                 db=db,
                                 player_id=player.id,
                                 queue_type=qt,
@@ -353,8 +385,8 @@ async def get_ranked_by_name(
                                 hot_streak=info["hot_streak"],
                                 data_source="riot_api",
                             )
-                        except OperationalError:
-                            pass
+                        except DB_UNAVAILABLE_ERRORS:
+                            await db.rollback()
 
                     if qt == "RANKED_SOLO_5x5":
                         result["ranked_solo"] = info
@@ -371,6 +403,8 @@ async def get_ranked_by_name(
             tag_line=tag_line,
             region=region,
             platform=platform,
+            db=db if player else None,
+            player_id=player.id if player else None,
         )
         fb["data_source"] = "Match History (Fallback)"
         return fb
@@ -1,23 +1,30 @@
 """
 Stats API endpoints - аналитика игрока
 """
-import asyncio
-import httpx
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
-from app.services.riot_api import RiotAPIService, RiotAPIError
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, List
+from app.services.riot_api import RiotAPIError, riot_api
 from app.services.analytics import summarize_matches
 from app.services.ddragon import ddragon
+from app.services.match_store import backfill_matches, load_matches
+from app import crud
+from app.database import DB_UNAVAILABLE_ERRORS, get_async_db
 from app.models_old.summoner import SummonerRequest
 from app.schemas.analysis import StatsResponse
+from app.services.response_cache import cached_json_response, response_cache
 
 
-riot_api = RiotAPIService()
 router = APIRouter()
 
 
 @router.post("/analyze", response_model=StatsResponse)
-async def analyze_player_stats(request: SummonerRequest, match_count: int = 20):
+async def analyze_player_stats(
+    request: SummonerRequest,
+    http_request: Request,
+    match_count: int = 20,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Анализ статистики игрока по последним матчам
     """
@@ -38,40 +45,66 @@ async def analyze_player_stats(request: SummonerRequest, match_count: int = 20):
         if not match_ids:
             raise HTTPException(status_code=404, detail="No matches found")
 
-        async with httpx.AsyncClient() as client:
-            tasks = [
-                riot_api.get_match_details(
-                    match_id=match_id,
-                    region=request.region,
-                    platform=request.platform,
-                    client=client,
-                )
-                for match_id in match_ids[:match_count]
-            ]
-            match_results = await asyncio.gather(*tasks, return_exceptions=True)
+        cache_key = response_cache.make_key(
+            "stats",
+            puuid,
+            request.game_name.lower(),
+            request.tag_line.lower(),
+            request.region.lower(),
+            request.platform.lower(),
+            match_count,
+            match_ids[0],
+        )
+
+        async def build():
+            batch = await load_matches(db, match_ids[:match_count], request.region, request.platform)
+            match_details = batch["matches"]
+            if batch["fetched"]:
+                await _backfill(db, account_data, request, puuid, batch["fetched"])
+            analysis = summarize_matches(match_details, puuid)
+            analysis["recent_matches"] = await ddragon.enrich_recent_matches(analysis["recent_matches"])
 
-        match_details = [m for m in match_results if isinstance(m, dict)]
-        analysis = summarize_matches(match_details, puuid)
-        analysis["recent_matches"] = await ddragon.enrich_recent_matches(analysis["recent_matches"])
+            payload = {
+                "player": {
+                    "game_name": request.game_name,
+                    "tag_line": request.tag_line,
+                    "puuid": puuid,
+                },
+                "summary": analysis["summary"],
+                "performance": analysis["performance"],
+                "top_champions": analysis["champions"],
+                "recent_matches": analysis["recent_matches"],
+            }
+            return payload, len(match_details) == len(match_ids[:match_count])
 
-        return {
-            "player": {
-                "game_name": request.game_name,
-                "tag_line": request.tag_line,
-                "puuid": puuid,
-            },
-            "summary": analysis["summary"],
-            "performance": analysis["performance"],
-            "top_champions": analysis["champions"],
-            "recent_matches": analysis["recent_matches"],
-        }
+        return await cached_json_response(http_request, cache_key, build, StatsResponse)
 
+    except HTTPException:
+        raise
     except RiotAPIError as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
 
 
+async def _backfill(db: AsyncSession, account: Dict[str, Any], request: SummonerRequest,
+                    puuid: str, matches: List[Dict[str, Any]]) -> None:
+    """Сохранить матчи, пришедшие из Riot, чтобы следующий запрос читал их из БД"""
+    try:
+        player = await crud.get_or_create_player_async(
+            db=db,
+            puuid=puuid,
+            game_name=account.get("gameName", request.game_name),
+            tag_line=account.get("tagLine", request.tag_line),
+            region=request.region,
+            platform=request.platform,
+        )
+    except DB_UNAVAILABLE_ERRORS:
+        await db.rollback()
+        return
+    await backfill_matches(db, player.id, matches, puuid)
+
+
 @router.get("/health")
 async def stats_health():
     return {"status": "ok", "endpoint": "/api/stats/analyze"}
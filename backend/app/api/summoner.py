@@ -2,25 +2,23 @@
 Summoner API endpoints
 """
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.exc import OperationalError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models_old.summoner import (
     SummonerRequest, 
     SummonerResponse, 
     AccountInfo, 
     SummonerInfo
 )
-from app.services.riot_api import RiotAPIService, RiotAPIError
-from app.database import get_db
+from app.services.riot_api import RiotAPIError, riot_api
+from app.database import get_async_db, DB_UNAVAILABLE_ERRORS
 from app import crud
 
 
-riot_api = RiotAPIService()
 router = APIRouter()
 
 
 @router.post("/search", response_model=SummonerResponse)
-async def search_summoner(request: SummonerRequest, db: Session = Depends(get_db)):
+async def search_summoner(request: SummonerRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Поиск summoner по Riot ID
     """
@@ -44,7 +42,7 @@ async def search_summoner(request: SummonerRequest, db: Session = Depends(get_db
         
         # 💾 Сохранение игрока в БД (если БД доступна)
         try:
-            crud.get_or_create_player(
+            await crud.get_or_create_player_async(
                 db=db,
                 puuid=account.puuid,
                 game_name=request.game_name,
@@ -54,9 +52,9 @@ async def search_summoner(request: SummonerRequest, db: Session = Depends(get_db
                 summoner_level=summoner.summonerLevel,
                 profile_icon_id=summoner.profileIconId,
             )
-        except OperationalError:
+        except DB_UNAVAILABLE_ERRORS:
             # DB is optional for search; continue without persistence
-            pass
+            await db.rollback()
         
         # 3. Получаем историю матчей
         try:
@@ -16,7 +16,6 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str  # обязательное
-    database_pool_size: int = 10
     
     # Redis
     redis_url: str = "redis://localhost:6379/0"
@@ -24,6 +23,47 @@ class Settings(BaseSettings):
     # Riot API
     riot_api_key: str  # обязательное
     riot_api_base_url: str = "https://europe.api.riotgames.com"
+    analysis_deadline_ms: int = 8000
+    
+    # Data Dragon
+    ddragon_cache_dir: str = "data/ddragon"
+    ddragon_refresh_seconds: int = 3600
+    
+    # Startup warm-up
+    warmup_platforms: str = "euw1,na1,kr"
+    warmup_players: str = ""  # "Name#TAG@euw1,Other#EUW@euw1"
+    warmup_timeout_seconds: int = 60
+    
+    # Apex league PUUID index (platforms come from warmup_platforms)
+    apex_index_queues: str = "RANKED_SOLO_5x5,RANKED_FLEX_SR"
+    apex_index_refresh_seconds: int = 60
+    
+    # Materialized leaderboards (same platforms/queues as the apex index)
+    leaderboard_size: int = 200
+    leaderboard_refresh_seconds: int = 120
+    
+    # Persistent PUUID directory (Riot ID / profile), refreshed under a Riot call budget
+    puuid_directory_account_ttl_seconds: int = 604800
+    puuid_directory_summoner_ttl_seconds: int = 86400
+    puuid_directory_refresh_seconds: int = 300
+    puuid_directory_refresh_budget: int = 100
+    
+    # Cross-platform apex ladder
+    global_ladder_platforms: str = "euw1,eun1,na1,kr,br1,jp1,tr1,ru,la1,la2,oc1"
+    global_ladder_size: int = 5000
+    global_ladder_platform_concurrency: int = 2
+    global_ladder_refresh_seconds: int = 300
+    
+    # Live game watch pollers (shared per watched PUUID)
+    live_watch_fast_seconds: int = 5
+    live_watch_in_game_seconds: int = 30
+    live_watch_idle_seconds: int = 60
+    live_watch_early_game_seconds: int = 300
+    live_enrich_budget_ms: int = 800
+    
+    # LCU (local League Client); lockfile path is auto-detected when unset
+    lcu_lockfile_path: Optional[str] = None
+    lcu_discovery_retry_seconds: int = 5
     
     # LLM APIs (optional for now)
     anthropic_api_key: Optional[str] = None
@@ -41,7 +81,9 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",  # Ищет .env в текущей директории (backend/)
         env_file_encoding="utf-8",
-        case_sensitive=False
+        case_sensitive=False,
+        # В .env есть и переменные, которые читаются мимо Settings (DATABASE_POOL_SIZE в app.database)
+        extra="ignore"
     )
 
 
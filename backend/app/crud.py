@@ -1,15 +1,84 @@
 """
 CRUD operations for database
 """
+import hashlib
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 
-from app.models import Player, RankedStats, MatchHistory
+from app.models import (
+    Player, PuuidDirectoryEntry, RankedStats, RankedSnapshot, RankedMatchCounter, MatchHistory, MatchTimelineFrames, MatchTimelineSummary, Match, MatchParticipant, MatchPayload,
+)
+from app.services.payload_codec import decode_payload, payload_row
+from app.services.ladder import ladder_score
 
 
 # ============================================================================
-# PLAYER CRUD
+# RANKED SNAPSHOTS CRUD (LP history, append-only)
+# ============================================================================
+
+def ranked_state_hash(ladder: Optional[int], lp: Optional[int], wins: Optional[int], losses: Optional[int]) -> int:
+    """64-битный хэш состояния ранга; снапшот пишется только при его изменении"""
+    digest = hashlib.blake2b(f"{ladder}|{lp}|{wins}|{losses}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def snapshot_row(player_id: int, queue_type: str, tier: Optional[str], rank: Optional[str],
+                 lp: Optional[int], wins: Optional[int], losses: Optional[int],
+                 captured_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """Строка ranked_snapshots (tier/rank сворачиваются в ladder_score)"""
+    score = ladder_score(tier, rank, lp)
+    row = {
+        "player_id": player_id,
+        "queue_type": queue_type,
+        "ladder_score": score,
+        "lp": lp,
+        "wins": wins,
+        "losses": losses,
+        "state_hash": ranked_state_hash(score, lp, wins, losses),
+    }
+    if captured_at is not None:
+        row["captured_at"] = captured_at
+    return row
+
+
+def _append_snapshot_if_changed(db: Union[Session, AsyncSession], stats: Optional[RankedStats], player_id: int, queue_type: str,
+                                tier: Optional[str], rank: Optional[str], lp: Optional[int],
+                                wins: Optional[int], losses: Optional[int]) -> None:
+    # Текущая строка ranked_stats и есть последнее состояние: сравнение без доп. запроса
+    row = snapshot_row(player_id, queue_type, tier, rank, lp, wins, losses)
+    if stats is not None:
+        previous = ranked_state_hash(stats.ladder_score, stats.lp, stats.wins, stats.losses)
+        if previous == row["state_hash"]:
+            return
+    db.add(RankedSnapshot(**row))
+
+
+def _latest_snapshot_hashes_query(player_ids: List[int]):
+    """Хэш последнего снапшота по (player_id, queue_type) одним запросом"""
+    latest_ids = select(func.max(RankedSnapshot.id)).where(
+        RankedSnapshot.player_id.in_(player_ids)
+    ).group_by(RankedSnapshot.player_id, RankedSnapshot.queue_type)
+    return select(RankedSnapshot.player_id, RankedSnapshot.queue_type, RankedSnapshot.state_hash).where(
+        RankedSnapshot.id.in_(latest_ids)
+    )
+
+
+def _changed_snapshot_rows(rows: List[Dict[str, Any]], latest: Dict[tuple, int]) -> List[Dict[str, Any]]:
+    changed = []
+    for row in rows:
+        key = (row["player_id"], row["queue_type"])
+        if latest.get(key) == row["state_hash"]:
+            continue
+        latest[key] = row["state_hash"]
+        changed.append(row)
+    return changed
+
+
+# ============================================================================
+# PLAYER CRUD (sync Session: scripts and CLI tools)
 # ============================================================================
 
 def get_player_by_puuid(db: Session, puuid: str) -> Optional[Player]:
@@ -66,7 +135,7 @@ def get_or_create_player(db: Session, puuid: str, game_name: str, tag_line: str,
 
 
 # ============================================================================
-# RANKED STATS CRUD
+# RANKED STATS CRUD (sync Session)
 # ============================================================================
 
 def get_ranked_stats(db: Session, player_id: int, queue_type: str = "RANKED_SOLO_5x5") -> Optional[RankedStats]:
@@ -84,6 +153,7 @@ def create_or_update_ranked_stats(db: Session, player_id: int, queue_type: str,
                                    data_source: str = "riot_api") -> RankedStats:
     """Создать или обновить ранковую статистику"""
     stats = get_ranked_stats(db, player_id, queue_type)
+    _append_snapshot_if_changed(db, stats, player_id, queue_type, tier, rank, lp, wins, losses)
     
     total_games = wins + losses
     winrate = (wins / total_games * 100) if total_games > 0 else 0.0
@@ -98,6 +168,7 @@ def create_or_update_ranked_stats(db: Session, player_id: int, queue_type: str,
         stats.veteran = veteran
         stats.hot_streak = hot_streak
         stats.data_source = data_source
+        stats.ladder_score = ladder_score(tier, rank, lp)
         stats.updated_at = datetime.utcnow()
     else:
         stats = RankedStats(
@@ -111,7 +182,8 @@ def create_or_update_ranked_stats(db: Session, player_id: int, queue_type: str,
             winrate=winrate,
             veteran=veteran,
             hot_streak=hot_streak,
-            data_source=data_source
+            data_source=data_source,
+            ladder_score=ladder_score(tier, rank, lp)
         )
         db.add(stats)
     
@@ -129,6 +201,81 @@ def get_all_ranked_stats(db: Session, player_id: int) -> List[RankedStats]:
 # MATCH HISTORY CRUD
 # ============================================================================
 
+def _dialect_insert(dialect_name: str):
+    """insert() с поддержкой ON CONFLICT (Postgres и SQLite), иначе None"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
+def _match_history_insert(dialect_name: str, rows: List[Dict[str, Any]]):
+    """INSERT ... ON CONFLICT (match_id) DO UPDATE для Postgres и SQLite."""
+    dialect_insert = _dialect_insert(dialect_name)
+    if dialect_insert is None:
+        return None
+
+    stmt = dialect_insert(MatchHistory).values(rows)
+    updated = {
+        column: stmt.excluded[column]
+        for column in rows[0]
+        if column not in ("player_id", "match_id")
+    }
+    # Статы в строке — одного участника: строку другого игрока того же матча не перезаписываем
+    return stmt.on_conflict_do_update(
+        index_elements=[MatchHistory.match_id],
+        set_=updated,
+        where=MatchHistory.player_id == stmt.excluded.player_id,
+    )
+
+
+def _payload_insert(dialect_name: str, payload_rows: List[Dict[str, Any]]):
+    """INSERT ... ON CONFLICT (match_id) DO NOTHING: raw payload матча неизменяем"""
+    dialect_insert = _dialect_insert(dialect_name)
+    if dialect_insert is None or not payload_rows:
+        return None
+    return dialect_insert(MatchPayload).values(payload_rows).on_conflict_do_nothing(
+        index_elements=[MatchPayload.match_id]
+    )
+
+
+def _timeline_summary_insert(dialect_name: str, rows: List[Dict[str, Any]]):
+    """INSERT ... ON CONFLICT (match_id, puuid) DO NOTHING: сводка матча неизменяема"""
+    dialect_insert = _dialect_insert(dialect_name)
+    if dialect_insert is None:
+        return None
+    return dialect_insert(MatchTimelineSummary).values(rows).on_conflict_do_nothing(
+        index_elements=[MatchTimelineSummary.match_id, MatchTimelineSummary.puuid]
+    )
+
+
+def _timeline_frames_insert(dialect_name: str, rows: List[Dict[str, Any]]):
+    """INSERT ... ON CONFLICT (match_id) DO NOTHING: кадры матча неизменяемы"""
+    dialect_insert = _dialect_insert(dialect_name)
+    if dialect_insert is None:
+        return None
+    return dialect_insert(MatchTimelineFrames).values(rows).on_conflict_do_nothing(
+        index_elements=[MatchTimelineFrames.match_id]
+    )
+
+
+def _split_match_rows(rows: List[Dict[str, Any]]):
+    """Строки match_history без raw_data + сжатые строки match_payloads"""
+    # ON CONFLICT не может обновить одну строку дважды в одном statement
+    unique = {row["match_id"]: row for row in rows}.values()
+    history_rows, payload_rows = [], []
+    for row in unique:
+        row = dict(row)
+        raw_data = row.pop("raw_data", None)
+        history_rows.append(row)
+        if raw_data:
+            payload_rows.append(payload_row(row["match_id"], raw_data))
+    return history_rows, payload_rows
+
+
 def get_match_by_match_id(db: Session, match_id: str) -> Optional[MatchHistory]:
     """Получить матч по match_id"""
     return db.query(MatchHistory).filter(MatchHistory.match_id == match_id).first()
@@ -153,43 +300,493 @@ def create_or_update_match_history(
     raw_data: dict,
 ) -> MatchHistory:
     """Создать или обновить матч в истории"""
-    existing = get_match_by_match_id(db, match_id)
-    if existing:
-        existing.game_mode = game_mode
-        existing.game_duration = game_duration
-        existing.game_creation = game_creation
-        existing.champion_name = champion_name
-        existing.kills = kills
-        existing.deaths = deaths
-        existing.assists = assists
-        existing.win = win
-        existing.total_damage = total_damage
-        existing.gold_earned = gold_earned
-        existing.cs = cs
-        existing.vision_score = vision_score
-        existing.raw_data = raw_data
-        db.commit()
-        db.refresh(existing)
-        return existing
-
-    match = MatchHistory(
-        player_id=player_id,
-        match_id=match_id,
-        game_mode=game_mode,
-        game_duration=game_duration,
-        game_creation=game_creation,
-        champion_name=champion_name,
-        kills=kills,
-        deaths=deaths,
-        assists=assists,
-        win=win,
-        total_damage=total_damage,
-        gold_earned=gold_earned,
-        cs=cs,
-        vision_score=vision_score,
-        raw_data=raw_data,
-    )
-    db.add(match)
+    match = get_match_by_match_id(db, match_id)
+    if match is None:
+        match = MatchHistory(player_id=player_id, match_id=match_id)
+        db.add(match)
+    elif match.player_id != player_id:
+        # Строка другого игрока этого матча: его статы не трогаем
+        return match
+
+    match.game_mode = game_mode
+    match.game_duration = game_duration
+    match.game_creation = game_creation
+    match.champion_name = champion_name
+    match.kills = kills
+    match.deaths = deaths
+    match.assists = assists
+    match.win = win
+    match.total_damage = total_damage
+    match.gold_earned = gold_earned
+    match.cs = cs
+    match.vision_score = vision_score
+    if raw_data:
+        db.merge(MatchPayload(**payload_row(match_id, raw_data)))
     db.commit()
     db.refresh(match)
-    return match
\ No newline at end of file
+    return match
+
+
+def bulk_upsert_match_history(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Upsert пачки матчей одним statement в одной транзакции (+ сжатые payloads).
+    Обновляются только строки того же player_id; строки других игроков остаются как есть.
+    """
+    if not rows:
+        return
+    dialect_name = db.get_bind().dialect.name
+    history_rows, payload_rows = _split_match_rows(rows)
+    stmt = _match_history_insert(dialect_name, history_rows)
+    if stmt is None:
+        for row in rows:
+            create_or_update_match_history(db, **row)
+        return
+    db.execute(stmt)
+    payload_stmt = _payload_insert(dialect_name, payload_rows)
+    if payload_stmt is not None:
+        db.execute(payload_stmt)
+    db.commit()
+
+
+# ============================================================================
+# MATCHES / MATCH PARTICIPANTS CRUD
+# ============================================================================
+
+def _insert_ignore_statements(dialect_name: str, match_rows: List[Dict[str, Any]],
+                              participant_rows: List[Dict[str, Any]]):
+    """INSERT ... ON CONFLICT DO NOTHING: матчи неизменяемы, повторная запись не нужна"""
+    dialect_insert = _dialect_insert(dialect_name)
+    if dialect_insert is None:
+        return None
+    statements = []
+    if match_rows:
+        statements.append(
+            dialect_insert(Match).values(match_rows).on_conflict_do_nothing(index_elements=[Match.match_id])
+        )
+    if participant_rows:
+        statements.append(
+            dialect_insert(MatchParticipant).values(participant_rows).on_conflict_do_nothing(
+                index_elements=[MatchParticipant.match_id, MatchParticipant.participant_id]
+            )
+        )
+    return statements
+
+
+def bulk_insert_matches(db: Session, match_rows: List[Dict[str, Any]],
+                        participant_rows: List[Dict[str, Any]]) -> None:
+    """Записать matches + match_participants пачкой, уже известные матчи пропускаются"""
+    if not match_rows:
+        return
+    statements = _insert_ignore_statements(db.get_bind().dialect.name, match_rows, participant_rows)
+    if statements is None:
+        known = {
+            match_id for (match_id,) in db.query(Match.match_id).filter(
+                Match.match_id.in_([row["match_id"] for row in match_rows])
+            )
+        }
+        db.add_all(Match(**row) for row in match_rows if row["match_id"] not in known)
+        db.add_all(MatchParticipant(**row) for row in participant_rows if row["match_id"] not in known)
+    else:
+        for stmt in statements:
+            db.execute(stmt)
+    db.commit()
+
+
+# ============================================================================
+# ASYNC CRUD (AsyncSession, request handlers)
+# ============================================================================
+
+async def get_player_by_puuid_async(db: AsyncSession, puuid: str) -> Optional[Player]:
+    """Получить игрока по PUUID"""
+    result = await db.execute(select(Player).where(Player.puuid == puuid).limit(1))
+    return result.scalars().first()
+
+
+async def create_player_async(db: AsyncSession, puuid: str, game_name: str, tag_line: str,
+                              region: str = None, platform: str = None,
+                              summoner_level: int = None, profile_icon_id: int = None) -> Player:
+    """Создать нового игрока"""
+    player = Player(
+        puuid=puuid,
+        game_name=game_name,
+        tag_line=tag_line,
+        region=region,
+        platform=platform,
+        summoner_level=summoner_level,
+        profile_icon_id=profile_icon_id
+    )
+    db.add(player)
+    await db.commit()
+    await db.refresh(player)
+    return player
+
+
+async def update_player_async(db: AsyncSession, player: Player, **kwargs) -> Player:
+    """Обновить данные игрока"""
+    for key, value in kwargs.items():
+        if hasattr(player, key) and value is not None:
+            setattr(player, key, value)
+
+    player.updated_at = datetime.utcnow()
+    await db.commit()
+    await db.refresh(player)
+    return player
+
+
+async def get_player_ids_by_puuids_async(db: AsyncSession, puuids: List[str]) -> Dict[str, int]:
+    """puuid -> players.id для уже известных игроков одним IN-запросом"""
+    if not puuids:
+        return {}
+    result = await db.execute(select(Player.puuid, Player.id).where(Player.puuid.in_(puuids)))
+    return {puuid: player_id for puuid, player_id in result.all()}
+
+
+async def get_or_create_player_async(db: AsyncSession, puuid: str, game_name: str, tag_line: str, **kwargs) -> Player:
+    """Получить или создать игрока"""
+    player = await get_player_by_puuid_async(db, puuid)
+    if player:
+        return await update_player_async(db, player, game_name=game_name, tag_line=tag_line, **kwargs)
+    return await create_player_async(db, puuid, game_name, tag_line, **kwargs)
+
+
+async def get_ranked_stats_async(db: AsyncSession, player_id: int,
+                                 queue_type: str = "RANKED_SOLO_5x5") -> Optional[RankedStats]:
+    """Получить ранковую статистику игрока"""
+    result = await db.execute(
+        select(RankedStats).where(
+            RankedStats.player_id == player_id,
+            RankedStats.queue_type == queue_type
+        ).limit(1)
+    )
+    return result.scalars().first()
+
+
+async def create_or_update_ranked_stats_async(db: AsyncSession, player_id: int, queue_type: str,
+                                              tier: str = None, rank: str = None, lp: int = None,
+                                              wins: int = 0, losses: int = 0,
+                                              veteran: bool = False, hot_streak: bool = False,
+                                              data_source: str = "riot_api") -> RankedStats:
+    """Создать или обновить ранковую статистику"""
+    stats = await get_ranked_stats_async(db, player_id, queue_type)
+    _append_snapshot_if_changed(db, stats, player_id, queue_type, tier, rank, lp, wins, losses)
+
+    total_games = wins + losses
+    winrate = (wins / total_games * 100) if total_games > 0 else 0.0
+
+    if stats:
+        stats.tier = tier
+        stats.rank = rank
+        stats.lp = lp
+        stats.wins = wins
+        stats.losses = losses
+        stats.winrate = winrate
+        stats.veteran = veteran
+        stats.hot_streak = hot_streak
+        stats.data_source = data_source
+        stats.ladder_score = ladder_score(tier, rank, lp)
+        stats.updated_at = datetime.utcnow()
+    else:
+        stats = RankedStats(
+            player_id=player_id,
+            queue_type=queue_type,
+            tier=tier,
+            rank=rank,
+            lp=lp,
+            wins=wins,
+            losses=losses,
+            winrate=winrate,
+            veteran=veteran,
+            hot_streak=hot_streak,
+            data_source=data_source,
+            ladder_score=ladder_score(tier, rank, lp)
+        )
+        db.add(stats)
+
+    await db.commit()
+    await db.refresh(stats)
+    return stats
+
+
+async def bulk_append_ranked_snapshots_async(db: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+    """Записать пачку снапшотов одним INSERT и одним commit (только изменившиеся)"""
+    if not rows:
+        return 0
+    result = await db.execute(_latest_snapshot_hashes_query(list({row["player_id"] for row in rows})))
+    latest = {(player_id, queue_type): state_hash for player_id, queue_type, state_hash in result.all()}
+    changed = _changed_snapshot_rows(rows, latest)
+    if changed:
+        await db.execute(insert(RankedSnapshot), changed)
+        await db.commit()
+    return len(changed)
+
+
+async def get_ranked_snapshots_async(db: AsyncSession, puuid: str, queue_type: str,
+                                     start: Optional[datetime] = None,
+                                     end: Optional[datetime] = None) -> Optional[List[RankedSnapshot]]:
+    """Снапшоты игрока за период (range scan по индексу); None если игрока нет"""
+    player_id = (await db.execute(select(Player.id).where(Player.puuid == puuid))).scalar()
+    if player_id is None:
+        return None
+    query = select(RankedSnapshot).where(
+        RankedSnapshot.player_id == player_id,
+        RankedSnapshot.queue_type == queue_type,
+    )
+    if start is not None:
+        query = query.where(RankedSnapshot.captured_at >= start)
+    if end is not None:
+        query = query.where(RankedSnapshot.captured_at <= end)
+    result = await db.execute(query.order_by(RankedSnapshot.captured_at, RankedSnapshot.id))
+    return list(result.scalars().all())
+
+
+async def get_ranked_match_counter_async(db: AsyncSession, player_id: int) -> Optional[RankedMatchCounter]:
+    """Получить накопленные W/L из match history"""
+    result = await db.execute(select(RankedMatchCounter).where(RankedMatchCounter.player_id == player_id))
+    return result.scalars().first()
+
+
+async def save_ranked_match_counter_async(db: AsyncSession, player_id: int, last_match_id: str,
+                                          **counts) -> None:
+    """
+    Сохранить счётчики (solo_wins/solo_losses/flex_wins/flex_losses) и самый новый учтённый матч.
+    INSERT ... ON CONFLICT (player_id) DO UPDATE: два параллельных первых запроса не падают на unique.
+    """
+    values = {"player_id": player_id, "last_match_id": last_match_id, **counts}
+    dialect_insert = _dialect_insert(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        counter = await get_ranked_match_counter_async(db, player_id)
+        if counter is None:
+            counter = RankedMatchCounter(player_id=player_id)
+            db.add(counter)
+        for key, value in values.items():
+            setattr(counter, key, value)
+    else:
+        stmt = dialect_insert(RankedMatchCounter).values(**values)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[RankedMatchCounter.player_id],
+            set_={**{key: stmt.excluded[key] for key in values if key != "player_id"}, "updated_at": func.now()},
+        ))
+    await db.commit()
+
+
+async def get_directory_entries_async(db: AsyncSession, puuids: List[str]) -> Dict[str, PuuidDirectoryEntry]:
+    """Записи справочника PUUID одним IN-запросом"""
+    if not puuids:
+        return {}
+    result = await db.execute(select(PuuidDirectoryEntry).where(PuuidDirectoryEntry.puuid.in_(list(set(puuids)))))
+    return {entry.puuid: entry for entry in result.scalars().all()}
+
+
+async def get_stale_directory_entries_async(db: AsyncSession, fetched_at_column: str,
+                                            older_than: datetime, limit: int) -> List[PuuidDirectoryEntry]:
+    """
+    Самые старые записи по account_fetched_at / summoner_fetched_at (range scan по индексу).
+    NULL — группа полей ещё ни разу не загружалась: такие записи идут первыми.
+    """
+    column = getattr(PuuidDirectoryEntry, fetched_at_column)
+    result = await db.execute(
+        select(PuuidDirectoryEntry)
+        .where(or_(column.is_(None), column < older_than))
+        .order_by(column.asc().nulls_first())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def upsert_directory_entries_async(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """
+    Upsert справочника: обновляются только переданные поля, так что account- и
+    summoner-данные с разной свежестью не затирают друг друга.
+    """
+    if not rows:
+        return
+    dialect_insert = _dialect_insert(db.get_bind().dialect.name)
+    # Один statement на набор колонок (строки с account и summoner полями приходят вперемешку)
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    for columns, group in groups.items():
+        if dialect_insert is None:
+            for row in group:
+                await db.merge(PuuidDirectoryEntry(**row))
+            continue
+        stmt = dialect_insert(PuuidDirectoryEntry).values(group)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PuuidDirectoryEntry.puuid],
+            set_={column: stmt.excluded[column] for column in columns if column != "puuid"},
+        )
+        await db.execute(stmt)
+    await db.commit()
+
+
+async def get_match_by_match_id_async(db: AsyncSession, match_id: str) -> Optional[MatchHistory]:
+    """Получить матч по match_id"""
+    result = await db.execute(select(MatchHistory).where(MatchHistory.match_id == match_id).limit(1))
+    return result.scalars().first()
+
+
+async def get_raw_matches_async(db: AsyncSession, match_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Получить сохранённые raw payload матчей одним IN-запросом (распаковка zstd)"""
+    if not match_ids:
+        return {}
+    result = await db.execute(
+        select(MatchPayload.match_id, MatchPayload.data).where(MatchPayload.match_id.in_(match_ids))
+    )
+    return {match_id: decode_payload(data) for match_id, data in result.all()}
+
+
+async def create_or_update_match_history_async(
+    db: AsyncSession,
+    player_id: int,
+    match_id: str,
+    game_mode: str,
+    game_duration: int,
+    game_creation: Optional[datetime],
+    champion_name: str,
+    kills: int,
+    deaths: int,
+    assists: int,
+    win: bool,
+    total_damage: int,
+    gold_earned: int,
+    cs: int,
+    vision_score: int,
+    raw_data: dict,
+) -> MatchHistory:
+    """Создать или обновить матч в истории"""
+    match = await get_match_by_match_id_async(db, match_id)
+    if match is None:
+        match = MatchHistory(player_id=player_id, match_id=match_id)
+        db.add(match)
+    elif match.player_id != player_id:
+        # Строка другого игрока этого матча: его статы не трогаем
+        return match
+
+    match.game_mode = game_mode
+    match.game_duration = game_duration
+    match.game_creation = game_creation
+    match.champion_name = champion_name
+    match.kills = kills
+    match.deaths = deaths
+    match.assists = assists
+    match.win = win
+    match.total_damage = total_damage
+    match.gold_earned = gold_earned
+    match.cs = cs
+    match.vision_score = vision_score
+    if raw_data:
+        await db.merge(MatchPayload(**payload_row(match_id, raw_data)))
+    await db.commit()
+    await db.refresh(match)
+    return match
+
+
+async def bulk_upsert_match_history_async(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """
+    Upsert пачки матчей одним statement в одной транзакции (+ сжатые payloads).
+    Обновляются только строки того же player_id; строки других игроков остаются как есть.
+    """
+    if not rows:
+        return
+    dialect_name = db.get_bind().dialect.name
+    history_rows, payload_rows = _split_match_rows(rows)
+    stmt = _match_history_insert(dialect_name, history_rows)
+    if stmt is None:
+        for row in rows:
+            await create_or_update_match_history_async(db, **row)
+        return
+    await db.execute(stmt)
+    payload_stmt = _payload_insert(dialect_name, payload_rows)
+    if payload_stmt is not None:
+        await db.execute(payload_stmt)
+    await db.commit()
+
+
+async def bulk_insert_matches_async(db: AsyncSession, match_rows: List[Dict[str, Any]],
+                                    participant_rows: List[Dict[str, Any]]) -> None:
+    """Записать matches + match_participants пачкой, уже известные матчи пропускаются"""
+    if not match_rows:
+        return
+    statements = _insert_ignore_statements(db.get_bind().dialect.name, match_rows, participant_rows)
+    if statements is None:
+        result = await db.execute(
+            select(Match.match_id).where(Match.match_id.in_([row["match_id"] for row in match_rows]))
+        )
+        known = set(result.scalars().all())
+        db.add_all(Match(**row) for row in match_rows if row["match_id"] not in known)
+        db.add_all(MatchParticipant(**row) for row in participant_rows if row["match_id"] not in known)
+    else:
+        for stmt in statements:
+            await db.execute(stmt)
+    await db.commit()
+
+
+async def get_timeline_summaries_async(db: AsyncSession, match_ids: List[str],
+                                       puuid: str) -> Dict[str, Dict[str, Any]]:
+    """Получить сохранённые timeline-сводки игрока по списку матчей"""
+    if not match_ids:
+        return {}
+    result = await db.execute(
+        select(MatchTimelineSummary.match_id, MatchTimelineSummary.summary).where(
+            MatchTimelineSummary.match_id.in_(match_ids),
+            MatchTimelineSummary.puuid == puuid
+        )
+    )
+    return {match_id: summary for match_id, summary in result.all()}
+
+
+async def get_recent_participations_async(db: AsyncSession, puuids: List[str],
+                                          per_player: int = 20) -> Dict[str, List[MatchParticipant]]:
+    """Последние per_player строк match_participants каждого игрока одним запросом (ROW_NUMBER)"""
+    if not puuids:
+        return {}
+    numbered = select(
+        MatchParticipant.id,
+        func.row_number().over(
+            partition_by=MatchParticipant.puuid,
+            order_by=MatchParticipant.game_creation.desc(),
+        ).label("rn"),
+    ).where(MatchParticipant.puuid.in_(puuids)).subquery()
+    result = await db.execute(
+        select(MatchParticipant)
+        .join(numbered, numbered.c.id == MatchParticipant.id)
+        .where(numbered.c.rn <= per_player)
+        .order_by(MatchParticipant.puuid, MatchParticipant.game_creation.desc())
+    )
+    rows: Dict[str, List[MatchParticipant]] = {puuid: [] for puuid in puuids}
+    for row in result.scalars().all():
+        rows[row.puuid].append(row)
+    return rows
+
+
+async def bulk_create_timeline_summaries_async(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Сохранить timeline-сводки пачкой (match_id, puuid, summary); уже сохранённые пропускаются"""
+    if not rows:
+        return
+    stmt = _timeline_summary_insert(db.get_bind().dialect.name, rows)
+    if stmt is None:
+        await db.execute(insert(MatchTimelineSummary), rows)
+    else:
+        # Параллельный анализ мог записать часть пар — без DO NOTHING откатилась бы вся пачка
+        await db.execute(stmt)
+    await db.commit()
+
+
+async def get_timeline_frames_async(db: AsyncSession, match_ids: List[str]) -> Dict[str, MatchTimelineFrames]:
+    """Сжатые кадры таймлайнов по списку матчей одним IN-запросом"""
+    if not match_ids:
+        return {}
+    result = await db.execute(select(MatchTimelineFrames).where(MatchTimelineFrames.match_id.in_(match_ids)))
+    return {row.match_id: row for row in result.scalars().all()}
+
+
+async def bulk_create_timeline_frames_async(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Сохранить кадры таймлайнов пачкой (frames_row); уже сохранённые матчи пропускаются"""
+    if not rows:
+        return
+    stmt = _timeline_frames_insert(db.get_bind().dialect.name, rows)
+    if stmt is None:
+        await db.execute(insert(MatchTimelineFrames), rows)
+    else:
+        await db.execute(stmt)
+    await db.commit()
@@ -1,21 +1,61 @@
 """
 Main FastAPI application
 """
+import asyncio
+import contextlib
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.config import settings
 from app.api import summoner, match, matches, stats, ranked, live, players, lcu, analysis, leaderboard
+from app.services.apex_index import apex_index
+from app.services.ddragon import ddragon
+from app.services.global_ladder import global_ladder
+from app.services.lcu_client import lcu_connection
+from app.services.leaderboard_cache import leaderboards
+from app.services.puuid_directory import puuid_directory
+from app.services.warmup import run_warmup, warmup_state
 
 
 ENABLE_LCU = os.getenv("ENABLE_LCU", "false").lower() in ("1", "true", "yes")
 
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm caches and start background refreshers; stop them on shutdown"""
+    warmup = asyncio.create_task(run_warmup())
+    tasks = [
+        warmup,
+        asyncio.create_task(_after(warmup, ddragon.refresh_loop(settings.ddragon_refresh_seconds))),
+        asyncio.create_task(_after(warmup, apex_index.refresh_loop(settings.apex_index_refresh_seconds))),
+        asyncio.create_task(_after(warmup, leaderboards.refresh_loop(settings.leaderboard_refresh_seconds))),
+        asyncio.create_task(_after(warmup, puuid_directory.refresh_loop(
+            settings.puuid_directory_refresh_seconds, settings.puuid_directory_refresh_budget,
+        ))),
+        asyncio.create_task(_after(warmup, global_ladder.refresh_loop(settings.global_ladder_refresh_seconds))),
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await lcu_connection.aclose()
+
+
+async def _after(task: asyncio.Task, coro):
+    """Run a background loop once warm-up has finished"""
+    await asyncio.gather(task, return_exceptions=True)
+    await coro
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     description="AI-powered League of Legends coaching platform",
     version="0.1.0",
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -40,9 +80,16 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Detailed health check"""
+    """Detailed health check (liveness + readiness)"""
     return {
         "status": "healthy",
+        "live": True,
+        "ready": warmup_state.ready,
+        "warmup": warmup_state.as_dict(),
+        "ddragon_version": ddragon.current_version,
+        "apex_index": apex_index.stats(),
+        "leaderboards": leaderboards.stats(),
+        "global_ladder": global_ladder.stats(),
         "database": "connected",
         "redis": "connected",
         "riot_api": "configured" if settings.riot_api_key else "not_configured",
@@ -50,6 +97,20 @@ async def health_check():
     }
 
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 until warm-up has finished"""
+    if not warmup_state.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up", **warmup_state.as_dict()})
+    return {"status": "ready", **warmup_state.as_dict()}
+
+
 # Подключаем summoner router
 app.include_router(summoner.router, prefix="/api/summoner", tags=["summoner"])
 app.include_router(match.router, prefix="/api/match", tags=["match"]) 
@@ -1,7 +1,7 @@
 """
 SQLAlchemy ORM models
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Float, ForeignKey, JSON, UniqueConstraint, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -9,6 +9,9 @@ from app.database import Base
 
 class Player(Base):
     __tablename__ = "players"
+    __table_args__ = (
+        Index("ix_players_platform_id", "platform", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     puuid = Column(String, unique=True, index=True, nullable=False)
@@ -26,8 +29,30 @@ class Player(Base):
     match_history = relationship("MatchHistory", back_populates="player", cascade="all, delete-orphan")
 
 
+class PuuidDirectoryEntry(Base):
+    __tablename__ = "puuid_directory"
+    
+    # Кэш PUUID -> Riot ID / профиль; у каждой группы полей своя отметка свежести
+    puuid = Column(String, primary_key=True)
+    platform = Column(String)
+    
+    # account-v1
+    game_name = Column(String)
+    tag_line = Column(String)
+    account_fetched_at = Column(DateTime(timezone=True), index=True)
+    
+    # summoner-v4
+    summoner_name = Column(String)
+    profile_icon_id = Column(Integer)
+    summoner_level = Column(Integer)
+    summoner_fetched_at = Column(DateTime(timezone=True), index=True)
+
+
 class RankedStats(Base):
     __tablename__ = "ranked_stats"
+    __table_args__ = (
+        Index("ix_ranked_stats_player_id_queue_type", "player_id", "queue_type"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     player_id = Column(Integer, ForeignKey("players.id"), nullable=False)
@@ -42,6 +67,8 @@ class RankedStats(Base):
     veteran = Column(Boolean, default=False)
     hot_streak = Column(Boolean, default=False)
     data_source = Column(String)
+    # tier × division × LP одним числом (app.services.ladder), NULL для unranked
+    ladder_score = Column(Integer)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -49,6 +76,51 @@ class RankedStats(Base):
     player = relationship("Player", back_populates="ranked_stats")
 
 
+# Top-N ladder reads are an index scan: WHERE queue_type = ? ORDER BY ladder_score DESC, id DESC
+Index(
+    "ix_ranked_stats_queue_type_ladder_score",
+    RankedStats.queue_type,
+    RankedStats.ladder_score.desc(),
+    RankedStats.id.desc(),
+)
+
+
+class RankedMatchCounter(Base):
+    __tablename__ = "ranked_match_counters"
+    
+    # W/L по очередям из match history; last_match_id — самый новый учтённый матч
+    id = Column(Integer, primary_key=True, index=True)
+    player_id = Column(Integer, ForeignKey("players.id", ondelete="CASCADE"), nullable=False, unique=True)
+    solo_wins = Column(Integer, default=0, nullable=False)
+    solo_losses = Column(Integer, default=0, nullable=False)
+    flex_wins = Column(Integer, default=0, nullable=False)
+    flex_losses = Column(Integer, default=0, nullable=False)
+    last_match_id = Column(String)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class RankedSnapshot(Base):
+    __tablename__ = "ranked_snapshots"
+    __table_args__ = (
+        Index("ix_ranked_snapshots_player_queue_captured", "player_id", "queue_type", "captured_at"),
+    )
+    
+    # Append-only: строка пишется только при изменении состояния (state_hash)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    player_id = Column(Integer, ForeignKey("players.id", ondelete="CASCADE"), nullable=False)
+    queue_type = Column(String, nullable=False)
+    
+    # tier/division восстанавливаются из ladder_score (app.services.ladder)
+    ladder_score = Column(Integer)
+    lp = Column(Integer)
+    wins = Column(Integer)
+    losses = Column(Integer)
+    state_hash = Column(BigInteger, nullable=False)
+    
+    captured_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
 class MatchHistory(Base):
     __tablename__ = "match_history"
     
@@ -71,8 +143,98 @@ class MatchHistory(Base):
     cs = Column(Integer)
     vision_score = Column(Integer)
     
-    raw_data = Column(JSON)
-    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     player = relationship("Player", back_populates="match_history")
+
+
+class MatchPayload(Base):
+    __tablename__ = "match_payloads"
+    
+    match_id = Column(String, primary_key=True)
+    # Raw Match-v5 JSON, сжатый zstd; читается только когда нужен полный матч
+    codec = Column(String, nullable=False, default="zstd")
+    data = Column(LargeBinary, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+
+class MatchTimelineFrames(Base):
+    __tablename__ = "match_timeline_frames"
+    
+    match_id = Column(String, primary_key=True)
+    # int32 timestamps + frames x participants x (gold, xp, cs, level, x, y), сжатые zstd
+    codec = Column(String, nullable=False, default="zstd")
+    frame_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class MatchTimelineSummary(Base):
+    __tablename__ = "match_timeline_summary"
+    __table_args__ = (
+        UniqueConstraint("match_id", "puuid", name="uq_match_timeline_summary_match_puuid"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    match_id = Column(String, nullable=False, index=True)
+    puuid = Column(String, nullable=False)
+    
+    summary = Column(JSON)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class Match(Base):
+    __tablename__ = "matches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    match_id = Column(String, unique=True, index=True, nullable=False)
+    platform = Column(String)
+    queue_id = Column(Integer)
+    game_mode = Column(String)
+    game_version = Column(String)
+    patch = Column(String)
+    game_duration = Column(Integer)
+    game_creation = Column(DateTime(timezone=True))
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    participants = relationship("MatchParticipant", back_populates="match", cascade="all, delete-orphan")
+
+
+class MatchParticipant(Base):
+    __tablename__ = "match_participants"
+    __table_args__ = (
+        UniqueConstraint("match_id", "participant_id", name="uq_match_participants_match_participant"),
+        Index("ix_match_participants_puuid_game_creation", "puuid", "game_creation"),
+        Index("ix_match_participants_champion_team_position", "champion", "team_position"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    match_id = Column(String, ForeignKey("matches.match_id", ondelete="CASCADE"), nullable=False, index=True)
+    participant_id = Column(Integer, nullable=False)
+    puuid = Column(String, nullable=False)
+    team_id = Column(Integer)
+    
+    champion = Column(String)
+    champion_id = Column(Integer)
+    team_position = Column(String)
+    kills = Column(Integer)
+    deaths = Column(Integer)
+    assists = Column(Integer)
+    cs = Column(Integer)
+    gold_earned = Column(Integer)
+    total_damage = Column(Integer)
+    vision_score = Column(Integer)
+    time_played = Column(Integer)
+    win = Column(Boolean)
+    
+    # Денормализовано из matches для индексов и агрегатов без JOIN
+    patch = Column(String)
+    queue_id = Column(Integer)
+    game_creation = Column(DateTime(timezone=True))
+    
+    match = relationship("Match", back_populates="participants")
@@ -153,6 +153,15 @@ class EarlyGameSummary(BaseModel):
     avg_early_deaths: float
     avg_early_assists: float
     first_objective_participation_rate: float
+    lane_tracked_matches: Optional[int] = None
+    avg_gold_at_10: Optional[float] = None
+    avg_gold_diff_at_10: Optional[float] = None
+    avg_xp_diff_at_10: Optional[float] = None
+    avg_cs_diff_at_10: Optional[float] = None
+    avg_gold_at_15: Optional[float] = None
+    avg_gold_diff_at_15: Optional[float] = None
+    avg_xp_diff_at_15: Optional[float] = None
+    avg_cs_diff_at_15: Optional[float] = None
 
 
 class AnalysisResponse(BaseModel):
@@ -167,6 +176,10 @@ class AnalysisResponse(BaseModel):
     learning_path: Optional[LearningPath] = None
     coaching_recap: Optional[List[CoachingInsight]] = None
     early_game: Optional[EarlyGameSummary] = None
+    partial: bool = False
+    missing_matches: int = 0
+    missing_timelines: int = 0
+    timings: Optional[Dict[str, float]] = None
 
 
 class StatsResponse(BaseModel):
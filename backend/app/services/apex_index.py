@@ -0,0 +1,201 @@
+"""
+In-memory PUUID index over apex leagues (Challenger / Grandmaster / Master).
+
+A background refresher rebuilds one dict per (platform, queue) on the league
+TTL, together with the full Master+ ladder pre-sorted by ladder_score and a
+PUUID -> position index, and swaps them in with a single assignment, so
+readers always see either the previous or the new complete index. Request
+handlers only do dict lookups and slices and never call Riot for apex ranks.
+"""
+import asyncio
+import logging
+import time
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.services.ladder import LadderKey, encode_puuid_cursor, ladder_key, ladder_score
+from app.services.riot_api import riot_api
+
+logger = logging.getLogger(__name__)
+
+IndexKey = Tuple[str, str]
+
+RANKED_QUEUES = ("RANKED_SOLO_5x5", "RANKED_FLEX_SR")
+
+
+def split_setting(value: str) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def is_ranked_target(platform: str, queue: str) -> bool:
+    """Real Riot platform + ranked queue; anything else is never built or refreshed."""
+    return (platform or "").lower() in riot_api.PLATFORM_HOST and queue in RANKED_QUEUES
+
+
+def apex_entry(tier: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """League-v4 entry in the shape ranked.py returns for apex players."""
+    return {
+        "tier": tier,
+        "rank": "I",
+        "lp": entry.get("leaguePoints", 0),
+        "wins": entry.get("wins", 0),
+        "losses": entry.get("losses", 0),
+        "veteran": entry.get("veteran", False),
+        "hot_streak": entry.get("hotStreak", False),
+        "series": entry.get("miniSeries"),
+    }
+
+
+def build_ladder(index: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Sorted ladder, its bisect keys and a PUUID -> position map; equal scores share a position."""
+    entries = sorted(
+        ({"puuid": puuid, **entry, "ladder_score": ladder_score(entry["tier"], "I", entry["lp"])}
+         for puuid, entry in index.items()),
+        key=ladder_key,
+    )
+    previous_score = None
+    position = 0
+    for i, entry in enumerate(entries):
+        if entry["ladder_score"] != previous_score:
+            position, previous_score = i + 1, entry["ladder_score"]
+        entry["position"] = position
+    return {
+        "entries": entries,
+        "keys": [ladder_key(entry) for entry in entries],
+        "positions": {entry["puuid"]: i for i, entry in enumerate(entries)},
+    }
+
+
+class ApexLeagueIndex:
+    """puuid -> apex entry per (platform, queue), rebuilt off the request path"""
+
+    def __init__(self) -> None:
+        self._indexes: Dict[IndexKey, Dict[str, Dict[str, Any]]] = {}
+        # Полный ладдер в порядке ladder_key + позиции, строятся один раз на refresh
+        self._ladders: Dict[IndexKey, Dict[str, Any]] = {}
+        self._built_at: Dict[IndexKey, float] = {}
+        self._targets: Set[IndexKey] = set()
+        self._pending: Dict[IndexKey, asyncio.Task] = {}
+
+    def lookup(self, puuid: str, platform: str, queue: str = "RANKED_SOLO_5x5") -> Optional[Dict[str, Any]]:
+        """Apex entry for puuid, or None. Unknown (platform, queue) pairs are scheduled for a background build."""
+        key = (platform.lower(), queue)
+        index = self._indexes.get(key)
+        if index is None:
+            if is_ranked_target(*key):
+                self._schedule(key)
+            return None
+        return index.get(puuid)
+
+    def is_indexed(self, platform: str, queue: str = "RANKED_SOLO_5x5") -> bool:
+        return (platform.lower(), queue) in self._indexes
+
+    async def ensure(self, platform: str, queue: str = "RANKED_SOLO_5x5") -> bool:
+        """Wait for the (shared) first build of an unknown pair; False if it failed or the pair is invalid."""
+        key = (platform.lower(), queue)
+        if key not in self._indexes:
+            if not is_ranked_target(*key):
+                return False
+            self._schedule(key)
+            task = self._pending.get(key)
+            if task is not None:
+                await asyncio.shield(task)
+        return key in self._indexes
+
+    def ladder_page(
+        self,
+        platform: str,
+        queue: str = "RANKED_SOLO_5x5",
+        offset: int = 0,
+        limit: int = 100,
+        cursor: Optional[LadderKey] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+        """(entries, next cursor or None, total) from the pre-sorted ladder; cursor wins over offset."""
+        ladder = self._ladders.get((platform.lower(), queue))
+        if ladder is None:
+            return [], None, 0
+        start = bisect_right(ladder["keys"], cursor) if cursor else offset
+        entries = ladder["entries"][start:start + limit]
+        has_more = start + limit < len(ladder["entries"])
+        return entries, encode_puuid_cursor(entries[-1]) if entries and has_more else None, len(ladder["entries"])
+
+    def rank_of(self, puuid: str, platform: str, queue: str = "RANKED_SOLO_5x5") -> Optional[Dict[str, Any]]:
+        """Ladder entry (with position) for puuid via the position index, or None."""
+        ladder = self._ladders.get((platform.lower(), queue))
+        if ladder is None:
+            return None
+        position = ladder["positions"].get(puuid)
+        return ladder["entries"][position] if position is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            f"{platform}:{queue}": {"entries": len(index), "age_seconds": round(now - self._built_at[(platform, queue)], 1)}
+            for (platform, queue), index in self._indexes.items()
+        }
+
+    def track(self, keys: Iterable[IndexKey]) -> None:
+        self._targets.update((platform.lower(), queue) for platform, queue in keys)
+
+    async def rebuild(self, platform: str, queue: str = "RANKED_SOLO_5x5") -> int:
+        """Fetch all three apex leagues and swap in a new index; the old one stays on failure."""
+        key = (platform.lower(), queue)
+        leagues = await asyncio.gather(
+            riot_api.get_challenger_league(platform=key[0], queue=queue),
+            riot_api.get_grandmaster_league(platform=key[0], queue=queue),
+            riot_api.get_master_league(platform=key[0], queue=queue),
+        )
+        index: Dict[str, Dict[str, Any]] = {}
+        # Lowest tier first so a PUUID seen mid-promotion resolves to the higher tier.
+        for tier, league in reversed(list(zip(("CHALLENGER", "GRANDMASTER", "MASTER"), leagues))):
+            for entry in league.get("entries", []):
+                puuid = entry.get("puuid")
+                if puuid:
+                    index[puuid] = apex_entry(tier, entry)
+
+        self._ladders[key] = build_ladder(index)
+        self._indexes[key] = index
+        self._built_at[key] = time.time()
+        # В периодический refresh попадают только пары, которые хоть раз собрались
+        self._targets.add(key)
+        return len(index)
+
+    async def refresh_all(self) -> None:
+        keys = sorted(self._targets)
+        results = await asyncio.gather(*(self.rebuild(*key) for key in keys), return_exceptions=True)
+        for (platform, queue), result in zip(keys, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Apex index refresh failed for {platform}/{queue}: {result}")
+
+    async def refresh_loop(self, interval_seconds: int) -> None:
+        """Periodically rebuild every tracked index (runs until cancelled)."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await self.refresh_all()
+
+    def _schedule(self, key: IndexKey) -> None:
+        task = self._pending.get(key)
+        if task is not None and not task.done():
+            return
+        try:
+            self._pending[key] = asyncio.get_running_loop().create_task(self._build_quietly(key))
+        except RuntimeError:
+            pass
+
+    async def _build_quietly(self, key: IndexKey) -> None:
+        try:
+            await self.rebuild(*key)
+        except Exception as e:
+            logger.warning(f"Apex index build failed for {key[0]}/{key[1]}: {e}")
+
+
+def configured_targets() -> List[IndexKey]:
+    return [
+        (platform.lower(), queue)
+        for platform in split_setting(settings.warmup_platforms)
+        for queue in split_setting(settings.apex_index_queues)
+    ]
+
+
+apex_index = ApexLeagueIndex()
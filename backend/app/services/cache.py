@@ -32,3 +32,7 @@ class TTLCache:
             "value": value,
             "expires_at": time.time() + ttl,
         }
+
+    def pop(self, key: str) -> Optional[Any]:
+        entry = self._store.pop(key, None)
+        return entry["value"] if entry else None
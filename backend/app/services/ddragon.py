@@ -1,116 +1,197 @@
 """
 Data Dragon helpers for resolving IDs to names and icons.
+
+Lookup tables are built once per patch version and kept in memory. The raw
+DDragon JSON for each version is persisted under ``settings.ddragon_cache_dir``
+so restarts and offline runs do not need the CDN.
 """
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 import httpx
 
+from app.config import settings
 from app.services.cache import TTLCache
 
 
 DDRAGON_BASE = "https://ddragon.leagueoflegends.com"
 DEFAULT_LOCALE = "en_US"
+BUNDLE_FILES = {
+    "items": "item.json",
+    "spells": "summoner.json",
+    "champions": "champion.json",
+    "runes": "runesReforged.json",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class DDragonTables:
+    """Prebuilt id -> detail lookup tables for one DDragon version."""
+
+    def __init__(self, version: str, raw: Dict[str, Any]) -> None:
+        self.version = version
+        self.items = _build_items(version, raw["items"])
+        self.spells = _build_spells(version, raw["spells"])
+        self.champions = _build_champions(version, raw["champions"])
+        # Spectator / match payloads carry the numeric champion key, not the id string
+        self.champions_by_key = {
+            int(champ["key"]): self.champions[champ["id"]]
+            for champ in raw["champions"].get("data", {}).values()
+            if str(champ.get("key", "")).isdigit()
+        }
+        self.runes = _build_runes(raw["runes"])
 
 
 class DDragonService:
-    def __init__(self) -> None:
+    def __init__(self, bundle_dir: Optional[str] = None) -> None:
         self.cache = TTLCache(default_ttl_seconds=3600, max_size=128)
+        self.bundle_dir = Path(bundle_dir or settings.ddragon_cache_dir)
+        self._tables: Dict[str, DDragonTables] = {}
+        self._current: Optional[DDragonTables] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def current_version(self) -> Optional[str]:
+        return self._current.version if self._current else None
 
     async def get_latest_version(self) -> str:
         cached = self.cache.get("ddragon:version")
         if cached:
             return cached
 
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{DDRAGON_BASE}/api/versions.json", timeout=10.0)
-            resp.raise_for_status()
-            versions = resp.json()
-            version = versions[0]
-            self.cache.set("ddragon:version", version, ttl_seconds=21600)
-            return version
+        try:
+            async with httpx.AsyncClient() as client:
+                resp = await client.get(f"{DDRAGON_BASE}/api/versions.json", timeout=10.0)
+                resp.raise_for_status()
+                versions = resp.json()
+        except httpx.HTTPError:
+            local = self._latest_bundle_version()
+            if not local:
+                raise
+            logger.warning(f"DDragon CDN unavailable, using local bundle {local}")
+            return local
 
-    async def _get_json(self, path: str, cache_key: str, ttl: int = 21600) -> Any:
-        cached = self.cache.get(cache_key)
-        if cached:
-            return cached
+        version = versions[0]
+        self.cache.set("ddragon:version", version, ttl_seconds=21600)
+        return version
+
+    async def load_tables(self, version: str) -> DDragonTables:
+        """Return lookup tables for a version, building them at most once."""
+        tables = self._tables.get(version)
+        if tables:
+            return tables
 
+        async with self._lock:
+            tables = self._tables.get(version)
+            if tables:
+                return tables
+            raw = {name: await self._load_raw(version, name) for name in BUNDLE_FILES}
+            tables = DDragonTables(version, raw)
+            self._tables[version] = tables
+            return tables
+
+    async def get_tables(self) -> DDragonTables:
+        """Tables for the current patch; the request path never rebuilds them."""
+        if self._current:
+            return self._current
+        tables = await self.load_tables(await self.get_latest_version())
+        self._current = tables
+        return tables
+
+    async def load_from_bundle(self) -> Optional[DDragonTables]:
+        """Activate the newest locally persisted version without touching the network."""
+        version = self._latest_bundle_version()
+        if not version:
+            return None
+        tables = await self.load_tables(version)
+        if not self._current:
+            self._current = tables
+        return tables
+
+    async def refresh(self) -> bool:
+        """Check for a new patch and swap tables in if one is out. Returns True on swap."""
+        self.cache.pop("ddragon:version")
+        version = await self.get_latest_version()
+        if version == self.current_version:
+            return False
+
+        tables = await self.load_tables(version)
+        previous = self._current
+        self._current = tables
+        if previous:
+            self._tables.pop(previous.version, None)
+        logger.info(f"DDragon tables switched to {version}")
+        return True
+
+    async def refresh_loop(self, interval_seconds: int = 3600) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"DDragon refresh failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    async def _load_raw(self, version: str, name: str) -> Any:
+        path = self.bundle_dir / version / BUNDLE_FILES[name]
+        if path.exists():
+            try:
+                return json.loads(await asyncio.to_thread(path.read_text, encoding="utf-8"))
+            except json.JSONDecodeError:
+                # Обрезанный файл (старая запись упала посередине) — считаем промахом и перекачиваем
+                logger.warning(f"Corrupt DDragon bundle {path}, re-downloading")
+
+        url = f"{DDRAGON_BASE}/cdn/{version}/data/{DEFAULT_LOCALE}/{BUNDLE_FILES[name]}"
         async with httpx.AsyncClient() as client:
-            resp = await client.get(path, timeout=10.0)
+            resp = await client.get(url, timeout=10.0)
             resp.raise_for_status()
             data = resp.json()
-            self.cache.set(cache_key, data, ttl_seconds=ttl)
-            return data
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(_write_atomic, path, json.dumps(data))
+        except OSError as e:
+            logger.warning(f"Could not persist DDragon bundle {path}: {e}")
+        return data
+
+    def _latest_bundle_version(self) -> Optional[str]:
+        if not self.bundle_dir.is_dir():
+            return None
+        versions = [
+            d.name
+            for d in self.bundle_dir.iterdir()
+            if d.is_dir() and all((d / filename).exists() for filename in BUNDLE_FILES.values())
+        ]
+        if not versions:
+            return None
+        return max(versions, key=_version_key)
 
     async def get_items(self, version: str) -> Dict[int, Dict[str, str]]:
-        url = f"{DDRAGON_BASE}/cdn/{version}/data/{DEFAULT_LOCALE}/item.json"
-        data = await self._get_json(url, f"ddragon:items:{version}")
-        items = {}
-        for item_id, item in data.get("data", {}).items():
-            items[int(item_id)] = {
-                "id": int(item_id),
-                "name": item.get("name"),
-                "icon": f"{DDRAGON_BASE}/cdn/{version}/img/item/{item.get('image', {}).get('full')}",
-            }
-        return items
+        return (await self.load_tables(version)).items
 
     async def get_spells(self, version: str) -> Dict[int, Dict[str, str]]:
-        url = f"{DDRAGON_BASE}/cdn/{version}/data/{DEFAULT_LOCALE}/summoner.json"
-        data = await self._get_json(url, f"ddragon:spells:{version}")
-        spells = {}
-        for spell in data.get("data", {}).values():
-            spell_id = int(spell.get("key"))
-            spells[spell_id] = {
-                "id": spell_id,
-                "name": spell.get("name"),
-                "icon": f"{DDRAGON_BASE}/cdn/{version}/img/spell/{spell.get('image', {}).get('full')}",
-            }
-        return spells
+        return (await self.load_tables(version)).spells
 
     async def get_champions(self, version: str) -> Dict[str, Dict[str, str]]:
-        url = f"{DDRAGON_BASE}/cdn/{version}/data/{DEFAULT_LOCALE}/champion.json"
-        data = await self._get_json(url, f"ddragon:champions:{version}")
-        champs = {}
-        for champ in data.get("data", {}).values():
-            champ_key = champ.get("id")
-            champs[champ_key] = {
-                "id": champ_key,
-                "name": champ.get("name"),
-                "icon": f"{DDRAGON_BASE}/cdn/{version}/img/champion/{champ.get('image', {}).get('full')}",
-            }
-        return champs
+        return (await self.load_tables(version)).champions
 
     async def get_runes(self, version: str) -> Dict[str, Dict[int, Dict[str, str]]]:
-        url = f"{DDRAGON_BASE}/cdn/{version}/data/{DEFAULT_LOCALE}/runesReforged.json"
-        data = await self._get_json(url, f"ddragon:runes:{version}")
-        perk_map: Dict[int, Dict[str, str]] = {}
-        style_map: Dict[int, Dict[str, str]] = {}
-
-        for style in data:
-            style_id = style.get("id")
-            style_map[style_id] = {
-                "id": style_id,
-                "name": style.get("name"),
-                "icon": f"{DDRAGON_BASE}/cdn/img/{style.get('icon')}",
-            }
-            for slot in style.get("slots", []):
-                for rune in slot.get("runes", []):
-                    perk_id = rune.get("id")
-                    perk_map[perk_id] = {
-                        "id": perk_id,
-                        "name": rune.get("name"),
-                        "icon": f"{DDRAGON_BASE}/cdn/img/{rune.get('icon')}",
-                    }
-
-        return {"perks": perk_map, "styles": style_map}
+        return (await self.load_tables(version)).runes
 
     async def enrich_recent_matches(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         if not matches:
             return matches
 
-        version = await self.get_latest_version()
-        items = await self.get_items(version)
-        spells = await self.get_spells(version)
-        champions = await self.get_champions(version)
-        runes = await self.get_runes(version)
+        tables = await self.get_tables()
+        items = tables.items
+        spells = tables.spells
+        champions = tables.champions
+        runes = tables.runes
 
         for match in matches:
             match["champion_detail"] = champions.get(match.get("champion"), None)
@@ -142,4 +223,79 @@ class DDragonService:
         return matches
 
 
+def _write_atomic(path: Path, text: str) -> None:
+    """Write via a temp file in the same directory + os.replace: readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def _version_key(version: str) -> tuple:
+    return tuple(int(part) if part.isdigit() else 0 for part in version.split("."))
+
+
+def _build_items(version: str, data: Dict[str, Any]) -> Dict[int, Dict[str, str]]:
+    items = {}
+    for item_id, item in data.get("data", {}).items():
+        items[int(item_id)] = {
+            "id": int(item_id),
+            "name": item.get("name"),
+            "icon": f"{DDRAGON_BASE}/cdn/{version}/img/item/{item.get('image', {}).get('full')}",
+        }
+    return items
+
+
+def _build_spells(version: str, data: Dict[str, Any]) -> Dict[int, Dict[str, str]]:
+    spells = {}
+    for spell in data.get("data", {}).values():
+        spell_id = int(spell.get("key"))
+        spells[spell_id] = {
+            "id": spell_id,
+            "name": spell.get("name"),
+            "icon": f"{DDRAGON_BASE}/cdn/{version}/img/spell/{spell.get('image', {}).get('full')}",
+        }
+    return spells
+
+
+def _build_champions(version: str, data: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    champs = {}
+    for champ in data.get("data", {}).values():
+        champ_key = champ.get("id")
+        champs[champ_key] = {
+            "id": champ_key,
+            "name": champ.get("name"),
+            "icon": f"{DDRAGON_BASE}/cdn/{version}/img/champion/{champ.get('image', {}).get('full')}",
+        }
+    return champs
+
+
+def _build_runes(data: List[Dict[str, Any]]) -> Dict[str, Dict[int, Dict[str, str]]]:
+    perk_map: Dict[int, Dict[str, str]] = {}
+    style_map: Dict[int, Dict[str, str]] = {}
+
+    for style in data:
+        style_id = style.get("id")
+        style_map[style_id] = {
+            "id": style_id,
+            "name": style.get("name"),
+            "icon": f"{DDRAGON_BASE}/cdn/img/{style.get('icon')}",
+        }
+        for slot in style.get("slots", []):
+            for rune in slot.get("runes", []):
+                perk_id = rune.get("id")
+                perk_map[perk_id] = {
+                    "id": perk_id,
+                    "name": rune.get("name"),
+                    "icon": f"{DDRAGON_BASE}/cdn/img/{rune.get('icon')}",
+                }
+
+    return {"perks": perk_map, "styles": style_map}
+
+
 ddragon = DDragonService()
@@ -0,0 +1,35 @@
+"""
+Request-level latency budget.
+
+The deadline lives in a context variable, so it follows the request into every
+task spawned for it (asyncio copies the context on task creation) and
+RiotAPIService can clamp each outgoing call to the time that is left.
+"""
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+@contextlib.contextmanager
+def request_deadline(budget_ms: Optional[int]) -> Iterator[None]:
+    """Set a deadline ``budget_ms`` from now for the enclosed block (None = no limit)."""
+    if budget_ms is None:
+        yield
+        return
+    token = _deadline.set(time.monotonic() + budget_ms / 1000)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_seconds() -> Optional[float]:
+    """Seconds left before the current deadline, or None when no deadline is set."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
@@ -0,0 +1,178 @@
+"""
+Cross-platform apex ladder ("world top N").
+
+Each platform's Challenger/Grandmaster/Master lists are fetched concurrently
+(one semaphore per platform keeps a refresh inside that platform's rate
+budget), sorted by ladder_score, then combined with a streaming k-way merge
+that stops after the top N. The result is cached as one ranked array with a
+parallel key list, so rank-of-player and cursor lookups are a bisect.
+"""
+import asyncio
+import heapq
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.apex_index import RANKED_QUEUES, split_setting
+from app.services.ladder import APEX_TIERS, LadderKey, encode_puuid_cursor, ladder_key, ladder_score
+from app.services.riot_api import riot_api
+
+logger = logging.getLogger(__name__)
+
+
+class GlobalLadder:
+    """One merged, ranked apex ladder per queue across all configured platforms"""
+
+    def __init__(self, platforms: List[str], size: int, platform_concurrency: int) -> None:
+        self.platforms = [platform.lower() for platform in platforms]
+        self.size = size
+        self._platform_limits = {
+            platform: asyncio.Semaphore(platform_concurrency) for platform in self.platforms
+        }
+        self._ladders: Dict[str, Dict[str, Any]] = {}
+        self._queues: set = set()
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def get(self, queue: str = "RANKED_SOLO_5x5") -> Optional[Dict[str, Any]]:
+        return self._ladders.get(queue)
+
+    async def ensure(self, queue: str = "RANKED_SOLO_5x5") -> Dict[str, Any]:
+        """Ladder for queue; the first request for a new queue waits for the shared build. ValueError for non-ranked queues."""
+        ladder = self._ladders.get(queue)
+        if ladder is not None:
+            return ladder
+        if queue not in RANKED_QUEUES:
+            raise ValueError(f"Unknown ranked queue: {queue}")
+        task = self._pending.get(queue)
+        if task is None or task.done():
+            task = asyncio.get_running_loop().create_task(self.rebuild(queue))
+            self._pending[queue] = task
+        await asyncio.shield(task)
+        return self._ladders[queue]
+
+    def page(self, queue: str, limit: int, cursor: Optional[LadderKey] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """(entries after cursor, next cursor or None); entries carry their global rank."""
+        ladder = self._ladders[queue]
+        start = bisect_right(ladder["keys"], cursor) if cursor else 0
+        entries = ladder["entries"][start:start + limit]
+        has_more = start + limit < len(ladder["entries"])
+        return entries, encode_puuid_cursor(entries[-1]) if entries and has_more else None
+
+    def rank_of(self, puuid: str, queue: str = "RANKED_SOLO_5x5") -> Optional[Dict[str, Any]]:
+        """Ladder entry for puuid, or None when outside the global top N."""
+        ladder = self._ladders.get(queue)
+        if ladder is None:
+            return None
+        score = ladder["scores"].get(puuid)
+        if score is None:
+            return None
+        return ladder["entries"][bisect_left(ladder["keys"], (-score, puuid))]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            queue: {"players": len(ladder["entries"]), "generated_at": ladder["generated_at"]}
+            for queue, ladder in self._ladders.items()
+        }
+
+    def track(self, queues) -> None:
+        self._queues.update(queues)
+
+    async def rebuild(self, queue: str = "RANKED_SOLO_5x5") -> int:
+        """Refresh every platform concurrently, merge and swap in the new ladder."""
+        self._queues.add(queue)
+        results = await asyncio.gather(
+            *(self._platform_ladder(platform, queue) for platform in self.platforms),
+            return_exceptions=True,
+        )
+        per_platform: List[List[Dict[str, Any]]] = []
+        failed: List[str] = []
+        for platform, result in zip(self.platforms, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Global ladder: {platform}/{queue} failed: {result}")
+                failed.append(platform)
+                previous = self._ladders.get(queue)
+                # Упавшая платформа остаётся в ладдере со старыми данными
+                if previous is not None:
+                    per_platform.append([e for e in previous["entries"] if e["platform"] == platform])
+                continue
+            per_platform.append(result)
+
+        entries: List[Dict[str, Any]] = []
+        keys: List[LadderKey] = []
+        scores: Dict[str, int] = {}
+        previous_score: Optional[int] = None
+        rank = 0
+        for entry in heapq.merge(*per_platform, key=ladder_key):
+            if len(entries) >= self.size:
+                break
+            # Аккаунт в апексе на нескольких платформах учитывается один раз (лучшая позиция)
+            if entry["puuid"] in scores:
+                continue
+            # Одинаковый ladder_score — одинаковый rank (1, 2, 2, 4 ...)
+            if entry["ladder_score"] != previous_score:
+                rank, previous_score = len(entries) + 1, entry["ladder_score"]
+            entries.append({**entry, "rank": rank})
+            keys.append(ladder_key(entry))
+            scores[entry["puuid"]] = entry["ladder_score"]
+
+        self._ladders[queue] = {
+            "queue": queue,
+            "entries": entries,
+            "keys": keys,
+            "scores": scores,
+            "platforms": self.platforms,
+            "failed_platforms": failed,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        return len(entries)
+
+    async def _platform_ladder(self, platform: str, queue: str) -> List[Dict[str, Any]]:
+        """One platform's apex entries sorted in ladder order (already at most size long)."""
+        league_calls = (riot_api.get_challenger_league, riot_api.get_grandmaster_league, riot_api.get_master_league)
+        limit = self._platform_limits[platform]
+
+        async def _league(call):
+            async with limit:
+                return await call(platform=platform, queue=queue)
+
+        leagues = await asyncio.gather(*(_league(call) for call in league_calls))
+        entries = []
+        for tier, league in zip(APEX_TIERS, leagues):
+            for entry in league.get("entries", []):
+                puuid = entry.get("puuid")
+                if not puuid:
+                    continue
+                lp = entry.get("leaguePoints", 0)
+                entries.append({
+                    "puuid": puuid,
+                    "platform": platform,
+                    "tier": tier,
+                    "league_points": lp,
+                    "wins": entry.get("wins", 0),
+                    "losses": entry.get("losses", 0),
+                    "ladder_score": ladder_score(tier, "I", lp),
+                })
+        entries.sort(key=ladder_key)
+        return entries[:self.size]
+
+    async def refresh_all(self) -> None:
+        queues = sorted(self._queues)
+        results = await asyncio.gather(*(self.rebuild(queue) for queue in queues), return_exceptions=True)
+        for queue, result in zip(queues, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Global ladder refresh failed for {queue}: {result}")
+
+    async def refresh_loop(self, interval_seconds: int) -> None:
+        """Periodically rebuild every tracked queue (runs until cancelled)."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await self.refresh_all()
+
+
+global_ladder = GlobalLadder(
+    platforms=split_setting(settings.global_ladder_platforms),
+    size=settings.global_ladder_size,
+    platform_concurrency=settings.global_ladder_platform_concurrency,
+)
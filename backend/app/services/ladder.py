@@ -0,0 +1,78 @@
+"""
+Ranked ladder ordering.
+
+Tier, division and LP are folded into one integer so a ladder can be read
+from a single descending index instead of sorting strings:
+
+    ladder_score = tier_index * 10000 + division_index * 1000 + lp
+
+Apex tiers (Master+) have a single division and uncapped LP; the tier weight
+still keeps every Challenger above every Grandmaster, as on Riot's ladder.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+TIERS = (
+    "IRON", "BRONZE", "SILVER", "GOLD", "PLATINUM", "EMERALD", "DIAMOND",
+    "MASTER", "GRANDMASTER", "CHALLENGER",
+)
+DIVISIONS = ("IV", "III", "II", "I")
+APEX_TIERS = ("CHALLENGER", "GRANDMASTER", "MASTER")
+
+TIER_WEIGHT = 10000
+DIVISION_WEIGHT = 1000
+
+TIER_INDEX = {tier: index for index, tier in enumerate(TIERS)}
+DIVISION_INDEX = {division: index for index, division in enumerate(DIVISIONS)}
+
+
+def ladder_score(tier: Optional[str], rank: Optional[str], lp: Optional[int]) -> Optional[int]:
+    """Numeric ladder position; None for unranked / unknown tiers."""
+    tier_index = TIER_INDEX.get((tier or "").upper())
+    if tier_index is None:
+        return None
+    division_index = DIVISION_INDEX.get((rank or "I").upper(), len(DIVISIONS) - 1)
+    return tier_index * TIER_WEIGHT + division_index * DIVISION_WEIGHT + max(lp or 0, 0)
+
+
+def ladder_position(score: Optional[int]) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+    """Inverse of ladder_score: (tier, division, lp)."""
+    if score is None:
+        return None, None, None
+    tier_index, rest = divmod(score, TIER_WEIGHT)
+    division_index, lp = divmod(rest, DIVISION_WEIGHT)
+    tier = TIERS[min(tier_index, len(TIERS) - 1)]
+    if tier in APEX_TIERS:
+        # Apex LP is uncapped and may spill past the division weight.
+        return tier, "I", rest - (len(DIVISIONS) - 1) * DIVISION_WEIGHT
+    return tier, DIVISIONS[division_index], lp
+
+
+def encode_cursor(score: int, row_id: int) -> str:
+    return f"{score}:{row_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """Inverse of encode_cursor; raises ValueError on malformed input."""
+    score, row_id = cursor.split(":", 1)
+    return int(score), int(row_id)
+
+
+# In-memory apex ladders are ordered by (-ladder_score, puuid): ascending
+# order is ladder order, ties broken by PUUID, so positions are a bisect away.
+LadderKey = Tuple[int, str]
+
+
+def ladder_key(entry: Dict[str, Any]) -> LadderKey:
+    return -entry["ladder_score"], entry["puuid"]
+
+
+def encode_puuid_cursor(entry: Dict[str, Any]) -> str:
+    return f"{entry['ladder_score']}:{entry['puuid']}"
+
+
+def decode_puuid_cursor(cursor: str) -> LadderKey:
+    """Inverse of encode_puuid_cursor (as a LadderKey); raises ValueError on malformed input."""
+    score, puuid = cursor.split(":", 1)
+    if not puuid:
+        raise ValueError("empty puuid")
+    return -int(score), puuid
@@ -0,0 +1,163 @@
+"""
+League Client (LCU) connection discovery and a shared HTTP client.
+
+The port/token are cached and only re-discovered when they can have changed:
+the lockfile the client writes on start (``name:pid:port:password:protocol``)
+disappeared or was rewritten, or the client PID is no longer alive. A full
+process scan therefore happens at most once per client start instead of on
+every LCU request; failed discoveries are retried at most every
+``lcu_discovery_retry_seconds``.
+"""
+import base64
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import psutil
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LCU_PROCESS_NAMES = ("LeagueClientUx.exe", "LeagueClientUx")
+DEFAULT_LOCKFILES = (
+    "C:/Riot Games/League of Legends/lockfile",
+    "/Applications/League of Legends.app/Contents/LoL/lockfile",
+)
+
+
+def connection_info(port: str, token: str, pid: Optional[int] = None) -> Dict[str, Any]:
+    auth = base64.b64encode(f"riot:{token}".encode()).decode()
+    return {
+        "port": port,
+        "token": token,
+        "pid": pid,
+        "base_url": f"https://127.0.0.1:{port}",
+        "auth_header": f"Basic {auth}",
+    }
+
+
+def parse_lockfile(path: str) -> Optional[Dict[str, Any]]:
+    """Connection info from a lockfile, or None when missing/unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            _, pid, port, password, _ = f.read().strip().split(":", 4)
+        return connection_info(port, password, int(pid))
+    except (OSError, ValueError):
+        return None
+
+
+class LCUConnection:
+    """Cached LCU connection info plus one keep-alive client (TLS verify off: self-signed cert)"""
+
+    def __init__(self) -> None:
+        self._info: Optional[Dict[str, Any]] = None
+        self._lockfile: Optional[str] = None
+        self._lockfile_mtime: Optional[float] = None
+        self._retry_at = 0.0
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def info(self) -> Optional[Dict[str, Any]]:
+        if self._info is not None and self._still_valid():
+            return self._info
+        self._info = None
+        if time.monotonic() < self._retry_at:
+            return None
+        self._info = self._discover()
+        if self._info is None:
+            self._retry_at = time.monotonic() + settings.lcu_discovery_retry_seconds
+        return self._info
+
+    def invalidate(self) -> None:
+        self._info = None
+        self._retry_at = 0.0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(verify=False, timeout=5.0)
+        return self._client
+
+    async def get(self, path: str) -> Optional[httpx.Response]:
+        """GET against the running client; None when it is not running or went away."""
+        info = self.info()
+        if info is None:
+            return None
+        try:
+            return await self.client.get(f"{info['base_url']}{path}", headers={"Authorization": info["auth_header"]})
+        except httpx.TransportError as e:
+            # Клиент перезапустился — порт/токен устарели
+            logger.debug(f"LCU request failed, rediscovering: {e}")
+            self.invalidate()
+            return None
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _still_valid(self) -> bool:
+        if self._lockfile is not None:
+            try:
+                if os.stat(self._lockfile).st_mtime != self._lockfile_mtime:
+                    return False
+            except OSError:
+                return False
+        pid = self._info.get("pid") if self._info else None
+        return pid is not None and psutil.pid_exists(pid)
+
+    def _discover(self) -> Optional[Dict[str, Any]]:
+        for path in self._lockfile_candidates():
+            info = self._from_lockfile(path)
+            if info is not None:
+                return info
+        return self._scan_processes()
+
+    def _lockfile_candidates(self) -> List[str]:
+        candidates = [settings.lcu_lockfile_path] if settings.lcu_lockfile_path else []
+        if self._lockfile:
+            candidates.append(self._lockfile)
+        return candidates + list(DEFAULT_LOCKFILES)
+
+    def _from_lockfile(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        info = parse_lockfile(path)
+        # Клиент мог упасть, не удалив lockfile
+        if info is not None and not psutil.pid_exists(info["pid"]):
+            return None
+        if info is not None:
+            self._lockfile, self._lockfile_mtime = path, mtime
+        return info
+
+    def _scan_processes(self) -> Optional[Dict[str, Any]]:
+        """Slow path: find LeagueClientUx and read port/token from its command line."""
+        for process in psutil.process_iter(['name', 'cmdline', 'exe']):
+            try:
+                if process.info['name'] not in LCU_PROCESS_NAMES:
+                    continue
+                cmdline = ' '.join(process.info['cmdline'] or [])
+                port_match = re.search(r'--app-port=(\d+)', cmdline)
+                token_match = re.search(r'--remoting-auth-token=([\w-]+)', cmdline)
+                if not (port_match and token_match):
+                    continue
+
+                # lockfile лежит рядом с клиентом — дальше валидируем по нему, без сканирования
+                if process.info.get('exe'):
+                    info = self._from_lockfile(os.path.join(os.path.dirname(process.info['exe']), "lockfile"))
+                    if info is not None:
+                        return info
+                self._lockfile = self._lockfile_mtime = None
+                return connection_info(port_match.group(1), token_match.group(1), process.pid)
+
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+        return None
+
+
+lcu_connection = LCUConnection()
@@ -0,0 +1,175 @@
+"""
+Materialized apex leaderboards (Challenger -> Grandmaster -> Master).
+
+A background refresher rebuilds one enriched board per (platform, queue) on a
+schedule. Profiles (summoner icon + Riot ID) come from the persistent PUUID
+directory, so a refresh costs three league calls plus the newcomers. Boards
+are swapped in with a single assignment; /api/leaderboard only slices them.
+Each refresh also appends LP snapshots for the players we already track.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app import crud
+from app.config import settings
+from app.database import AsyncSessionLocal, DB_UNAVAILABLE_ERRORS
+from app.services.apex_index import is_ranked_target
+from app.services.puuid_directory import puuid_directory
+from app.services.riot_api import RiotAPIError, riot_api
+
+logger = logging.getLogger(__name__)
+
+BoardKey = Tuple[str, str]
+
+APEX_LEAGUES = ("CHALLENGER", "GRANDMASTER", "MASTER")
+
+
+def leaderboard_player(entry: Dict[str, Any], tier: str, profile: Dict[str, Any]) -> Dict[str, Any]:
+    wins = entry.get("wins", 0)
+    losses = entry.get("losses", 0)
+    total = max(wins + losses, 1)
+    return {
+        "summoner_name": profile.get("summoner_name") or entry.get("summonerName", "Unknown"),
+        "riot_id": profile.get("riot_id"),
+        "league_points": entry.get("leaguePoints", 0),
+        "wins": wins,
+        "losses": losses,
+        "winrate": round((wins / total) * 100, 1),
+        "hot_streak": entry.get("hotStreak", False),
+        "veteran": entry.get("veteran", False),
+        "rank": entry.get("rank"),
+        "tier": tier,
+        "profile_icon_id": profile.get("profile_icon_id"),
+        "puuid": entry.get("puuid"),
+    }
+
+
+async def record_snapshots(queue: str, entries: List[Tuple[Dict[str, Any], str]]) -> int:
+    """Append ranked_snapshots for board entries that are known players (one bulk INSERT, best effort)."""
+    async with AsyncSessionLocal() as db:
+        try:
+            player_ids = await crud.get_player_ids_by_puuids_async(db, [entry.get("puuid") for entry, _ in entries])
+            rows = [
+                crud.snapshot_row(
+                    player_ids[entry["puuid"]], queue, tier, "I",
+                    entry.get("leaguePoints", 0), entry.get("wins", 0), entry.get("losses", 0),
+                )
+                for entry, tier in entries
+                if entry.get("puuid") in player_ids
+            ]
+            return await crud.bulk_append_ranked_snapshots_async(db, rows)
+        except DB_UNAVAILABLE_ERRORS as e:
+            await db.rollback()
+            logger.warning(f"Leaderboard snapshots skipped: {e}")
+            return 0
+
+
+class MaterializedLeaderboards:
+    """Enriched top-N boards per (platform, queue), built off the request path"""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._boards: Dict[BoardKey, Dict[str, Any]] = {}
+        self._targets: set = set()
+        self._pending: Dict[BoardKey, asyncio.Task] = {}
+
+    def get(self, platform: str, queue: str = "RANKED_SOLO_5x5") -> Optional[Dict[str, Any]]:
+        return self._boards.get((platform.lower(), queue))
+
+    async def ensure(self, platform: str, queue: str = "RANKED_SOLO_5x5") -> Dict[str, Any]:
+        """
+        Board for (platform, queue); the first request for a new pair waits for the shared build.
+        ValueError for anything but a real platform + ranked queue.
+        """
+        key = (platform.lower(), queue)
+        board = self._boards.get(key)
+        if board is not None:
+            return board
+        if not is_ranked_target(*key):
+            raise ValueError(f"Unknown platform or queue: {platform}/{queue}")
+        task = self._pending.get(key)
+        if task is None or task.done():
+            task = asyncio.get_running_loop().create_task(self.rebuild(*key))
+            self._pending[key] = task
+        await asyncio.shield(task)
+        return self._boards[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            f"{platform}:{queue}": {"players": len(board["players"]), "generated_at": board["generated_at"]}
+            for (platform, queue), board in self._boards.items()
+        }
+
+    def track(self, keys) -> None:
+        self._targets.update((platform.lower(), queue) for platform, queue in keys)
+
+    async def rebuild(self, platform: str, queue: str = "RANKED_SOLO_5x5") -> int:
+        """Fetch leagues, enrich PUUIDs without a fresh profile and swap in the new board."""
+        key = (platform.lower(), queue)
+        started = time.perf_counter()
+
+        league_calls = {
+            "CHALLENGER": riot_api.get_challenger_league,
+            "GRANDMASTER": riot_api.get_grandmaster_league,
+            "MASTER": riot_api.get_master_league,
+        }
+        combined: List[Tuple[Dict[str, Any], str]] = []
+        header: Dict[str, Any] = {}
+        for tier in APEX_LEAGUES:
+            if len(combined) >= self.size:
+                break
+            try:
+                league = await league_calls[tier](platform=key[0], queue=queue)
+            except RiotAPIError as e:
+                if tier == "CHALLENGER":
+                    raise
+                logger.warning(f"Failed to fetch {tier.lower()} league for {key[0]}/{queue}: {e}")
+                continue
+            header = header or league
+            entries = sorted(league.get("entries", []), key=lambda e: e.get("leaguePoints", 0), reverse=True)
+            combined.extend((entry, tier) for entry in entries)
+        combined = combined[:self.size]
+
+        profiles = await puuid_directory.resolve([entry.get("puuid") for entry, _ in combined], key[0])
+        players = [
+            leaderboard_player(entry, tier, profiles.get(entry.get("puuid"), {}))
+            for entry, tier in combined
+        ]
+
+        snapshots = await record_snapshots(queue, combined)
+
+        self._boards[key] = {
+            "platform": key[0],
+            "queue": queue,
+            "tier": header.get("tier", "CHALLENGER"),
+            "name": header.get("name", "Challenger"),
+            "players": players,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "build": {
+                "seconds": round(time.perf_counter() - started, 3),
+                "profiles_resolved": sum(1 for p in players if p["riot_id"]),
+                "snapshots_written": snapshots,
+            },
+        }
+        # В периодический refresh попадают только пары, которые хоть раз собрались
+        self._targets.add(key)
+        return len(players)
+
+    async def refresh_all(self) -> None:
+        keys = sorted(self._targets)
+        results = await asyncio.gather(*(self.rebuild(*key) for key in keys), return_exceptions=True)
+        for (platform, queue), result in zip(keys, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Leaderboard refresh failed for {platform}/{queue}: {result}")
+
+    async def refresh_loop(self, interval_seconds: int) -> None:
+        """Periodically rebuild every tracked board (runs until cancelled)."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await self.refresh_all()
+
+
+leaderboards = MaterializedLeaderboards(size=settings.leaderboard_size)
@@ -0,0 +1,174 @@
+"""
+Shared live-game pollers for watch subscriptions.
+
+Every (platform, puuid) has at most one poll loop no matter how many viewers
+are subscribed; each viewer gets its own bounded queue. The loop adapts its
+interval (fast right after a game starts, slower mid-game, slow when the
+player is not in game) and publishes only when the game state changes.
+The loop stops when the last viewer leaves.
+"""
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from app.config import settings
+from app.services.riot_api import RiotAPIError, riot_api
+
+logger = logging.getLogger(__name__)
+
+WatchKey = Tuple[str, str]
+
+SUBSCRIBER_QUEUE_SIZE = 16
+# gameLength растёт каждую секунду — это не изменение состояния
+VOLATILE_KEYS = ("game_length",)
+
+
+def live_game_state(game_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Spectator-v5 payload (or None when not in game) in the /api/live/game shape."""
+    if not game_data:
+        return {"game_found": False}
+
+    participants_info = []
+    blue_team = []
+    red_team = []
+    for p in game_data.get("participants", []):
+        player_info = {
+            "summoner_name": p.get("riotId", p.get("summonerName", "Unknown")),
+            "puuid": p.get("puuid"),
+            "champion_id": p.get("championId"),
+            "team_id": p.get("teamId"),
+            "spell1": p.get("spell1Id"),
+            "spell2": p.get("spell2Id"),
+            "perks": {
+                "primary_style": p.get("perks", {}).get("perkStyle"),
+                "sub_style": p.get("perks", {}).get("perkSubStyle")
+            }
+        }
+        participants_info.append(player_info)
+        if p.get("teamId") == 100:
+            blue_team.append(player_info)
+        else:
+            red_team.append(player_info)
+
+    return {
+        "game_found": True,
+        "game_id": game_data.get("gameId"),
+        "game_mode": game_data.get("gameMode"),
+        "game_type": game_data.get("gameType"),
+        "game_queue_id": game_data.get("gameQueueConfigId"),
+        "map_id": game_data.get("mapId"),
+        "game_start_time": game_data.get("gameStartTime"),
+        "game_length": game_data.get("gameLength"),
+        "participants": participants_info,
+        "teams": {
+            "blue": blue_team,
+            "red": red_team
+        },
+        "banned_champions": game_data.get("bannedChampions", [])
+    }
+
+
+def state_diff(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level keys whose values changed (removed keys map to None), volatile keys ignored."""
+    keys = (set(previous) | set(current)) - set(VOLATILE_KEYS)
+    return {key: current.get(key) for key in keys if previous.get(key) != current.get(key)}
+
+
+class LiveGamePoller:
+    """One poll loop for one player, fanned out to every subscriber queue"""
+
+    def __init__(self, puuid: str, platform: str) -> None:
+        self.puuid = puuid
+        self.platform = platform
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.state: Optional[Dict[str, Any]] = None
+        self.polls = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def next_interval(self) -> float:
+        if not self.state or not self.state.get("game_found"):
+            return settings.live_watch_idle_seconds
+        # game_length может быть 0/отрицательным на загрузке — считаем от gameStartTime
+        start_ms = self.state.get("game_start_time") or 0
+        elapsed = time.time() - start_ms / 1000 if start_ms else 0
+        if elapsed < settings.live_watch_early_game_seconds:
+            return settings.live_watch_fast_seconds
+        return settings.live_watch_in_game_seconds
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        for queue in self.subscribers:
+            if queue.full():
+                # Медленный зритель теряет самое старое событие, а не тормозит остальных
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+    async def poll_once(self) -> None:
+        game_data = await riot_api.get_active_game(puuid=self.puuid, platform=self.platform)
+        self.polls += 1
+        current = live_game_state(game_data)
+        previous = self.state
+        self.state = current
+        if previous is None or previous.get("game_id") != current.get("game_id"):
+            self.publish("snapshot", current)
+            return
+        changes = state_diff(previous, current)
+        if changes:
+            self.publish("diff", changes)
+
+    async def run(self) -> None:
+        while self.subscribers:
+            try:
+                await self.poll_once()
+            except RiotAPIError as e:
+                logger.warning(f"Live watch poll failed for {self.platform}/{self.puuid}: {e.message}")
+                self.publish("error", {"status_code": e.status_code, "detail": e.message})
+            except Exception as e:
+                # Иначе задача молча завершится, а зрители будут вечно ждать в queue.get()
+                logger.exception(f"Live watch poll crashed for {self.platform}/{self.puuid}: {e}")
+                self.publish("error", {"status_code": 500, "detail": "Live game poll failed"})
+            await asyncio.sleep(self.next_interval())
+
+
+class LiveWatchHub:
+    """(platform, puuid) -> shared poller; pollers live only while someone watches"""
+
+    def __init__(self) -> None:
+        self._pollers: Dict[WatchKey, LiveGamePoller] = {}
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, puuid: str, platform: str) -> AsyncIterator[asyncio.Queue]:
+        """Queue of (event, data) tuples; the first event is the current snapshot."""
+        key = (platform.lower(), puuid)
+        poller = self._pollers.get(key)
+        if poller is None:
+            poller = self._pollers[key] = LiveGamePoller(puuid, key[0])
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        poller.subscribers.add(queue)
+        if poller.state is not None:
+            queue.put_nowait(("snapshot", poller.state))
+        if poller.task is None or poller.task.done():
+            poller.task = asyncio.create_task(poller.run())
+        try:
+            yield queue
+        finally:
+            poller.subscribers.discard(queue)
+            if not poller.subscribers:
+                self._pollers.pop(key, None)
+                if poller.task is not None:
+                    poller.task.cancel()
+
+    async def events(self, puuid: str, platform: str) -> AsyncIterator[tuple]:
+        async with self.subscribe(puuid, platform) as queue:
+            while True:
+                yield await queue.get()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pollers": len(self._pollers),
+            "subscribers": sum(len(poller.subscribers) for poller in self._pollers.values()),
+        }
+
+
+live_watch = LiveWatchHub()
@@ -0,0 +1,149 @@
+"""
+Loading-screen enrichment for a live game.
+
+All ten participants are resolved at once: ranked entries (one shared client,
+cached by riot_api), champion/spell/rune names from the in-memory DDragon
+tables, and a recent-form mini-summary computed from match_participants in a
+single query (cached per PUUID). Everything runs under a latency budget;
+whatever is not ready in time is left as None instead of delaying the reply.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app import crud
+from app.database import AsyncSessionLocal, DB_UNAVAILABLE_ERRORS
+from app.services.cache import TTLCache
+from app.services.ddragon import ddragon
+from app.services.deadline import remaining_seconds, request_deadline
+from app.services.riot_api import riot_api
+
+logger = logging.getLogger(__name__)
+
+RECENT_FORM_GAMES = 20
+RANKED_QUEUES = ("RANKED_SOLO_5x5", "RANKED_FLEX_SR")
+
+recent_form_cache = TTLCache(default_ttl_seconds=300, max_size=4096)
+
+
+def ranked_summary(entries: List[Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    summary: Dict[str, Optional[Dict[str, Any]]] = {queue: None for queue in RANKED_QUEUES}
+    for entry in entries or []:
+        queue = entry.get("queueType")
+        if queue not in summary:
+            continue
+        wins, losses = entry.get("wins", 0), entry.get("losses", 0)
+        total = wins + losses
+        summary[queue] = {
+            "tier": entry.get("tier"),
+            "rank": entry.get("rank"),
+            "lp": entry.get("leaguePoints", 0),
+            "wins": wins,
+            "losses": losses,
+            "winrate": round((wins / total) * 100, 1) if total > 0 else 0,
+            "hot_streak": entry.get("hotStreak", False),
+        }
+    return summary
+
+
+def recent_form(rows: List[Any]) -> Optional[Dict[str, Any]]:
+    """Mini-summary over stored match_participants rows (newest first); None if nothing stored."""
+    if not rows:
+        return None
+    games = len(rows)
+    wins = sum(1 for row in rows if row.win)
+    kills = sum(row.kills or 0 for row in rows)
+    deaths = sum(row.deaths or 0 for row in rows)
+    assists = sum(row.assists or 0 for row in rows)
+    champions: Dict[str, int] = {}
+    for row in rows:
+        if row.champion:
+            champions[row.champion] = champions.get(row.champion, 0) + 1
+    return {
+        "games": games,
+        "wins": wins,
+        "winrate": round(wins / games * 100, 1),
+        "kda": round((kills + assists) / max(deaths, 1), 2),
+        "last_results": "".join("W" if row.win else "L" for row in rows[:5]),
+        "top_champions": sorted(champions, key=champions.get, reverse=True)[:3],
+    }
+
+
+async def _ranked_for(puuids: List[str], platform: str) -> Dict[str, Any]:
+    # Каждый вызов ограничен отдельно: один медленный игрок не обнуляет остальных
+    async with httpx.AsyncClient() as client:
+        results = await asyncio.gather(*(
+            _bounded(riot_api.get_league_entries_by_puuid(puuid=puuid, platform=platform, client=client), None)
+            for puuid in puuids
+        ))
+    return {puuid: ranked_summary(result) for puuid, result in zip(puuids, results) if result is not None}
+
+
+async def _recent_form_for(puuids: List[str]) -> Dict[str, Any]:
+    forms = {puuid: recent_form_cache.get(puuid) for puuid in puuids}
+    missing = [puuid for puuid, form in forms.items() if form is None]
+    if missing:
+        async with AsyncSessionLocal() as db:
+            try:
+                rows = await crud.get_recent_participations_async(db, missing, RECENT_FORM_GAMES)
+            except DB_UNAVAILABLE_ERRORS as e:
+                logger.warning(f"Recent form skipped: {e}")
+                rows = {}
+        for puuid in missing:
+            if puuid in rows:
+                # Пустой результат тоже кэшируется ({"games": 0}), чтобы не спрашивать БД каждый раз
+                forms[puuid] = recent_form(rows[puuid]) or {"games": 0}
+                recent_form_cache.set(puuid, forms[puuid])
+    return forms
+
+
+async def _bounded(coro, default):
+    """Await coro within the current deadline; default when it runs out or fails."""
+    remaining = remaining_seconds()
+    try:
+        return await asyncio.wait_for(coro, timeout=max(remaining, 0) if remaining is not None else None)
+    except asyncio.TimeoutError:
+        return default
+    except Exception as e:
+        logger.warning(f"Lobby enrichment step failed: {e}")
+        return default
+
+
+async def enrich_lobby(state: Dict[str, Any], platform: str, budget_ms: int) -> Dict[str, Any]:
+    """Add ranked / champion / spells / recent_form to every participant of a live_game_state in place."""
+    participants = state.get("participants") or []
+    if not participants:
+        return state
+
+    started = time.perf_counter()
+    puuids = [p["puuid"] for p in participants if p.get("puuid")]
+    with request_deadline(budget_ms):
+        tables, ranked, forms = await asyncio.gather(
+            _bounded(ddragon.get_tables(), None),
+            _ranked_for(puuids, platform),
+            _bounded(_recent_form_for(puuids), {}),
+        )
+
+    champions = tables.champions_by_key if tables else {}
+    spells = tables.spells if tables else {}
+    styles = tables.runes.get("styles", {}) if tables else {}
+    for p in participants:
+        puuid = p.get("puuid")
+        p["champion"] = champions.get(p.get("champion_id"))
+        p["spells"] = [spells.get(p.get("spell1")), spells.get(p.get("spell2"))]
+        p["perk_styles"] = {
+            "primary": styles.get(p.get("perks", {}).get("primary_style")),
+            "sub": styles.get(p.get("perks", {}).get("sub_style")),
+        }
+        p["ranked"] = ranked.get(puuid)
+        p["recent_form"] = forms.get(puuid)
+
+    state["enrichment"] = {
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "budget_ms": budget_ms,
+        "partial": tables is None or len(ranked) < len(puuids) or any(forms.get(puuid) is None for puuid in puuids),
+    }
+    return state
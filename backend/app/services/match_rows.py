@@ -0,0 +1,112 @@
+"""
+Row builders for persisted matches.
+
+Pure functions from a Match-v5 payload to match_history / matches /
+match_participants rows. Kept apart from match_store so scripts can use them
+without importing the Riot client (and its settings).
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def match_id_of(match: Dict[str, Any]) -> str:
+    return match.get("metadata", {}).get("matchId", "UNKNOWN")
+
+
+def game_creation_of(match: Dict[str, Any]) -> Optional[datetime]:
+    game_creation_ms = match.get("info", {}).get("gameCreation")
+    if isinstance(game_creation_ms, (int, float)) and game_creation_ms > 0:
+        return datetime.fromtimestamp(game_creation_ms / 1000, tz=timezone.utc)
+    return None
+
+
+def match_history_row(player_id: int, match: Dict[str, Any], puuid: str) -> Optional[Dict[str, Any]]:
+    """match_history column values from this player's point of view (None if absent)."""
+    info = match.get("info", {})
+    participants = info.get("participants", [])
+    participant = next((p for p in participants if p.get("puuid") == puuid), None)
+    if not participant:
+        return None
+
+    return {
+        "player_id": player_id,
+        "match_id": match_id_of(match),
+        "game_mode": info.get("gameMode", "UNKNOWN"),
+        "game_duration": info.get("gameDuration", 0),
+        "game_creation": game_creation_of(match),
+        "champion_name": participant.get("championName", "Unknown"),
+        "kills": participant.get("kills", 0),
+        "deaths": participant.get("deaths", 0),
+        "assists": participant.get("assists", 0),
+        "win": bool(participant.get("win", False)),
+        "total_damage": participant.get("totalDamageDealtToChampions", 0),
+        "gold_earned": participant.get("goldEarned", 0),
+        "cs": participant.get("totalMinionsKilled", 0),
+        "vision_score": participant.get("visionScore", 0),
+        "raw_data": match,
+    }
+
+
+def normalized_rows(match: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    (matches row, match_participants rows) for one Match-v5 payload.
+    All ten participants are kept, so aggregates never need the raw JSON.
+    """
+    match_id = match_id_of(match)
+    info = match.get("info", {})
+    if match_id == "UNKNOWN" or not info.get("participants"):
+        return None, []
+
+    game_version = info.get("gameVersion") or ""
+    patch = ".".join(game_version.split(".")[:2]) or None
+    queue_id = info.get("queueId")
+    game_creation = game_creation_of(match)
+
+    match_row = {
+        "match_id": match_id,
+        "platform": (info.get("platformId") or match_id.split("_")[0]).lower(),
+        "queue_id": queue_id,
+        "game_mode": info.get("gameMode"),
+        "game_version": game_version or None,
+        "patch": patch,
+        "game_duration": info.get("gameDuration"),
+        "game_creation": game_creation,
+    }
+    participant_rows = [
+        {
+            "match_id": match_id,
+            "participant_id": p.get("participantId", index + 1),
+            "puuid": p.get("puuid", ""),
+            "team_id": p.get("teamId"),
+            "champion": p.get("championName"),
+            "champion_id": p.get("championId"),
+            "team_position": p.get("teamPosition") or None,
+            "kills": p.get("kills", 0),
+            "deaths": p.get("deaths", 0),
+            "assists": p.get("assists", 0),
+            "cs": p.get("totalMinionsKilled", 0) + p.get("neutralMinionsKilled", 0),
+            "gold_earned": p.get("goldEarned", 0),
+            "total_damage": p.get("totalDamageDealtToChampions", 0),
+            "vision_score": p.get("visionScore", 0),
+            "time_played": p.get("timePlayed") or info.get("gameDuration"),
+            "win": bool(p.get("win", False)),
+            "patch": patch,
+            "queue_id": queue_id,
+            "game_creation": game_creation,
+        }
+        for index, p in enumerate(info["participants"])
+    ]
+    return match_row, participant_rows
+
+
+def collect_normalized_rows(
+    match_details: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    match_rows: List[Dict[str, Any]] = []
+    participant_rows: List[Dict[str, Any]] = []
+    for match in match_details:
+        match_row, participants = normalized_rows(match)
+        if match_row:
+            match_rows.append(match_row)
+            participant_rows.extend(participants)
+    return match_rows, participant_rows
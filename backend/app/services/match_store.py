@@ -0,0 +1,120 @@
+"""
+Match repository: our database first, Riot Match-v5 only for what is missing.
+
+Full match payloads (zstd-compressed in match_payloads) are read back with a
+single IN query; only unknown match ids are fetched from Riot and then
+backfilled, so returning players cost almost no match quota.
+Persisted matches are also normalized into matches/match_participants
+(one typed row per participant) for SQL aggregates.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.database import DB_UNAVAILABLE_ERRORS
+from app.services.match_rows import collect_normalized_rows, match_history_row, match_id_of
+from app.services.riot_api import riot_api
+
+logger = logging.getLogger(__name__)
+
+
+async def get_stored_matches(db: Optional[AsyncSession], match_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Stored raw match payloads by match id; empty when the DB is unavailable."""
+    if db is None or not match_ids:
+        return {}
+    try:
+        return await crud.get_raw_matches_async(db, match_ids)
+    except DB_UNAVAILABLE_ERRORS:
+        await db.rollback()
+        return {}
+
+
+async def fetch_matches(
+    match_ids: List[str],
+    region: str,
+    platform: str,
+    client: Optional[httpx.AsyncClient] = None,
+    concurrency: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Fetch matches from Riot concurrently (at most `concurrency` in flight); failed ids are skipped."""
+    if not match_ids:
+        return []
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+    async def _fetch(match_id: str, session: httpx.AsyncClient) -> Dict[str, Any]:
+        if semaphore is None:
+            return await riot_api.get_match_details(match_id=match_id, region=region, platform=platform, client=session)
+        async with semaphore:
+            return await riot_api.get_match_details(match_id=match_id, region=region, platform=platform, client=session)
+
+    async def _gather(session: httpx.AsyncClient) -> List[Any]:
+        return await asyncio.gather(*(_fetch(match_id, session) for match_id in match_ids), return_exceptions=True)
+
+    if client:
+        results = await _gather(client)
+    else:
+        async with httpx.AsyncClient() as session:
+            results = await _gather(session)
+    return [m for m in results if isinstance(m, dict)]
+
+
+async def load_matches(
+    db: Optional[AsyncSession],
+    match_ids: List[str],
+    region: str,
+    platform: str,
+    concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Read-through lookup. Returns {"matches": [...] in match_ids order,
+    "fetched": [...] payloads that came from Riot and are not stored yet}.
+    """
+    stored = await get_stored_matches(db, match_ids)
+    fetched = await fetch_matches(
+        [mid for mid in match_ids if mid not in stored], region, platform, concurrency=concurrency
+    )
+
+    by_id = dict(stored)
+    for match in fetched:
+        by_id[match_id_of(match)] = match
+
+    return {
+        "matches": [by_id[mid] for mid in match_ids if mid in by_id],
+        "fetched": fetched,
+    }
+
+
+async def persist_matches(
+    db: AsyncSession,
+    player_id: int,
+    match_details: List[Dict[str, Any]],
+    puuid: str,
+) -> None:
+    """
+    Upsert match_history rows (with raw payload) in one statement and one
+    transaction, then the normalized matches/match_participants rows.
+    """
+    rows = [match_history_row(player_id, match, puuid) for match in match_details]
+    await crud.bulk_upsert_match_history_async(db, [row for row in rows if row])
+    await crud.bulk_insert_matches_async(db, *collect_normalized_rows(match_details))
+
+
+async def backfill_matches(
+    db: AsyncSession,
+    player_id: int,
+    match_details: List[Dict[str, Any]],
+    puuid: str,
+) -> None:
+    """Best-effort persist of freshly fetched matches; DB errors are logged and ignored."""
+    if not match_details:
+        return
+    try:
+        await persist_matches(db, player_id, match_details, puuid)
+    except (*DB_UNAVAILABLE_ERRORS, IntegrityError) as e:
+        await db.rollback()
+        logger.warning(f"Match backfill skipped: {e}")
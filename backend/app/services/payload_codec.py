@@ -0,0 +1,30 @@
+"""
+Compressed match payload encoding.
+
+Raw Match-v5 JSON is stored zstd-compressed in match_payloads instead of an
+uncompressed JSON column on match_history. Compact JSON compresses roughly
+8-10x, which keeps the per-player table narrow and its scans cheap.
+"""
+import json
+from typing import Any, Dict
+
+import zstandard
+
+ZSTD_CODEC = "zstd"
+ZSTD_LEVEL = 6
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    # Compressor objects are not safe to share across threads; they are cheap to create.
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+
+
+def decode_payload(data: bytes) -> Dict[str, Any]:
+    return json.loads(zstandard.ZstdDecompressor().decompress(data))
+
+
+def payload_row(match_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """match_payloads row for one raw match."""
+    data = encode_payload(payload)
+    return {"match_id": match_id, "codec": ZSTD_CODEC, "data": data}
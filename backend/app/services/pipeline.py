@@ -0,0 +1,72 @@
+"""
+Minimal async task graph for request pipelines.
+
+Stages declare their dependencies by name; each stage starts as soon as all of
+its dependencies have finished, so independent Riot calls overlap.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+
+StageFn = Callable[..., Awaitable[Any]]
+
+
+class TaskGraph:
+    def __init__(self) -> None:
+        self._stages: Dict[str, Tuple[Tuple[str, ...], StageFn]] = {}
+        self.timings: Dict[str, float] = {}
+
+    def add(self, name: str, fn: StageFn, deps: Iterable[str] = ()) -> "TaskGraph":
+        """Register a stage; fn receives dependency results as keyword arguments."""
+        self._stages[name] = (tuple(deps), fn)
+        return self
+
+    async def run(self, initial: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run all stages and return {name: result}. Values in ``initial`` are
+        treated as already-finished stages. The first failing stage cancels the
+        rest and its exception is re-raised.
+        """
+        loop = asyncio.get_running_loop()
+        futures: Dict[str, asyncio.Future] = {}
+        for name, value in (initial or {}).items():
+            future = loop.create_future()
+            future.set_result(value)
+            futures[name] = future
+
+        for name, (deps, _) in self._stages.items():
+            missing = [dep for dep in deps if dep not in self._stages and dep not in futures]
+            if missing:
+                raise ValueError(f"Stage {name} depends on unknown stages: {missing}")
+
+        started = time.perf_counter()
+        for name in self._stages:
+            if name not in futures:
+                futures[name] = asyncio.ensure_future(self._run_stage(name, futures))
+
+        pending = [f for name, f in futures.items() if name in self._stages and not f.done()]
+        try:
+            await asyncio.gather(*pending)
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            raise
+        finally:
+            self.timings["total"] = _elapsed_ms(started)
+
+        return {name: future.result() for name, future in futures.items()}
+
+    async def _run_stage(self, name: str, futures: Dict[str, asyncio.Future]) -> Any:
+        deps, fn = self._stages[name]
+        values = await asyncio.gather(*(futures[dep] for dep in deps))
+        started = time.perf_counter()
+        try:
+            return await fn(**dict(zip(deps, values)))
+        finally:
+            self.timings[name] = _elapsed_ms(started)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
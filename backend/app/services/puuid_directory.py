@@ -0,0 +1,176 @@
+"""
+Persistent PUUID directory: Riot ID (account-v1) and profile (summoner-v4) per PUUID.
+
+Reads are one IN query; only missing or stale field groups go to Riot, and the
+results are upserted back. A background job refreshes the stalest entries
+under a per-cycle Riot call budget, so leaderboard and lobby views are built
+almost entirely from local data.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from app import crud
+from app.config import settings
+from app.database import AsyncSessionLocal, DB_UNAVAILABLE_ERRORS
+from app.services.riot_api import RiotAPIService, riot_api
+
+logger = logging.getLogger(__name__)
+
+FETCH_CONCURRENCY = 5
+
+PLATFORM_TO_REGION = RiotAPIService.PLATFORM_TO_REGION
+
+
+def directory_profile(entry: Any) -> Dict[str, Any]:
+    """Directory row (ORM entry or dict) in the shape views consume."""
+    get = entry.get if isinstance(entry, dict) else lambda key: getattr(entry, key, None)
+    game_name, tag_line = get("game_name"), get("tag_line")
+    return {
+        "puuid": get("puuid"),
+        "game_name": game_name,
+        "tag_line": tag_line,
+        "riot_id": f"{game_name}#{tag_line}" if game_name and tag_line else None,
+        "summoner_name": get("summoner_name"),
+        "profile_icon_id": get("profile_icon_id"),
+        "summoner_level": get("summoner_level"),
+    }
+
+
+class PuuidDirectory:
+    """Read-through PUUID -> profile lookups backed by the puuid_directory table"""
+
+    def __init__(self, account_ttl_seconds: int, summoner_ttl_seconds: int) -> None:
+        self.account_ttl = timedelta(seconds=account_ttl_seconds)
+        self.summoner_ttl = timedelta(seconds=summoner_ttl_seconds)
+
+    async def resolve(
+        self,
+        puuids: List[str],
+        platform: str,
+        budget: Optional[int] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Profiles for puuids. Missing/stale field groups are fetched from Riot
+        (at most `budget` calls when given) and written back in one upsert.
+        Without a database every PUUID is fetched.
+        """
+        puuids = [puuid for puuid in dict.fromkeys(puuids) if puuid]
+        platform = platform.lower()
+        stored: Dict[str, Any] = {}
+        async with AsyncSessionLocal() as db:
+            try:
+                stored = await crud.get_directory_entries_async(db, puuids)
+            except DB_UNAVAILABLE_ERRORS as e:
+                logger.warning(f"PUUID directory read skipped: {e}")
+                db = None
+
+            now = datetime.now(timezone.utc)
+            jobs = []
+            for puuid in puuids:
+                entry = stored.get(puuid)
+                if self._is_stale(entry, "account_fetched_at", self.account_ttl, now):
+                    jobs.append((puuid, "account"))
+                if self._is_stale(entry, "summoner_fetched_at", self.summoner_ttl, now):
+                    jobs.append((puuid, "summoner"))
+            if budget is not None:
+                jobs = jobs[:budget]
+
+            rows = await self._fetch(jobs, platform)
+            if db is not None and rows:
+                try:
+                    await crud.upsert_directory_entries_async(db, rows)
+                except DB_UNAVAILABLE_ERRORS as e:
+                    await db.rollback()
+                    logger.warning(f"PUUID directory write skipped: {e}")
+
+        profiles = {puuid: directory_profile(entry) for puuid, entry in stored.items()}
+        for row in rows:
+            merged = {**profiles.get(row["puuid"], {}), **{k: v for k, v in row.items() if v is not None}}
+            profiles[row["puuid"]] = directory_profile(merged)
+        return profiles
+
+    async def refresh_stalest(self, budget: int) -> int:
+        """Refresh the oldest field groups, spending at most `budget` Riot calls."""
+        now = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            accounts = await crud.get_stale_directory_entries_async(
+                db, "account_fetched_at", now - self.account_ttl, budget
+            )
+            summoners = await crud.get_stale_directory_entries_async(
+                db, "summoner_fetched_at", now - self.summoner_ttl, budget
+            )
+            # Поочерёдно берём самые старые записи обеих групп, пока не кончится бюджет
+            candidates = sorted(
+                [(entry.account_fetched_at, entry.puuid, entry.platform, "account") for entry in accounts]
+                + [(entry.summoner_fetched_at, entry.puuid, entry.platform, "summoner") for entry in summoners],
+                key=lambda item: _aware(item[0]),
+            )[:budget]
+
+            by_platform: Dict[str, List] = {}
+            for _, puuid, platform, kind in candidates:
+                by_platform.setdefault(platform or "euw1", []).append((puuid, kind))
+            rows: List[Dict[str, Any]] = []
+            for platform, jobs in by_platform.items():
+                rows.extend(await self._fetch(jobs, platform))
+            await crud.upsert_directory_entries_async(db, rows)
+        return len(candidates)
+
+    async def refresh_loop(self, interval_seconds: int, budget: int) -> None:
+        """Periodically refresh the stalest entries (runs until cancelled)."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.refresh_stalest(budget)
+            except Exception as e:
+                logger.warning(f"PUUID directory refresh failed: {e}")
+
+    @staticmethod
+    def _is_stale(entry: Any, column: str, ttl: timedelta, now: datetime) -> bool:
+        fetched_at = getattr(entry, column, None) if entry is not None else None
+        return fetched_at is None or now - _aware(fetched_at) > ttl
+
+    async def _fetch(self, jobs: List, platform: str) -> List[Dict[str, Any]]:
+        """Run (puuid, "account"|"summoner") jobs against Riot; failures are skipped."""
+        region = PLATFORM_TO_REGION.get(platform, "europe")
+        sem = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        async def _one(puuid: str, kind: str) -> Optional[Dict[str, Any]]:
+            async with sem:
+                try:
+                    if kind == "account":
+                        account = await riot_api.get_account_by_puuid(puuid=puuid, region=region, platform=platform)
+                        return {
+                            "puuid": puuid,
+                            "platform": platform,
+                            "game_name": account.get("gameName"),
+                            "tag_line": account.get("tagLine"),
+                            "account_fetched_at": datetime.now(timezone.utc),
+                        }
+                    summoner = await riot_api.get_summoner_by_puuid(puuid=puuid, platform=platform)
+                    return {
+                        "puuid": puuid,
+                        "platform": platform,
+                        "summoner_name": summoner.get("name"),
+                        "profile_icon_id": summoner.get("profileIconId"),
+                        "summoner_level": summoner.get("summonerLevel"),
+                        "summoner_fetched_at": datetime.now(timezone.utc),
+                    }
+                except Exception as e:
+                    logger.debug(f"PUUID directory {kind} fetch failed for {puuid}: {e}")
+                    return None
+
+        results = await asyncio.gather(*(_one(puuid, kind) for puuid, kind in jobs))
+        return [row for row in results if row]
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite отдаёт naive datetime
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+puuid_directory = PuuidDirectory(
+    account_ttl_seconds=settings.puuid_directory_account_ttl_seconds,
+    summoner_ttl_seconds=settings.puuid_directory_summoner_ttl_seconds,
+)
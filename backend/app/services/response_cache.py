@@ -0,0 +1,77 @@
+"""
+Whole-response cache with strong ETags.
+
+Serialized response bodies are cached under a key that includes the latest
+match id, so a profile with no new games is served from memory (or as a 304
+when the client already has it) after a single cheap match-ids lookup.
+"""
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.services.cache import TTLCache
+
+
+class ResponseCache:
+    def __init__(self, default_ttl_seconds: int = 900, max_size: int = 512):
+        self.cache = TTLCache(default_ttl_seconds=default_ttl_seconds, max_size=max_size)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        return ":".join(str(part) for part in parts)
+
+    @staticmethod
+    def etag_for(body: bytes) -> str:
+        return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        return self.cache.get(key)
+
+    def set(self, key: str, etag: str, body: bytes) -> None:
+        self.cache.set(key, (etag, body))
+
+
+response_cache = ResponseCache()
+
+
+# Только для них If-None-Match может дать 304; POST всегда получает тело
+NOT_MODIFIED_METHODS = ("GET", "HEAD")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check with strong comparison: a W/ tag never matches our strong ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+async def cached_json_response(
+    request: Request,
+    key: str,
+    build: Callable[[], Awaitable[Tuple[Dict[str, Any], bool]]],
+    response_model: Type[BaseModel],
+) -> Response:
+    """
+    Serve ``key`` from the cache or build it. ``build`` returns (payload,
+    cacheable); payloads are validated against ``response_model`` once, when
+    they are built, not on every hit.
+    """
+    cached = response_cache.get(key)
+    if cached:
+        etag, body = cached
+    else:
+        payload, cacheable = await build()
+        body = response_model.model_validate(payload).model_dump_json().encode()
+        etag = response_cache.etag_for(body)
+        if cacheable:
+            response_cache.set(key, etag, body)
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.method in NOT_MODIFIED_METHODS and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,12 +1,14 @@
 """
 Riot API Service
 """
+import asyncio
 import httpx
 from typing import Dict, Any, Optional
 import logging
 
 from app.config import settings
 from app.services.cache import TTLCache
+from app.services.deadline import remaining_seconds
 
 logger = logging.getLogger(__name__)
 
@@ -97,12 +99,22 @@ class RiotAPIService:
             if cached:
                 return cached
 
+        remaining = remaining_seconds()
+        if remaining is not None:
+            if remaining <= 0:
+                raise RiotAPIError(504, "Request deadline exceeded")
+            timeout = min(timeout, remaining)
+
         try:
             if client:
-                response = await client.get(url, headers=self.headers, timeout=timeout)
+                response = await asyncio.wait_for(
+                    client.get(url, headers=self.headers, timeout=timeout), timeout
+                )
             else:
                 async with httpx.AsyncClient() as session:
-                    response = await session.get(url, headers=self.headers, timeout=timeout)
+                    response = await asyncio.wait_for(
+                        session.get(url, headers=self.headers, timeout=timeout), timeout
+                    )
 
             if response.status_code == 200:
                 data = response.json()
@@ -117,7 +129,7 @@ class RiotAPIService:
                 raise RiotAPIError(429, "Rate limit exceeded")
             else:
                 raise RiotAPIError(response.status_code, response.text)
-        except httpx.TimeoutException:
+        except (httpx.TimeoutException, asyncio.TimeoutError):
             logger.error(f"Timeout requesting {url}")
             raise RiotAPIError(504, "Request timeout")
         except httpx.RequestError as e:
@@ -186,13 +198,19 @@ class RiotAPIService:
         region: str = "europe",
         count: int = 20,
         start: int = 0,
+        match_type: Optional[str] = None,
+        queue: Optional[int] = None,
     ) -> list:
-        """Получить match history"""
+        """Получить match history (match_type: ranked/normal/..., queue: queueId)"""
         regional_base = self._regional_base(region)
         endpoint = f"/lol/match/v5/matches/by-puuid/{puuid}/ids?start={start}&count={count}"
+        if match_type:
+            endpoint += f"&type={match_type}"
+        if queue is not None:
+            endpoint += f"&queue={queue}"
         url = f"{regional_base}{endpoint}"
 
-        cache_key = f"matches:{region}:{puuid}:{start}:{count}"
+        cache_key = f"matches:{region}:{puuid}:{start}:{count}:{match_type}:{queue}"
         return await self._make_request(url, cache_key, cache_ttl=120)
 
     async def get_match_details(
@@ -243,6 +261,45 @@ class RiotAPIService:
                 return []
             raise
 
+    async def get_league_entries_by_puuid(
+        self,
+        puuid: str,
+        platform: str = "euw1",
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> list:
+        """Получить ранговые записи игрока по PUUID"""
+        platform_base = self._platform_base(platform)
+        endpoint = f"/lol/league/v4/entries/by-puuid/{puuid}"
+        url = f"{platform_base}{endpoint}"
+
+        cache_key = f"league:puuid:{platform}:{puuid}"
+        try:
+            return await self._make_request(url, cache_key, cache_ttl=300, client=client)
+        except RiotAPIError as e:
+            if e.status_code == 404:
+                return []
+            raise
+
+    async def get_active_game(
+        self,
+        puuid: str,
+        platform: str = "euw1",
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Текущий матч игрока (Spectator-v5 by PUUID); None если не в игре"""
+        platform_base = self._platform_base(platform)
+        endpoint = f"/lol/spectator/v5/active-games/by-summoner/{puuid}"
+        url = f"{platform_base}{endpoint}"
+
+        # Короткий TTL: несколько зрителей одного игрока делят один запрос
+        cache_key = f"spectator:{platform}:{puuid}"
+        try:
+            return await self._make_request(url, cache_key, cache_ttl=5, client=client)
+        except RiotAPIError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
     async def get_challenger_league(
         self,
         platform: str = "euw1",
@@ -299,3 +356,6 @@ class RiotAPIService:
             if e.status_code == 404:
                 return []
             raise
+
+
+riot_api = RiotAPIService()
@@ -1,10 +1,119 @@
 """
 Timeline analysis helpers.
+
+Participant frames are stored as one zstd-compressed int32 blob per match
+(match_timeline_frames); per-player summaries keep only the participant and
+lane opponent ids, and lane differentials are derived from the blob on read.
 """
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
+
+import numpy as np
+import zstandard
+
+from app.services.payload_codec import ZSTD_CODEC, ZSTD_LEVEL
+
+
+# Per-frame participant fields stored in the columnar arrays (last axis).
+FRAME_FIELDS = ("gold", "xp", "cs", "level", "x", "y")
+GOLD, XP, CS, LEVEL, POS_X, POS_Y = range(len(FRAME_FIELDS))
+MAX_PARTICIPANTS = 10
+LANE_MARKS_MIN = (10, 15)
+
+
+def build_frame_arrays(timeline: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert timeline participantFrames into columnar arrays.
+
+    Returns (timestamps[frames], frames[frames x participants x FRAME_FIELDS]).
+    """
+    raw_frames = timeline.get("info", {}).get("frames", [])
+    timestamps = np.zeros(len(raw_frames), dtype=np.int32)
+    frames = np.zeros((len(raw_frames), MAX_PARTICIPANTS, len(FRAME_FIELDS)), dtype=np.int32)
+
+    for frame_idx, frame in enumerate(raw_frames):
+        timestamps[frame_idx] = frame.get("timestamp", 0)
+        for key, pframe in (frame.get("participantFrames") or {}).items():
+            slot = int(pframe.get("participantId") or key) - 1
+            if not 0 <= slot < MAX_PARTICIPANTS:
+                continue
+            position = pframe.get("position") or {}
+            frames[frame_idx, slot] = (
+                pframe.get("totalGold", 0),
+                pframe.get("xp", 0),
+                pframe.get("minionsKilled", 0) + pframe.get("jungleMinionsKilled", 0),
+                pframe.get("level", 0),
+                position.get("x", 0),
+                position.get("y", 0),
+            )
+
+    return timestamps, frames
+
+
+def frames_row(match_id: str, timestamps: np.ndarray, frames: np.ndarray) -> Dict[str, Any]:
+    """match_timeline_frames row: timestamps + frames as little-endian int32, zstd-compressed."""
+    raw = timestamps.astype("<i4").tobytes() + frames.astype("<i4").tobytes()
+    return {
+        "match_id": match_id,
+        "codec": ZSTD_CODEC,
+        "frame_count": len(timestamps),
+        "data": zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw),
+    }
+
 
+def decode_frames(frame_count: int, data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    buffer = np.frombuffer(zstandard.ZstdDecompressor().decompress(data), dtype="<i4")
+    timestamps = buffer[:frame_count]
+    frames = buffer[frame_count:].reshape(frame_count, MAX_PARTICIPANTS, len(FRAME_FIELDS))
+    return timestamps, frames
 
-def summarize_timeline(timeline: Dict[str, Any], puuid: str) -> Dict[str, Any]:
+
+def lane_differentials(
+    timestamps: np.ndarray,
+    frames: np.ndarray,
+    participant_id: int,
+    opponent_id: int,
+) -> Dict[str, Any]:
+    """Gold/XP/CS differentials versus the lane opponent at fixed minute marks."""
+    if not len(timestamps):
+        return {}
+
+    me = participant_id - 1
+    opp = opponent_id - 1
+    diff = frames[:, me, :CS + 1] - frames[:, opp, :CS + 1]
+    marks = np.searchsorted(timestamps, [minute * 60000 for minute in LANE_MARKS_MIN])
+
+    result: Dict[str, Any] = {}
+    for minute, idx in zip(LANE_MARKS_MIN, marks):
+        if idx >= len(timestamps):
+            continue
+        result[f"gold_at_{minute}"] = int(frames[idx, me, GOLD])
+        result[f"gold_diff_at_{minute}"] = int(diff[idx, GOLD])
+        result[f"xp_diff_at_{minute}"] = int(diff[idx, XP])
+        result[f"cs_diff_at_{minute}"] = int(diff[idx, CS])
+
+    result["gold_diff_curve"] = diff[:, GOLD].tolist()
+    result["xp_diff_curve"] = diff[:, XP].tolist()
+    result["cs_diff_curve"] = diff[:, CS].tolist()
+    return result
+
+
+def find_lane_opponent(match: Dict[str, Any], puuid: str) -> Optional[str]:
+    """PUUID of the enemy with the same teamPosition, if any."""
+    participants = match.get("info", {}).get("participants", [])
+    me = next((p for p in participants if p.get("puuid") == puuid), None)
+    if not me or not me.get("teamPosition"):
+        return None
+    for participant in participants:
+        if participant.get("teamId") != me.get("teamId") and participant.get("teamPosition") == me.get("teamPosition"):
+            return participant.get("puuid")
+    return None
+
+
+def summarize_timeline(
+    timeline: Dict[str, Any],
+    puuid: str,
+    opponent_puuid: Optional[str] = None,
+) -> Dict[str, Any]:
     metadata = timeline.get("metadata", {})
     participants = metadata.get("participants", [])
     try:
@@ -56,7 +165,7 @@ def summarize_timeline(timeline: Dict[str, Any], puuid: str) -> Dict[str, Any]:
                     label = event.get("monsterType") or event.get("buildingType") or "Objective"
                     _add_turning_point(turning_points, timestamp, label.title(), "positive")
 
-    return {
+    summary = {
         "early_kills": early_kills,
         "early_deaths": early_deaths,
         "early_assists": early_assists,
@@ -66,6 +175,22 @@ def summarize_timeline(timeline: Dict[str, Any], puuid: str) -> Dict[str, Any]:
         "turning_points": turning_points[:5],
     }
 
+    # Лейн считается из frames-блоба матча при чтении, в сводке только id участников
+    summary["participant_id"] = participant_id
+    if opponent_puuid and opponent_puuid in participants:
+        summary["lane_opponent_id"] = participants.index(opponent_puuid) + 1
+
+    return summary
+
+
+def with_lane(summary: Dict[str, Any], arrays: Optional[Tuple[np.ndarray, np.ndarray]]) -> Dict[str, Any]:
+    """Copy of a stored summary with lane differentials from the match frames (if both are known)."""
+    opponent_id = summary.get("lane_opponent_id")
+    if not opponent_id or arrays is None:
+        return summary
+    lane = lane_differentials(arrays[0], arrays[1], summary["participant_id"], opponent_id)
+    return {**summary, "lane": lane} if lane else summary
+
 
 def _add_turning_point(
     points: List[Dict[str, Any]],
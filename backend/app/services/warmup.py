@@ -0,0 +1,107 @@
+"""
+Startup warm-up: preload DDragon tables, build the apex PUUID index and the
+materialized leaderboards, and prime Riot caches before the instance reports
+itself ready.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.apex_index import apex_index, configured_targets
+from app.services.ddragon import ddragon
+from app.services.leaderboard_cache import leaderboards
+from app.services.riot_api import riot_api
+
+logger = logging.getLogger(__name__)
+
+HOT_PLAYER_MATCHES = 20
+
+
+class WarmupState:
+    """Readiness bookkeeping exposed via /health"""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, str] = {}
+
+    def as_dict(self) -> Dict[str, Any]:
+        duration = None
+        if self.started_at and self.finished_at:
+            duration = round(self.finished_at - self.started_at, 2)
+        return {"ready": self.ready, "duration_seconds": duration, "steps": dict(self.steps)}
+
+
+warmup_state = WarmupState()
+
+
+def parse_hot_players(raw: str) -> List[Tuple[str, str, str]]:
+    """Parse "Name#TAG@platform" entries (platform defaults to euw1)."""
+    players = []
+    for item in (raw or "").split(","):
+        item = item.strip()
+        if "#" not in item:
+            continue
+        riot_id, _, platform = item.partition("@")
+        game_name, _, tag_line = riot_id.partition("#")
+        players.append((game_name, tag_line, (platform or "euw1").lower()))
+    return players
+
+
+async def _warm_ddragon() -> None:
+    if await ddragon.load_from_bundle() is None:
+        await ddragon.get_tables()
+
+
+async def _warm_player(game_name: str, tag_line: str, platform: str) -> None:
+    region = riot_api.PLATFORM_TO_REGION.get(platform, "europe")
+    account = await riot_api.get_account_by_riot_id(game_name=game_name, tag_line=tag_line, region=region)
+    puuid = account["puuid"]
+    # Те же ключи, что читают обработчики: ранги идут по PUUID, summoner id не нужен
+    await asyncio.gather(
+        riot_api.get_summoner_by_puuid(puuid=puuid, platform=platform),
+        riot_api.get_league_entries_by_puuid(puuid=puuid, platform=platform),
+    )
+    match_ids = await riot_api.get_match_history(puuid=puuid, region=region, count=HOT_PLAYER_MATCHES)
+    await asyncio.gather(
+        *[riot_api.get_match_details(match_id=mid, region=region, platform=platform) for mid in match_ids],
+        return_exceptions=True,
+    )
+
+
+async def _run_step(name: str, coro) -> None:
+    try:
+        await coro
+        warmup_state.steps[name] = "ok"
+    except Exception as e:
+        logger.warning(f"Warm-up step {name} failed: {e}")
+        warmup_state.steps[name] = f"error: {e}"
+
+
+async def run_warmup() -> None:
+    """
+    Warm caches, then flip readiness. Failed steps are recorded but do not
+    block readiness; the whole phase is capped by warmup_timeout_seconds.
+    """
+    warmup_state.started_at = time.time()
+    steps = [_run_step("ddragon", _warm_ddragon())]
+    # Tracked even if a build fails here, so the refresher keeps retrying.
+    apex_index.track(configured_targets())
+    leaderboards.track(configured_targets())
+    for platform, queue in configured_targets():
+        steps.append(_run_step(f"apex:{platform}:{queue}", apex_index.rebuild(platform, queue)))
+        steps.append(_run_step(f"leaderboard:{platform}:{queue}", leaderboards.rebuild(platform, queue)))
+    for game_name, tag_line, platform in parse_hot_players(settings.warmup_players):
+        steps.append(_run_step(f"player:{game_name}#{tag_line}@{platform}", _warm_player(game_name, tag_line, platform)))
+
+    try:
+        await asyncio.wait_for(asyncio.gather(*steps), timeout=settings.warmup_timeout_seconds)
+    except asyncio.TimeoutError:
+        logger.warning("Warm-up timed out, marking instance ready with partial caches")
+        warmup_state.steps["timeout"] = f"exceeded {settings.warmup_timeout_seconds}s"
+
+    warmup_state.finished_at = time.time()
+    warmup_state.ready = True
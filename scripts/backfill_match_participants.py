@@ -0,0 +1,56 @@
+import argparse
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# crud/match_rows import the backend as the "app" package; one namespace avoids
+# registering the models twice.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+# app.database reads DATABASE_URL at import time (app.config settings are not needed).
+load_dotenv("backend/.env")
+
+from app.database import SessionLocal
+from app import crud, models
+from app.services.match_rows import collect_normalized_rows
+from app.services.payload_codec import decode_payload
+
+
+def backfill(batch_size: int) -> None:
+    """Normalize stored raw match payloads into matches + match_participants."""
+    db = SessionLocal()
+    last_id = ""
+    total = 0
+    try:
+        while True:
+            # Keyset pagination keeps each batch an index range scan.
+            batch = (
+                db.query(models.MatchPayload.match_id, models.MatchPayload.data)
+                .filter(models.MatchPayload.match_id > last_id)
+                .order_by(models.MatchPayload.match_id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            match_rows, participant_rows = collect_normalized_rows([decode_payload(data) for _, data in batch])
+            crud.bulk_insert_matches(db, match_rows, participant_rows)
+            total += len(match_rows)
+            print(f"Processed up to {last_id} ({total} matches)")
+    finally:
+        db.close()
+
+    print(f"Backfill complete: {total} matches normalized.")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backfill matches/match_participants from stored match payloads")
+    parser.add_argument("--batch-size", type=int, default=500, help="Match payloads per batch")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    backfill(args.batch_size)
@@ -0,0 +1,132 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from dotenv import load_dotenv
+from sqlalchemy import JSON, Column, Integer, LargeBinary, MetaData, String, Table, func, select, text
+
+# Same bootstrap as collect_data.py: import the backend as the "app" package.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+# app.* reads DATABASE_URL / settings at import time.
+load_dotenv("backend/.env")
+
+from app.database import engine
+from app.services.payload_codec import decode_payload, encode_payload
+
+
+STAT_COLUMNS = ["kills", "deaths", "assists", "cs", "gold_earned", "vision_score"]
+
+
+def synthetic_match(index: int) -> Dict[str, Any]:
+    """Match-v5 shaped payload (10 participants with ~120 numeric fields each)."""
+    participants = []
+    for pid in range(1, 11):
+        participant = {f"stat{k}": random.randint(0, 50000) for k in range(110)}
+        participant.update({
+            "participantId": pid,
+            "puuid": f"bench-puuid-{index}-{pid}",
+            "championName": random.choice(["Ahri", "Garen", "LeeSin", "Jinx", "Thresh"]),
+            "teamPosition": ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"][(pid - 1) % 5],
+            "challenges": {f"c{k}": random.random() for k in range(60)},
+        })
+        participants.append(participant)
+    return {
+        "metadata": {"matchId": f"BENCH_{index}", "participants": [p["puuid"] for p in participants]},
+        "info": {"gameDuration": random.randint(1200, 2400), "queueId": 420, "participants": participants},
+    }
+
+
+def sample_payloads(rows: int) -> List[Dict[str, Any]]:
+    """Real stored payloads when available, padded with synthetic ones."""
+    payloads: List[Dict[str, Any]] = []
+    with engine.connect() as conn:
+        if engine.dialect.has_table(conn, "match_payloads"):
+            result = conn.execute(text("SELECT data FROM match_payloads LIMIT :n"), {"n": rows})
+            payloads = [decode_payload(data) for (data,) in result]
+    while len(payloads) < rows:
+        payloads.append(synthetic_match(len(payloads)))
+    return payloads
+
+
+def table_size(conn, table: Table) -> int:
+    if engine.dialect.name == "postgresql":
+        return conn.execute(text("SELECT pg_total_relation_size(:t)"), {"t": table.name}).scalar()
+    # Fallback: sum of stored value sizes (no page/TOAST overhead).
+    lengths = [func.coalesce(func.length(c), 0) for c in table.columns if not c.primary_key]
+    return conn.execute(select(func.sum(sum(lengths[1:], lengths[0])))).scalar() or 0
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run(rows: int, repeat: int) -> None:
+    payloads = sample_payloads(rows)
+    metadata = MetaData()
+    stat_columns = lambda: [Column(name, Integer) for name in STAT_COLUMNS]
+    legacy = Table("bench_match_history_json", metadata,
+                   Column("id", Integer, primary_key=True), Column("match_id", String),
+                   *stat_columns(), Column("raw_data", JSON))
+    hot = Table("bench_match_history_hot", metadata,
+                Column("id", Integer, primary_key=True), Column("match_id", String), *stat_columns())
+    blobs = Table("bench_match_payloads", metadata,
+                  Column("match_id", String, primary_key=True), Column("codec", String), Column("data", LargeBinary))
+
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    try:
+        stats = [{name: random.randint(0, 300) for name in STAT_COLUMNS} for _ in payloads]
+        with engine.begin() as conn:
+            conn.execute(legacy.insert(), [
+                {"match_id": f"BENCH_{i}", **stats[i], "raw_data": payload} for i, payload in enumerate(payloads)
+            ])
+            conn.execute(hot.insert(), [{"match_id": f"BENCH_{i}", **stats[i]} for i in range(len(payloads))])
+            conn.execute(blobs.insert(), [
+                {"match_id": f"BENCH_{i}", "codec": "zstd", "data": encode_payload(payload)}
+                for i, payload in enumerate(payloads)
+            ])
+        if engine.dialect.name == "postgresql":
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                for table in (legacy, hot, blobs):
+                    conn.execute(text(f"VACUUM ANALYZE {table.name}"))
+
+        with engine.connect() as conn:
+            sizes = {table.name: table_size(conn, table) for table in (legacy, hot, blobs)}
+            stat_cols = lambda table: [table.c.id, table.c.match_id, *[table.c[name] for name in STAT_COLUMNS]]
+            results = [
+                ("per-player scan, JSON in table", sizes[legacy.name],
+                 timed(lambda: conn.execute(select(*stat_cols(legacy))).all(), repeat)),
+                ("per-player scan, split tables", sizes[hot.name],
+                 timed(lambda: conn.execute(select(*stat_cols(hot))).all(), repeat)),
+                ("full payload scan, JSON column", sizes[legacy.name],
+                 timed(lambda: conn.execute(select(legacy.c.raw_data)).all(), repeat)),
+                ("full payload scan, zstd blobs", sizes[blobs.name],
+                 timed(lambda: [decode_payload(d) for (d,) in conn.execute(select(blobs.c.data))], repeat)),
+            ]
+    finally:
+        metadata.drop_all(engine)
+
+    print(f"{len(payloads)} matches, dialect={engine.dialect.name}, best of {repeat}")
+    print(f"{'scenario':34} {'table bytes':>14} {'scan ms':>10}")
+    for name, size, ms in results:
+        print(f"{name:34} {size:>14,} {ms:>10.1f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare JSON-in-table vs compressed blob match storage")
+    parser.add_argument("--rows", type=int, default=2000, help="Matches to load into the scratch tables")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per scan (best is reported)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.rows, args.repeat)
@@ -2,15 +2,24 @@ import argparse
 import asyncio
 import json
 import os
+import sys
 from datetime import datetime, timezone
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import httpx
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 
-from backend.app.database import SessionLocal
-from backend.app import models
+# crud/match_rows import the backend as the "app" package; one namespace avoids
+# registering the models twice.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+# app.database reads DATABASE_URL at import time (app.config settings are not needed).
+load_dotenv("backend/.env")
+
+from app.database import SessionLocal
+from app import crud, models
+from app.services.match_rows import collect_normalized_rows
 
 
 REGION_BY_PLATFORM = {
@@ -27,10 +36,6 @@ REGION_BY_PLATFORM = {
 }
 
 
-def load_settings() -> None:
-    load_dotenv("backend/.env")
-
-
 def get_region(platform: str, override: Optional[str]) -> str:
     if override:
         return override
@@ -124,41 +129,42 @@ def upsert_player(db: Session, puuid: str, game_name: str, tag_line: str, platfo
     return player
 
 
-def upsert_match(
-    db: Session,
+def build_match_row(
     player: models.Player,
     match_id: str,
     match_data: Dict[str, Any],
     participant: Dict[str, Any],
-) -> None:
-    existing = db.query(models.MatchHistory).filter(models.MatchHistory.match_id == match_id).first()
-    if existing:
-        return
-
+) -> Dict[str, Any]:
     info = match_data.get("info", {})
     game_creation_ms = info.get("gameCreation")
     game_creation = None
     if game_creation_ms:
         game_creation = datetime.fromtimestamp(game_creation_ms / 1000, tz=timezone.utc)
 
-    match = models.MatchHistory(
-        player_id=player.id,
-        match_id=match_id,
-        game_mode=info.get("gameMode"),
-        game_duration=info.get("gameDuration"),
-        game_creation=game_creation,
-        champion_name=participant.get("championName"),
-        kills=participant.get("kills"),
-        deaths=participant.get("deaths"),
-        assists=participant.get("assists"),
-        win=participant.get("win"),
-        total_damage=participant.get("totalDamageDealtToChampions"),
-        gold_earned=participant.get("goldEarned"),
-        cs=(participant.get("totalMinionsKilled", 0) + participant.get("neutralMinionsKilled", 0)),
-        vision_score=participant.get("visionScore"),
-        raw_data=match_data,
-    )
-    db.add(match)
+    return {
+        "player_id": player.id,
+        "match_id": match_id,
+        "game_mode": info.get("gameMode"),
+        "game_duration": info.get("gameDuration"),
+        "game_creation": game_creation,
+        "champion_name": participant.get("championName"),
+        "kills": participant.get("kills"),
+        "deaths": participant.get("deaths"),
+        "assists": participant.get("assists"),
+        "win": participant.get("win"),
+        "total_damage": participant.get("totalDamageDealtToChampions"),
+        "gold_earned": participant.get("goldEarned"),
+        "cs": (participant.get("totalMinionsKilled", 0) + participant.get("neutralMinionsKilled", 0)),
+        "vision_score": participant.get("visionScore"),
+        "raw_data": match_data,
+    }
+
+
+def upsert_matches(db: Session, rows: List[Dict[str, Any]]) -> None:
+    # One INSERT ... ON CONFLICT (match_id) DO UPDATE for the whole seed, the same
+    # path the API uses: rows are refreshed unless they belong to another player.
+    crud.bulk_upsert_match_history(db, rows)
+    crud.bulk_insert_matches(db, *collect_normalized_rows([row["raw_data"] for row in rows]))
 
 
 async def collect_for_seed(seed: Dict[str, Any], count: int, queue: Optional[int]) -> int:
@@ -183,15 +189,17 @@ async def collect_for_seed(seed: Dict[str, Any], count: int, queue: Optional[int
             player = upsert_player(db, puuid, game_name, tag_line, platform, region, summoner)
             db.flush()
 
+            rows: List[Dict[str, Any]] = []
             for match_id in match_ids:
                 match_data = await get_match_details(client, api_key, region, match_id)
                 participants = match_data.get("info", {}).get("participants", [])
                 participant = next((p for p in participants if p.get("puuid") == puuid), None)
                 if not participant:
                     continue
-                upsert_match(db, player, match_id, match_data, participant)
+                rows.append(build_match_row(player, match_id, match_data, participant))
                 collected += 1
 
+            upsert_matches(db, rows)
             db.commit()
         finally:
             db.close()
@@ -218,6 +226,5 @@ def parse_args() -> argparse.Namespace:
 
 
 if __name__ == "__main__":
-    load_settings()
     args = parse_args()
     asyncio.run(run(args.seed_file, args.count, args.queue))
@@ -4,6 +4,7 @@ from collections import defaultdict
 
 import pandas as pd
 from dotenv import load_dotenv
+from sqlalchemy import select
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 
@@ -27,36 +28,47 @@ def load_settings() -> None:
 
 
 def build_dataset():
+    """Per-participant rows straight from match_participants; per-minute rates are vectorized."""
+    P = models.MatchParticipant
+    query = select(
+        P.champion,
+        P.team_position.label("role"),
+        P.win,
+        P.kills,
+        P.deaths,
+        P.assists,
+        P.cs,
+        P.vision_score,
+        P.total_damage,
+        P.gold_earned,
+        P.time_played,
+    ).where(P.champion.isnot(None), P.time_played > 0)
+
     db = SessionLocal()
-    rows = []
     try:
-        matches = db.query(models.MatchHistory).all()
-        for match in matches:
-            info = (match.raw_data or {}).get("info", {})
-            participants = info.get("participants", [])
-            for participant in participants:
-                time_played = participant.get("timePlayed") or info.get("gameDuration")
-                if not time_played:
-                    continue
-                minutes = max(time_played / 60, 1)
-                row = {
-                    "champion": participant.get("championName"),
-                    "role": participant.get("teamPosition"),
-                    "win": int(bool(participant.get("win"))),
-                    "kills_per_min": participant.get("kills", 0) / minutes,
-                    "deaths_per_min": participant.get("deaths", 0) / minutes,
-                    "assists_per_min": participant.get("assists", 0) / minutes,
-                    "cs_per_min": (participant.get("totalMinionsKilled", 0) + participant.get("neutralMinionsKilled", 0)) / minutes,
-                    "vision_per_min": participant.get("visionScore", 0) / minutes,
-                    "damage_per_min": participant.get("totalDamageDealtToChampions", 0) / minutes,
-                    "gold_per_min": participant.get("goldEarned", 0) / minutes,
-                }
-                if row["champion"]:
-                    rows.append(row)
+        df = pd.DataFrame(db.execute(query).all(), columns=[
+            "champion", "role", "win", "kills", "deaths", "assists", "cs",
+            "vision_score", "total_damage", "gold_earned", "time_played",
+        ])
     finally:
         db.close()
 
-    return pd.DataFrame(rows)
+    if df.empty:
+        return df
+
+    minutes = (df["time_played"] / 60).clip(lower=1)
+    df["win"] = df["win"].fillna(False).astype(int)
+    for feature, column in (
+        ("kills_per_min", "kills"),
+        ("deaths_per_min", "deaths"),
+        ("assists_per_min", "assists"),
+        ("cs_per_min", "cs"),
+        ("vision_per_min", "vision_score"),
+        ("damage_per_min", "total_damage"),
+        ("gold_per_min", "gold_earned"),
+    ):
+        df[feature] = df[column].fillna(0) / minutes
+    return df[["champion", "role", "win", *FEATURES]]
 
 
 def train_importance(df: pd.DataFrame):
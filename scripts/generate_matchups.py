@@ -1,9 +1,11 @@
 import argparse
 import json
 from collections import defaultdict
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from dotenv import load_dotenv
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import aliased
 
 from backend.app.database import SessionLocal
 from backend.app import models
@@ -17,19 +19,13 @@ ROLE_TO_LANE = {
     "BOTTOM": "bot",
     "UTILITY": "support",
 }
+MIN_GAMES = 10
 
 
 def load_settings() -> None:
     load_dotenv("backend/.env")
 
 
-def add_matchup(stats: Dict[str, Any], lane: str, my_champ: str, enemy_champ: str, win: bool) -> None:
-    entry = stats[lane][my_champ][enemy_champ]
-    entry["games"] += 1
-    if win:
-        entry["wins"] += 1
-
-
 def note_for(winrate: float) -> str:
     if winrate >= 53:
         return "Favorable matchup; press small leads early."
@@ -59,35 +55,43 @@ def confidence_for(games: int) -> str:
     return "low"
 
 
+def query_matchups(db) -> List[Any]:
+    """Lane opponents paired in SQL: same match, same team_position, opposite teams."""
+    me = aliased(models.MatchParticipant)
+    enemy = aliased(models.MatchParticipant)
+    query = (
+        select(
+            me.team_position,
+            me.champion,
+            enemy.champion,
+            func.count().label("games"),
+            func.sum(case((me.win.is_(True), 1), else_=0)).label("wins"),
+        )
+        .join(
+            enemy,
+            and_(
+                enemy.match_id == me.match_id,
+                enemy.team_position == me.team_position,
+                enemy.team_id != me.team_id,
+            ),
+        )
+        .where(
+            me.team_position.in_(sorted(ROLES)),
+            me.champion.isnot(None),
+            enemy.champion.isnot(None),
+        )
+        .group_by(me.team_position, me.champion, enemy.champion)
+        .having(func.count() >= MIN_GAMES)
+    )
+    return db.execute(query).all()
+
+
 def generate(output_path: str) -> None:
     db = SessionLocal()
-    stats = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: {"games": 0, "wins": 0})))
+    stats = defaultdict(lambda: defaultdict(dict))
     try:
-        matches = db.query(models.MatchHistory).all()
-        for match in matches:
-            info = (match.raw_data or {}).get("info", {})
-            participants = info.get("participants", [])
-            teams: Dict[int, Dict[str, Dict[str, Any]]] = {100: {}, 200: {}}
-
-            for participant in participants:
-                role = participant.get("teamPosition")
-                if role not in ROLES:
-                    continue
-                team_id = participant.get("teamId")
-                teams.setdefault(team_id, {})[role] = participant
-
-            for role in ROLES:
-                if role not in teams.get(100, {}) or role not in teams.get(200, {}):
-                    continue
-                p1 = teams[100][role]
-                p2 = teams[200][role]
-                champ1 = p1.get("championName")
-                champ2 = p2.get("championName")
-                if not champ1 or not champ2:
-                    continue
-                lane = ROLE_TO_LANE[role]
-                add_matchup(stats, lane, champ1, champ2, bool(p1.get("win")))
-                add_matchup(stats, lane, champ2, champ1, bool(p2.get("win")))
+        for role, champ, enemy_champ, games, wins in query_matchups(db):
+            stats[ROLE_TO_LANE[role]][champ][enemy_champ] = {"games": games, "wins": wins or 0}
     finally:
         db.close()
 
@@ -97,8 +101,6 @@ def generate(output_path: str) -> None:
         for champ, enemies in champs.items():
             output[lane][champ] = {}
             for enemy, data in enemies.items():
-                if data["games"] < 10:
-                    continue
                 winrate = round((data["wins"] / data["games"]) * 100, 1)
                 output[lane][champ][enemy] = {
                     "winrate": winrate,